@@ -2,11 +2,13 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
-from dotenv import load_dotenv
+BASE_DIR = Path(__file__).resolve().parent.parent
 
-load_dotenv()
+# Без .env (переменные окружения заданы при запуске) python-dotenv не нужен
+if (BASE_DIR / ".env").exists():
+    from dotenv import load_dotenv
 
-BASE_DIR = Path(__file__).resolve().parent.parent
+    load_dotenv(BASE_DIR / ".env")
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
@@ -39,6 +41,34 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # orjson при наличии, иначе стандартный json
+    "DEFAULT_RENDERER_CLASSES": (
+        "retail_chain.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "retail_chain.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    # Ведро токенов в общем кэше (retail_chain.throttling): "N/период" -
+    # до N запросов подряд, далее N за период. Ответ 429 с Retry-After
+    "DEFAULT_THROTTLE_CLASSES": (
+        "retail_chain.throttling.RoleRateThrottle",
+        "retail_chain.throttling.SearchRateThrottle",
+        "retail_chain.throttling.ScopedTokenBucketThrottle",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "60/min",
+        "user": "600/min",
+        "moderator": "1200/min",
+        "staff": "3000/min",
+        "search": "30/min",
+        "register": "10/hour",
+        "login": "20/min",
+        "bulk_register": "10/hour",
+        "jobs": "30/hour",
+    },
 }
 
 SIMPLE_JWT = {
@@ -47,6 +77,9 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    # Первым, чтобы трасса включала время остальных middleware
+    "retail_chain.tracing.TracingMiddleware",
+    "retail_chain.query_limits.QueryLimitsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -55,6 +88,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "retail_chain.concurrency.AdaptiveConcurrencyMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -132,3 +166,154 @@ MEDIA_URL = "media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Максимальная глубина раскрытия связей в ?expand= (например supplier.supplier)
+EXPAND_MAX_DEPTH = 3
+
+# Время жизни кэша продуктов цепочки поставок /companies/{id}/products/, секунды
+SUBTREE_PRODUCTS_CACHE_TIMEOUT = 60 * 60
+
+# Граф поставщиков в памяти процесса (retail_chain.graph): сколько изменений
+# применяется без полной перезагрузки, сколько хранятся отметки изменений
+# и перестраивать ли граф в фоновом потоке, а не в потоке запроса
+SUPPLIER_GRAPH_MAX_INCREMENTAL = 1000
+SUPPLIER_GRAPH_CHANGES_TIMEOUT = 60 * 60
+SUPPLIER_GRAPH_BACKGROUND_REFRESH = True
+
+# Массовое создание пользователей: максимум за один запрос /users/bulk-register/
+# и число процессов общего пула хэширования паролей в каждом процессе сервера
+USERS_BULK_MAX = 1000
+USERS_PROVISION_WORKERS = 2
+
+# Пакетные запросы /batch/: максимум вложенных запросов и потоков для чтения,
+# URL, пути которых допускаются во вложенных запросах
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+BATCH_URLCONF = "config.urls_api"
+
+# Лента изменений /changes/: записей на страницу и сколько секунд новые
+# записи не отдаются, пока не зафиксируются транзакции с меньшими id
+CHANGE_FEED_PAGE_SIZE = 500
+CHANGE_FEED_SAFETY_LAG = 10
+
+# Фотографии пользователей /users/avatar/: уменьшенные копии (вариант - сторона
+# квадрата в пикселях), формат и качество сжатия, предельный размер загрузки,
+# предельное число пикселей изображения, число процессов обработки и время
+# обработки одного файла в секундах
+AVATAR_VARIANTS = {"small": 64, "medium": 256, "large": 512}
+AVATAR_FORMAT = "JPEG"
+AVATAR_QUALITY = 85
+AVATAR_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+AVATAR_MAX_PIXELS = 25_000_000
+AVATAR_WORKERS = 2
+AVATAR_PROCESS_TIMEOUT = 30
+
+# Отчет о задолженности /companies/debt/: базовая валюта таблицы курсов
+# ExchangeRate и время жизни кэша отчетов, секунды
+DEBT_BASE_CURRENCY = "RUB"
+DEBT_TOTALS_CACHE_TIMEOUT = 60 * 60
+
+# Автодополнение /autocomplete/: число результатов по умолчанию и максимум,
+# индексы в памяти процесса обновляются как граф поставщиков
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_MAX_INCREMENTAL = 1000
+AUTOCOMPLETE_CHANGES_TIMEOUT = 60 * 60
+
+# Пакетный поиск контактов /contacts/lookup/: максимум ИНН и e-mail за запрос
+CONTACTS_LOOKUP_MAX = 1000
+
+# Фасеты /companies/facets/: время жизни кэша, секунды
+FACETS_CACHE_TIMEOUT = 60 * 60
+
+# Фильтры админ-панели: число выводимых значений и время жизни кэша, секунды
+ADMIN_FILTER_MAX_CHOICES = 50
+ADMIN_FILTER_CACHE_TIMEOUT = 10 * 60
+
+# Кэш должен быть общим для всех процессов (Redis или Memcached): в нем
+# хранятся лимиты запросов и версии кэшированных отчетов. LocMemCache
+# по умолчанию подходит только для разработки
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+# Ограничение одновременных запросов (retail_chain.concurrency): начальный,
+# минимальный и максимальный лимит на процесс для каждого класса запросов
+# и пути дорогих запросов (регулярные выражения) и путей без ограничения
+CONCURRENCY_LIMITS = {
+    "read": {"initial": 20, "min": 4, "max": 200},
+    "heavy": {"initial": 4, "min": 1, "max": 20},
+    "write": {"initial": 10, "min": 2, "max": 50},
+}
+CONCURRENCY_HEAVY_PATHS = (
+    r"^/companies/(debt|facets)/",
+    r"^/companies/\d+/chain/",
+    r"^/analytics/",
+    r"^/changes/",
+    r"^/batch/",
+    r"^/contacts/lookup/",
+    r"^/users/bulk-register/",
+)
+CONCURRENCY_EXEMPT_PATHS = ("/monitoring/", "/static/", "/media/")
+
+# Фоновые задачи (retail_chain.jobs, команда run_jobs): потоков обработчика,
+# интервал опроса очереди, попыток и задержка перед повтором (удваивается),
+# через сколько секунд без сигнала обработчика задача возвращается в очередь,
+# размер части обработки и выборка в админ-панели, обрабатываемая без очереди
+JOBS_WORKERS = 2
+JOBS_POLL_INTERVAL = 1.0
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 30
+JOBS_STALE_TIMEOUT = 5 * 60
+JOBS_BATCH_SIZE = 1000
+JOBS_ADMIN_INLINE_MAX = 1000
+
+# Массовое назначение продуктов /companies/products/add|remove/: максимум
+# продуктов и явно указанных компаний в запросе и размер части компаний
+# при обновлении журнала изменений и сводок
+COMPANY_PRODUCTS_BULK_MAX = 1000
+COMPANY_PRODUCTS_BATCH_SIZE = 1000
+
+# Создание или обновление продуктов /products/upsert/: максимум в одном запросе
+PRODUCTS_UPSERT_MAX = 1000
+
+# Бюджет времени от запуска процесса до ответа на первый запрос, мс
+# (команда bench_startup завершается с ошибкой при превышении медианы)
+STARTUP_BUDGET_MS = 1500
+
+# Трассировка запросов (retail_chain.tracing): доля записываемых запросов,
+# порог медленного запроса, мс (если задан, записываются все запросы,
+# а сохраняются выбранные и медленные), экспортер трасс и его параметры,
+# максимум span в трассе и длина текста SQL запроса
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", 0))
+TRACING_SLOW_REQUEST_MS = None
+TRACING_EXPORTER = "retail_chain.tracing.JSONFileExporter"
+TRACING_EXPORTER_OPTIONS = {"path": os.path.join(BASE_DIR, "traces", "traces.jsonl")}
+TRACING_MAX_SPANS = 1000
+TRACING_SQL_MAX_LENGTH = 1000
+
+# Ограничения SQL запросов (retail_chain.query_limits): время выполнения
+# одного SQL запроса, мс, и число SQL запросов на HTTP запрос. Ключи:
+# "default", имя представления или "Представление.действие"; None - без
+# ограничения. При превышении запрос прерывается с ответом 503 и кодом
+# query_timeout или query_budget_exceeded. Пути QUERY_LIMITS_EXEMPT_PATHS
+# не ограничиваются
+QUERY_LIMITS = {
+    "default": {"timeout_ms": 30 * 1000, "max_queries": 200},
+    # Поиск ?search= по компаниям и поставщикам (ILIKE по соединению)
+    "CompanyViewSet.list": {"timeout_ms": 5 * 1000},
+    "ProductViewSet.list": {"timeout_ms": 5 * 1000},
+    "ContactsViewSet.list": {"timeout_ms": 5 * 1000},
+    "AutocompleteAPIView": {"timeout_ms": 2 * 1000},
+    # Вложенные запросы /batch/ ограничиваются по своим представлениям
+    "BatchAPIView": {"max_queries": None},
+    # Журнал изменений и сводки обновляются частями по числу компаний
+    "CompanyViewSet.add_products": {"timeout_ms": 60 * 1000, "max_queries": None},
+    "CompanyViewSet.remove_products": {"timeout_ms": 60 * 1000, "max_queries": None},
+}
+QUERY_LIMITS_EXEMPT_PATHS = ("/admin/", "/static/", "/media/")
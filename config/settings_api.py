@@ -0,0 +1,46 @@
+"""
+Профиль настроек процессов, обслуживающих только API
+(DJANGO_SETTINGS_MODULE=config.settings_api): без админ-панели, сессий,
+документации и браузерного интерфейса DRF. Такие процессы быстрее стартуют
+и занимают меньше памяти. Админ-панель и документация обслуживаются
+отдельными процессами с config.settings, база данных общая.
+"""
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, TEMPLATES
+
+API_EXCLUDED_APPS = (
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "drf_yasg",
+)
+# Аутентификация только по JWT, request.user заполняет DRF
+API_EXCLUDED_MIDDLEWARE = (
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_EXCLUDED_APPS]
+
+MIDDLEWARE = [item for item in MIDDLEWARE if item not in API_EXCLUDED_MIDDLEWARE]
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+            ],
+        },
+    }
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": ("retail_chain.renderers.FastJSONRenderer",),
+}
+
+ROOT_URLCONF = "config.urls_api"
@@ -1,37 +1,61 @@
+from functools import cache
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        # название нашей документации
-        title="Retail chain API",
-        # версия документации
-        default_version="v1.0.0",
-        # описание нашей документации
-        description="Retail chain API description",
-        terms_of_service="https://localhost/policies/terms/",
-        contact=openapi.Contact(email="alina_nemo@mail.ru"),
-        license=openapi.License(name="Retail chain API License"),
-    ),
-    public=True,
-    # в разрешениях можем сделать доступ только авторизованным пользователям.
-    permission_classes=(permissions.AllowAny,),
-)
+
+from config.urls_api import urlpatterns as api_urlpatterns
+
+
+@cache
+def get_schema_view():
+    # drf_yasg вместе со схемами валидации импортируется около 100 мс,
+    # поэтому загружается при первом запросе документации, а не при старте
+    from drf_yasg import openapi
+    from drf_yasg.views import get_schema_view
+
+    return get_schema_view(
+        openapi.Info(
+            # название нашей документации
+            title="Retail chain API",
+            # версия документации
+            default_version="v1.0.0",
+            # описание нашей документации
+            description="Retail chain API description",
+            terms_of_service="https://localhost/policies/terms/",
+            contact=openapi.Contact(email="alina_nemo@mail.ru"),
+            license=openapi.License(name="Retail chain API License"),
+        ),
+        public=True,
+        # в разрешениях можем сделать доступ только авторизованным пользователям.
+        permission_classes=(permissions.AllowAny,),
+    )
+
+
+def lazy_schema_view(renderer=None):
+    """
+    Представление документации: без renderer - схема (JSON/YAML),
+    иначе интерфейс swagger или redoc.
+    """
+
+    @cache
+    def get_view():
+        if renderer is None:
+            return get_schema_view().without_ui(cache_timeout=0)
+        return get_schema_view().with_ui(renderer, cache_timeout=0)
+
+    @csrf_exempt
+    def view(request, *args, **kwargs):
+        return get_view()(request, *args, **kwargs)
+
+    return view
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("", include("retail_chain.urls", namespace="retail_chain")),
-    path("users/", include("users.urls", namespace="users")),
-    path(
-        "swagger<format>/", schema_view.without_ui(cache_timeout=0), name="schema-json"
-    ),
-    path(
-        "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    *api_urlpatterns,
+    path("swagger<format>/", lazy_schema_view(), name="schema-json"),
+    path("swagger/", lazy_schema_view("swagger"), name="schema-swagger-ui"),
+    path("redoc/", lazy_schema_view("redoc"), name="schema-redoc"),
 ]
@@ -0,0 +1,11 @@
+from django.urls import path, include
+
+from retail_chain.batch import BatchAPIView
+
+# Только API, без админ-панели и документации: ROOT_URLCONF профиля
+# config.settings_api, также подключается в config.urls
+urlpatterns = [
+    path("", include("retail_chain.urls", namespace="retail_chain")),
+    path("users/", include("users.urls", namespace="users")),
+    path("batch/", BatchAPIView.as_view(), name="batch"),
+]
@@ -1,8 +1,17 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
-from retail_chain.models import Company, Product, Contacts
+from retail_chain.admin_filters import (
+    CityFilter,
+    CountryFilter,
+    ProductModelFilter,
+    ProductNameFilter,
+)
+from retail_chain.jobs import cancel_job, enqueue
+from retail_chain.models import Company, Product, Contacts, ExchangeRate, Job
+from retail_chain.tasks import zero_company_debt
 
 
 class ContactAdmin(admin.StackedInline):
@@ -20,7 +29,11 @@ class ContactsConcreteAdmin(admin.ModelAdmin):
         "street",
         "number_house",
     )
-    list_filter = ("country", "city")
+    list_filter = (CountryFilter, CityFilter)
+    # Без COUNT(*) по всей таблице при каждой загрузке отфильтрованного списка
+    # и без подсчета записей по каждому варианту фильтра
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
 
 
 @admin.register(Product)
@@ -30,10 +43,9 @@ class ProductAdmin(admin.ModelAdmin):
         "product_name",
         "product_date",
     )
-    list_filter = (
-        "product_name",
-        "product_model",
-    )
+    list_filter = (ProductNameFilter, ProductModelFilter)
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
 
 
 @admin.register(Company)
@@ -61,7 +73,55 @@ class CompanyAdmin(admin.ModelAdmin):
 
     @admin.action(description="Обнулить задолженость компании")
     def make_debt_to_zero(self, request, queryset):
-        print(request)
-        queryset.update(debt=0)
+        ids = list(queryset.values_list("pk", flat=True))
+        if len(ids) <= getattr(settings, "JOBS_ADMIN_INLINE_MAX", 1000):
+            zero_company_debt(ids)
+            return
+        # Большие выборки обрабатываются в фоне, без таймаута запроса
+        job = enqueue("zero_debt", {"company_ids": ids}, owner=request.user)
+        self.message_user(
+            request,
+            f"Обнуление задолженности {len(ids)} компаний поставлено "
+            f"в очередь: задача #{job.pk}",
+            messages.INFO,
+        )
+
+    @admin.action(description="Пересчитать уровни иерархии всех компаний")
+    def recompute_levels(self, request, queryset):
+        job = enqueue("recompute_levels", owner=request.user)
+        self.message_user(
+            request,
+            f"Пересчет уровней поставлен в очередь: задача #{job.pk}",
+            messages.INFO,
+        )
+
+    actions = [make_debt_to_zero, recompute_levels]
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ("currency", "rate", "updated_at")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "name",
+        "status",
+        "progress_done",
+        "progress_total",
+        "attempts",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status", "name")
+    readonly_fields = [field.name for field in Job._meta.fields]
+    show_full_result_count = False
+
+    @admin.action(description="Отменить задачи")
+    def cancel_jobs(self, request, queryset):
+        cancelled = sum(cancel_job(job) for job in queryset)
+        self.message_user(request, f"Отменено задач: {cancelled}", messages.INFO)
 
-    actions = [make_debt_to_zero]
+    actions = [cancel_jobs]
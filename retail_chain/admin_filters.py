@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.db.models import Count
+
+from retail_chain.versions import bump_version, get_version
+
+ADMIN_FILTER_VERSION_KEY = "retail_chain:admin_filter:{}:version"
+
+
+def _version_key(model):
+    return ADMIN_FILTER_VERSION_KEY.format(model._meta.label_lower)
+
+
+def invalidate_admin_filters(model):
+    """
+    Сбрасывает кэш вариантов фильтров админ-панели модели сменой версии.
+    """
+    bump_version(_version_key(model))
+
+
+class CachedChoicesFilter(admin.SimpleListFilter):
+    """
+    Фильтр по значениям поля с числом записей. Вместо SELECT DISTINCT
+    по всей таблице при каждой загрузке списка варианты берутся из кэша,
+    который сбрасывается при изменении записей модели. Выводятся только
+    самые частые значения (ADMIN_FILTER_MAX_CHOICES).
+    """
+
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = self.field_name
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        model = model_admin.model
+        version = get_version(_version_key(model))
+        key = (
+            f"retail_chain:admin_filter:{model._meta.label_lower}:{version}:"
+            f"{self.field_name}"
+        )
+        choices = cache.get(key)
+        if choices is None:
+            max_choices = getattr(settings, "ADMIN_FILTER_MAX_CHOICES", 50)
+            rows = (
+                model._default_manager.exclude(**{f"{self.field_name}__isnull": True})
+                .exclude(**{self.field_name: ""})
+                .values(self.field_name)
+                .annotate(count=Count("pk"))
+                .order_by("-count", self.field_name)[:max_choices]
+            )
+            choices = [(row[self.field_name], row["count"]) for row in rows]
+            cache.set(
+                key,
+                choices,
+                timeout=getattr(settings, "ADMIN_FILTER_CACHE_TIMEOUT", 10 * 60),
+            )
+        return [(value, f"{value} ({count})") for value, count in choices]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_name: self.value()})
+        return queryset
+
+
+class PrefixInputFilter(admin.SimpleListFilter):
+    """
+    Фильтр с полем ввода для полей с большим числом значений:
+    записи, значение которых начинается с введенной строки (без учета
+    регистра). Список значений не строится. Для полей фильтра нужен индекс
+    по UPPER(поле::text) с text_pattern_ops (см. миграцию
+    0011_product_prefix_indexes), иначе условие читает всю таблицу.
+    """
+
+    field_name = None
+    template = "admin/retail_chain/input_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = self.field_name
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        # Непустой список, иначе фильтр не выводится
+        return ((None, None),)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{f"{self.field_name}__istartswith": self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice["query_parts"] = [
+            (name, value)
+            for name, values in changelist.get_filters_params().items()
+            if name != self.parameter_name
+            for value in (values if isinstance(values, list) else [values])
+        ]
+        yield all_choice
+
+
+class CountryFilter(CachedChoicesFilter):
+    title = "Страна"
+    field_name = "country"
+
+
+class CityFilter(CachedChoicesFilter):
+    title = "Город"
+    field_name = "city"
+
+
+class ProductNameFilter(PrefixInputFilter):
+    title = "Название продукта"
+    field_name = "product_name"
+
+
+class ProductModelFilter(PrefixInputFilter):
+    title = "Модель продукта"
+    field_name = "product_model"
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RetailChainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "retail_chain"
+
+    def ready(self):
+        import retail_chain.signals  # noqa: F401
+        import retail_chain.tasks  # noqa: F401
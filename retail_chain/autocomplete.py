@@ -0,0 +1,211 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from django.conf import settings
+
+from retail_chain.models import Company, Product
+from retail_chain.versions import (
+    get_version,
+    get_versioned_changes,
+    record_versioned_change,
+)
+
+AUTOCOMPLETE_VERSION_KEY = "retail_chain:autocomplete:{}:version"
+
+# Индексы автодополнения: имя -> (модель, поле)
+AUTOCOMPLETE_FIELDS = {
+    "company": (Company, "name"),
+    "product_name": (Product, "product_name"),
+    "product_model": (Product, "product_model"),
+}
+
+
+def record_autocomplete_change(model, object_id):
+    """
+    Отмечает изменение объекта для инкрементального обновления индексов
+    автодополнения по полям модели.
+    """
+    for name, (index_model, _) in AUTOCOMPLETE_FIELDS.items():
+        if index_model is not model:
+            continue
+        record_versioned_change(
+            AUTOCOMPLETE_VERSION_KEY.format(name),
+            object_id,
+            timeout=getattr(settings, "AUTOCOMPLETE_CHANGES_TIMEOUT", 60 * 60),
+        )
+
+
+PrefixIndexArrays = namedtuple(
+    "PrefixIndexArrays", "keys values ids owner_keys owner_values owner_ids"
+)
+
+
+class PrefixIndex:
+    """
+    Отсортированный индекс значений поля модели в памяти процесса
+    для автодополнения по префиксу без учета регистра.
+
+    keys - значения в casefold по возрастанию (при равных значениях -
+    по id), поиск префикса - бинарный, затем подряд идущие ключи с этим
+    префиксом: O(log n + k). Для поиска среди записей одного владельца
+    есть второй отсортированный список ключей вида "<владелец>\\0<значение>".
+    Измененные записи удаляются и вставляются на место бинарным поиском,
+    индекс перестраивается сортировкой только при полной загрузке.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.model, self.field = AUTOCOMPLETE_FIELDS[name]
+        self.arrays = PrefixIndexArrays([], [], array("q"), [], [], array("q"))
+        # id записи -> (значение, id владельца), чтобы найти в списках
+        # прежнее положение измененной записи
+        self.entries = {}
+        self.version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.arrays.keys)
+
+    @staticmethod
+    def _owner_key(owner_id, key):
+        # Ширина номера фиксирована, чтобы строки сортировались как числа
+        return f"{owner_id:020d}\0{key}"
+
+    def _build(self, rows):
+        """
+        Перестраивает индекс по тройкам (id, значение, id владельца).
+        """
+        self.entries = {
+            object_id: (value, owner_id or 0) for object_id, value, owner_id in rows
+        }
+        rows = sorted(
+            (value.casefold(), object_id, value)
+            for object_id, (value, _) in self.entries.items()
+        )
+        by_owner = sorted(
+            (self._owner_key(self.entries[object_id][1], key), object_id, value)
+            for key, object_id, value in rows
+        )
+        self.arrays = PrefixIndexArrays(
+            [key for key, _, _ in rows],
+            [value for _, _, value in rows],
+            array("q", (object_id for _, object_id, _ in rows)),
+            [key for key, _, _ in by_owner],
+            [value for _, _, value in by_owner],
+            array("q", (object_id for _, object_id, _ in by_owner)),
+        )
+
+    @staticmethod
+    def _position(keys, ids, key, object_id):
+        # Записи с равными ключами упорядочены по id
+        lo = bisect_left(keys, key)
+        hi = bisect_right(keys, key, lo)
+        return bisect_left(ids, object_id, lo, hi)
+
+    @classmethod
+    def _remove(cls, keys, values, ids, key, object_id):
+        i = cls._position(keys, ids, key, object_id)
+        if i < len(ids) and ids[i] == object_id and keys[i] == key:
+            del keys[i], values[i], ids[i]
+
+    @classmethod
+    def _insert(cls, keys, values, ids, key, value, object_id):
+        i = cls._position(keys, ids, key, object_id)
+        keys.insert(i, key)
+        values.insert(i, value)
+        ids.insert(i, object_id)
+
+    def _apply(self, changed_ids, rows):
+        """
+        Заменяет в индексе записи changed_ids тройками rows (id, значение,
+        id владельца), удаленные записи в rows отсутствуют. Изменения
+        вносятся в копии списков, которые затем заменяют индекс одним
+        присваиванием, чтобы поиск из других потоков не видел индекс
+        в середине обновления.
+        """
+        arrays = PrefixIndexArrays(*(values[:] for values in self.arrays))
+        main, by_owner = arrays[:3], arrays[3:]
+        for object_id in changed_ids:
+            entry = self.entries.pop(object_id, None)
+            if entry is None:
+                continue
+            value, owner_id = entry
+            key = value.casefold()
+            self._remove(*main, key, object_id)
+            self._remove(*by_owner, self._owner_key(owner_id, key), object_id)
+        for object_id, value, owner_id in rows:
+            owner_id = owner_id or 0
+            self.entries[object_id] = (value, owner_id)
+            key = value.casefold()
+            self._insert(*main, key, value, object_id)
+            self._insert(*by_owner, self._owner_key(owner_id, key), value, object_id)
+        self.arrays = arrays
+
+    def _queryset(self):
+        return self.model.objects.values_list("id", self.field, "owner_id")
+
+    def load(self):
+        """
+        Полная загрузка из базы данных.
+        """
+        version = get_version(AUTOCOMPLETE_VERSION_KEY.format(self.name))
+        self._build(self._queryset().iterator())
+        self.version = version
+
+    def refresh(self):
+        """
+        Обновляет индекс по маркеру изменений, читая из базы только
+        измененные записи. Если изменений слишком много или часть отметок
+        потеряна, выполняется полная загрузка.
+        """
+        with self._lock:
+            current, changed_ids = get_versioned_changes(
+                AUTOCOMPLETE_VERSION_KEY.format(self.name),
+                self.version,
+                getattr(settings, "AUTOCOMPLETE_MAX_INCREMENTAL", 1000),
+            )
+            if changed_ids is None:
+                self.load()
+                return
+            if current == self.version:
+                return
+            rows = list(self._queryset().filter(pk__in=changed_ids))
+            self._apply(changed_ids, rows)
+            self.version = current
+
+    def search(self, prefix, limit=10, owner_id=None):
+        """
+        До limit записей, значение которых начинается с prefix, в порядке
+        значений. owner_id ограничивает поиск записями владельца.
+        """
+        arrays = self.arrays
+        prefix = prefix.casefold()
+        keys, values, ids = arrays.keys, arrays.values, arrays.ids
+        if owner_id is not None:
+            keys, values, ids = arrays.owner_keys, arrays.owner_values, arrays.owner_ids
+            prefix = self._owner_key(owner_id, prefix)
+        results = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and len(results) < limit and keys[i].startswith(prefix):
+            results.append({"id": ids[i], "value": values[i]})
+            i += 1
+        return results
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_prefix_index(name):
+    """
+    Индекс автодополнения текущего процесса, загружается при первом
+    обращении и обновляется по маркеру изменений при каждом вызове.
+    """
+    index = _indexes.get(name)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(name, PrefixIndex(name))
+    index.refresh()
+    return index
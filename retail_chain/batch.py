@@ -0,0 +1,177 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.test.client import RequestFactory
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from retail_chain.query_limits import get_limits, get_view_name, limit_queries
+from retail_chain.tracing import TracingViewMixin, trace_connections
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def resolve_api_path(path):
+    """
+    Представление DRF для пути из URL API (BATCH_URLCONF, без админ-панели
+    и документации). Resolver404, если путь не относится к API.
+    """
+    match = resolve(
+        urlsplit(path).path,
+        urlconf=getattr(settings, "BATCH_URLCONF", "config.urls_api"),
+    )
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None or not issubclass(view_class, APIView):
+        raise Resolver404({"path": path})
+    return match
+
+
+class BatchItemSerializer(serializers.Serializer):
+    id = serializers.CharField(required=False)
+    method = serializers.ChoiceField(
+        choices=("GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"),
+        default="GET",
+    )
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        if not value.startswith("/"):
+            raise serializers.ValidationError("Путь должен начинаться с /")
+        try:
+            match = resolve_api_path(value)
+        except Resolver404:
+            raise serializers.ValidationError(f"Путь {value} не найден в API")
+        if issubclass(match.func.cls, BatchAPIView):
+            raise serializers.ValidationError("Вложенный /batch/ не поддерживается")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        max_requests = getattr(settings, "BATCH_MAX_REQUESTS", 20)
+        if len(value) > max_requests:
+            raise serializers.ValidationError(
+                f"Не более {max_requests} запросов в одном пакете"
+            )
+        return value
+
+
+class BatchAPIView(TracingViewMixin, APIView):
+    """
+    Контроллер для выполнения нескольких запросов к API за один HTTP запрос.
+    Принимает {"requests": [{"id", "method", "path", "body"}]} и возвращает
+    {"responses": [{"id", "status", "body"}]} в том же порядке.
+    Аутентификация (JWT) выполняется один раз, вложенные запросы получают
+    уже определенного пользователя, но проходят проверки прав своих
+    контроллеров. Идущие подряд запросы на чтение выполняются параллельно,
+    запросы на изменение - последовательно в указанном порядке.
+    Допускаются только пути контроллеров DRF из URL API (BATCH_URLCONF).
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data["requests"]
+
+        responses = []
+        reads = []
+        for item in items:
+            if item["method"] in READ_METHODS:
+                reads.append(item)
+                continue
+            responses.extend(self.run_concurrently(request, reads))
+            reads = []
+            responses.append(self.run_item(request, item))
+        responses.extend(self.run_concurrently(request, reads))
+        return Response({"responses": responses}, status=status.HTTP_200_OK)
+
+    def run_concurrently(self, request, items):
+        if len(items) <= 1:
+            return [self.run_item(request, item) for item in items]
+        workers = min(len(items), getattr(settings, "BATCH_MAX_WORKERS", 4))
+        # Каждый поток получает копию контекста запроса: трассу
+        # и ограничения SQL запросов (один контекст нельзя выполнять
+        # в двух потоках одновременно)
+        contexts = [copy_context() for _ in items]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(
+                pool.map(
+                    lambda context, item: context.run(
+                        self.run_in_thread, request, item
+                    ),
+                    contexts,
+                    items,
+                )
+            )
+
+    def run_in_thread(self, request, item):
+        try:
+            with trace_connections():
+                return self.run_item(request, item)
+        finally:
+            # Соединения с базой данных привязаны к потоку
+            connections.close_all()
+
+    def run_item(self, request, item):
+        result = {"status": status.HTTP_404_NOT_FOUND, "body": None}
+        if "id" in item:
+            result = {"id": item["id"], **result}
+        try:
+            match = resolve_api_path(item["path"])
+        except Resolver404:
+            return result
+
+        sub_request = RequestFactory().generic(
+            item["method"],
+            item["path"],
+            data=json.dumps(item["body"]) if "body" in item else "",
+            content_type="application/json",
+            secure=request.is_secure(),
+            HTTP_HOST=request.get_host(),
+            HTTP_ACCEPT_LANGUAGE=request.headers.get("Accept-Language", ""),
+        )
+        # Пользователь уже определен, DRF не будет повторно проверять токен
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+
+        try:
+            names = get_view_name(match.func, item["method"])
+            endpoint = f"{item['method']} {item['path']} ({names[1]})"
+            with limit_queries(get_limits(*names), endpoint):
+                response = match.func(sub_request, *match.args, **match.kwargs)
+            body = self.get_body(response)
+        except Exception:
+            logger.exception(
+                "Ошибка вложенного запроса %s %s", item["method"], item["path"]
+            )
+            result["status"] = status.HTTP_500_INTERNAL_SERVER_ERROR
+            return result
+        result["status"] = response.status_code
+        result["body"] = body
+        return result
+
+    @staticmethod
+    def get_body(response):
+        """
+        Тело ответа вложенного запроса: данные Response DRF без
+        рендеринга, иначе разобранный JSON или текст.
+        """
+        if isinstance(response, Response):
+            return response.data
+        if hasattr(response, "render"):
+            response.render()
+        if response.get("Content-Type", "").startswith("application/json"):
+            return json.loads(response.content or b"null")
+        return response.content.decode(response.charset)
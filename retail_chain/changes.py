@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+
+from retail_chain.fast_serializers import ValuesListSerializer
+from retail_chain.models import ChangeLogEntry, Company, Contacts, Product
+from retail_chain.serializers import (
+    CompanySerializer,
+    ContactsSerializer,
+    ProductSerializer,
+)
+
+# Модели журнала изменений и сериализаторы их снимков
+CHANGE_LOG_MODELS = {
+    Company: ("company", CompanySerializer),
+    Product: ("product", ProductSerializer),
+    Contacts: ("contacts", ContactsSerializer),
+}
+
+
+def record_change(instance, action):
+    """
+    Записывает изменение объекта со снимком его данных.
+    Вызывается из сигналов внутри транзакции сохранения.
+    """
+    model_name, serializer_class = CHANGE_LOG_MODELS[type(instance)]
+    data = None
+    if action != ChangeLogEntry.ActionChoices.DELETE:
+        data = serializer_class(instance).data
+    ChangeLogEntry.objects.create(
+        model_name=model_name, object_id=instance.pk, action=action, data=data
+    )
+
+
+def record_changes(model, ids, action=ChangeLogEntry.ActionChoices.UPDATE):
+    """
+    Записывает изменения набора объектов одним INSERT. Нужна для
+    массовых операций (queryset.update, bulk_create), которые не вызывают
+    сигналы.
+    """
+    model_name, serializer_class = CHANGE_LOG_MODELS[model]
+    values_serializer = ValuesListSerializer.for_serializer_class(serializer_class)
+    if action == ChangeLogEntry.ActionChoices.DELETE:
+        snapshots = {pk: None for pk in ids}
+    elif values_serializer is not None:
+        # Снимки тысяч объектов без создания экземпляров модели
+        rows = values_serializer.serialize(
+            values_serializer.values_list(model.objects.filter(pk__in=ids))
+        )
+        snapshots = {data["id"]: data for data in rows}
+    else:
+        queryset = model.objects.filter(pk__in=ids)
+        if model is Company:
+            queryset = queryset.prefetch_related("products")
+        snapshots = {obj.pk: serializer_class(obj).data for obj in queryset}
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(model_name=model_name, object_id=pk, action=action, data=data)
+        for pk, data in snapshots.items()
+    )
+
+
+def get_changes(since, model_names, limit):
+    """
+    Изменения с id больше курсора since в порядке записи,
+    не более limit + 1 записи, чтобы определить наличие следующей страницы.
+
+    id выдается при вставке записи, а видна она становится после фиксации
+    транзакции, поэтому в PostgreSQL запись с меньшим id может появиться
+    позже записи с большим id, уже полученной клиентом, и курсор ее
+    пропустит. Поэтому лента отдает записи только до первой записи моложе
+    CHANGE_FEED_SAFETY_LAG секунд: транзакции, которые пишут журнал,
+    должны фиксироваться быстрее.
+    """
+    queryset = ChangeLogEntry.objects.filter(id__gt=since).order_by("id")
+    lag = getattr(settings, "CHANGE_FEED_SAFETY_LAG", 10)
+    if lag:
+        first_recent = ChangeLogEntry.objects.filter(
+            created_at__gt=timezone.now() - timedelta(seconds=lag)
+        ).aggregate(id=Min("id"))["id"]
+        if first_recent is not None:
+            queryset = queryset.filter(id__lt=first_recent)
+    if model_names:
+        queryset = queryset.filter(model_name__in=model_names)
+    return list(
+        queryset.values(
+            "id", "model_name", "object_id", "action", "created_at", "data"
+        )[: limit + 1]
+    )
+
+
+def compact_changes(older_than):
+    """
+    Удаляет записи старше older_than, для объектов которых есть более
+    поздняя запись. Для каждого объекта остается последнее состояние,
+    поэтому клиент с любым курсором по-прежнему получает актуальные данные.
+    Возвращает число удаленных записей.
+    """
+    newer = ChangeLogEntry.objects.filter(
+        model_name=OuterRef("model_name"),
+        object_id=OuterRef("object_id"),
+        id__gt=OuterRef("id"),
+    )
+    deleted, _ = (
+        ChangeLogEntry.objects.filter(created_at__lt=older_than)
+        .filter(Exists(newer))
+        .delete()
+    )
+    return deleted
@@ -0,0 +1,91 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+
+from retail_chain.changes import record_changes
+from retail_chain.hierarchy import invalidate_subtree_products
+from retail_chain.models import Company, Product
+from retail_chain.summaries import refresh_company_products
+
+
+def companies_products_changed(company_ids):
+    """
+    Массовые INSERT и DELETE по таблице связи не отправляют m2m_changed,
+    поэтому журнал изменений, сводки и кэш продуктов цепочек обновляются
+    явно. Снимки для журнала записываются частями по
+    COMPANY_PRODUCTS_BATCH_SIZE компаний, сводки обновляются одним
+    пересчетом числа продуктов в базе.
+    """
+    size = getattr(settings, "COMPANY_PRODUCTS_BATCH_SIZE", 1000)
+    for start in range(0, len(company_ids), size):
+        record_changes(Company, company_ids[start : start + size])
+    refresh_company_products(company_ids)
+    if company_ids:
+        transaction.on_commit(invalidate_subtree_products)
+
+
+def add_company_products(companies, product_ids):
+    """
+    Добавляет продукты product_ids всем компаниям queryset companies одним
+    INSERT ... SELECT в таблицу связи Company.products, существующие связи
+    пропускаются (ON CONFLICT DO NOTHING). Список компаний не передается
+    в базу параметрами, а подставляется подзапросом. Измененные компании
+    возвращает сам INSERT (RETURNING), в PostgreSQL - сгруппированными,
+    по строке на компанию.
+    Возвращает (добавлено связей, число измененных компаний).
+    """
+    product_ids = sorted(set(product_ids))
+    through = Company.products.through
+    qn = connection.ops.quote_name
+    company_column = qn(through._meta.get_field("company").column)
+    company_sql, company_params = (
+        companies.order_by().values("pk").query.sql_with_params()
+    )
+    insert_sql = (
+        f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} "
+        f"{qn(through._meta.db_table)} "
+        f"({company_column}, {qn(through._meta.get_field('product').column)}) "
+        f"SELECT c.{qn(Company._meta.pk.column)}, p.{qn(Product._meta.pk.column)} "
+        f"FROM {qn(Company._meta.db_table)} c, {qn(Product._meta.db_table)} p "
+        f"WHERE c.{qn(Company._meta.pk.column)} IN ({company_sql}) "
+        f"AND p.{qn(Product._meta.pk.column)} IN "
+        f"({', '.join(['%s'] * len(product_ids))}) "
+        f"{connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])} "
+        f"RETURNING {company_column}"
+    )
+    if connection.vendor == "postgresql":
+        sql = (
+            f"WITH inserted AS ({insert_sql}) "
+            f"SELECT {company_column}, COUNT(*) FROM inserted "
+            f"GROUP BY {company_column}"
+        )
+    else:
+        sql = insert_sql
+    links = Counter()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (*company_params, *product_ids))
+            for company_id, *count in cursor:
+                links[company_id] += count[0] if count else 1
+        changed = sorted(links)
+        companies_products_changed(changed)
+    return links.total(), len(changed)
+
+
+def remove_company_products(companies, product_ids):
+    """
+    Удаляет связи компаний queryset companies с продуктами product_ids
+    одним DELETE по таблице связи.
+    Возвращает (удалено связей, число измененных компаний).
+    """
+    through = Company.products.through
+    links = through.objects.filter(
+        company_id__in=companies.order_by().values("pk"), product_id__in=product_ids
+    )
+    with transaction.atomic():
+        changed = list(links.order_by().values_list("company_id", flat=True).distinct())
+        deleted, _ = links.delete()
+        companies_products_changed(changed)
+    return deleted, len(changed)
@@ -0,0 +1,214 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+READ = "read"
+HEAVY = "heavy"
+WRITE = "write"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+DEFAULT_LIMITS = {
+    READ: {"initial": 20, "min": 4, "max": 200},
+    HEAVY: {"initial": 4, "min": 1, "max": 20},
+    WRITE: {"initial": 10, "min": 2, "max": 50},
+}
+
+# Дорогие запросы: отчеты, фасеты, пакетные запросы и массовые операции
+DEFAULT_HEAVY_PATHS = (
+    r"^/companies/(debt|facets)/",
+    r"^/companies/\d+/chain/",
+    r"^/analytics/",
+    r"^/changes/",
+    r"^/batch/",
+    r"^/contacts/lookup/",
+    r"^/users/bulk-register/",
+)
+
+DEFAULT_EXEMPT_PATHS = ("/monitoring/", "/static/", "/media/")
+
+
+class ConcurrencyLimiter:
+    """
+    Адаптивный лимит одновременных запросов одного класса в процессе.
+
+    Скользящие средние времени ответа: короткая (текущее состояние)
+    и длинная (обычное время ответа). Пока короткая не превышает длинную
+    больше чем в tolerance раз, а лимит используется хотя бы наполовину,
+    лимит растет на sqrt(лимит) за ответ. Когда ответы замедляются, лимит
+    уменьшается пропорционально (не более чем вдвое за ответ), и лишние
+    запросы отклоняются сразу, а не ждут в очереди к базе данных.
+    """
+
+    short_alpha = 0.2
+    long_alpha = 0.02
+    smoothing = 0.2
+    tolerance = 1.5
+
+    def __init__(self, name, initial=10, min=1, max=100):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min
+        self.max_limit = max
+        self.inflight = 0
+        self.short_latency = None
+        self.long_latency = None
+        self.accepted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Занимает место для запроса. Возвращает число выполнявшихся запросов
+        или None, если лимит исчерпан.
+        """
+        with self._lock:
+            if self.inflight >= int(self.limit):
+                self.rejected += 1
+                return None
+            inflight = self.inflight
+            self.inflight += 1
+            self.accepted += 1
+            return inflight
+
+    def release(self, latency, inflight):
+        """
+        Освобождает место и пересчитывает лимит по времени ответа latency
+        (секунды) запроса, который начинался при inflight выполнявшихся.
+        """
+        with self._lock:
+            self.inflight -= 1
+            if self.short_latency is None:
+                self.short_latency = self.long_latency = latency
+                return
+            self.short_latency += (latency - self.short_latency) * self.short_alpha
+            self.long_latency += (latency - self.long_latency) * self.long_alpha
+            if self.long_latency > 2 * self.short_latency:
+                # Обычное время ответа подтягивается вниз после перегрузки
+                self.long_latency *= 0.95
+
+            gradient = max(
+                0.5,
+                min(1.0, self.tolerance * self.long_latency / self.short_latency),
+            )
+            if gradient == 1.0 and inflight < self.limit / 2:
+                # Лимит не используется: нечем подтвердить, что его можно поднять
+                return
+            new_limit = self.limit * gradient
+            if gradient == 1.0:
+                new_limit += math.sqrt(self.limit)
+            self.limit += (new_limit - self.limit) * self.smoothing
+            self.limit = min(self.max_limit, max(self.min_limit, self.limit))
+
+    def retry_after(self):
+        """
+        Через сколько секунд стоит повторить отклоненный запрос.
+        """
+        return max(1, math.ceil(self.short_latency or 0))
+
+    def state(self):
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "inflight": self.inflight,
+                "latency_ms": (
+                    round(self.short_latency * 1000, 1)
+                    if self.short_latency is not None
+                    else None
+                ),
+                "baseline_latency_ms": (
+                    round(self.long_latency * 1000, 1)
+                    if self.long_latency is not None
+                    else None
+                ),
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limits = getattr(settings, "CONCURRENCY_LIMITS", DEFAULT_LIMITS)
+                limiter = _limiters[name] = ConcurrencyLimiter(name, **limits[name])
+    return limiter
+
+
+def get_limiter_state():
+    """
+    Состояние ограничителей текущего процесса для мониторинга.
+    """
+    limits = getattr(settings, "CONCURRENCY_LIMITS", DEFAULT_LIMITS)
+    return {
+        "pid": os.getpid(),
+        "classes": {name: get_limiter(name).state() for name in limits},
+    }
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    Ограничение одновременных запросов с отдельным адаптивным лимитом
+    для каждого класса запросов: read - дешевое чтение, heavy - поиск,
+    отчеты и массовые операции, write - изменение данных. Запросы сверх
+    лимита сразу получают 503 с заголовком Retry-After. Медленные дорогие
+    запросы упираются в свой лимит и не занимают места дешевых, поэтому
+    /products/<id>/ отвечает, даже когда отчеты отклоняются.
+    Лимиты действуют в пределах процесса и имеют смысл при нескольких
+    потоках на процесс (gunicorn --threads, ASGI).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.heavy_paths = re.compile(
+            "|".join(getattr(settings, "CONCURRENCY_HEAVY_PATHS", DEFAULT_HEAVY_PATHS))
+        )
+        self.exempt_paths = tuple(
+            getattr(settings, "CONCURRENCY_EXEMPT_PATHS", DEFAULT_EXEMPT_PATHS)
+        )
+
+    def classify(self, request):
+        if request.path_info.startswith(self.exempt_paths):
+            return None
+        if self.heavy_paths.match(request.path_info) or request.GET.get("search"):
+            return HEAVY
+        if request.method in SAFE_METHODS:
+            return READ
+        return WRITE
+
+    def __call__(self, request):
+        route_class = self.classify(request)
+        if route_class is None:
+            return self.get_response(request)
+
+        limiter = get_limiter(route_class)
+        inflight = limiter.acquire()
+        if inflight is None:
+            response = HttpResponse(
+                json.dumps(
+                    {"detail": "Сервер перегружен, повторите запрос позже."},
+                    ensure_ascii=False,
+                ),
+                content_type="application/json",
+                status=503,
+            )
+            response["Retry-After"] = str(limiter.retry_after())
+            return response
+
+        started = time.monotonic()
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release(time.monotonic() - started, inflight)
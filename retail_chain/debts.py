@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models import Value, When
+from rest_framework.exceptions import ValidationError
+
+from retail_chain.models import Contacts, ExchangeRate
+from retail_chain.versions import bump_version, get_version
+
+DEBT_TOTALS_VERSION_KEY = "retail_chain:debt_totals:version"
+
+# Группировки отчета: параметр group_by -> поле values()
+GROUP_BY_FIELDS = {
+    "supplier": "supplier_id",
+    "level": "level",
+    "country": "country",
+}
+
+CENT = Decimal("0.01")
+FACTOR_FIELD = DecimalField(max_digits=30, decimal_places=10)
+
+
+def get_base_currency():
+    return getattr(settings, "DEBT_BASE_CURRENCY", "RUB")
+
+
+def get_rates():
+    """
+    Курсы валют к базовой валюте, у базовой валюты курс 1.
+    """
+    rates = dict(ExchangeRate.objects.values_list("currency", "rate"))
+    rates.setdefault(get_base_currency(), Decimal(1))
+    return rates
+
+
+def get_debt_totals_version():
+    return get_version(DEBT_TOTALS_VERSION_KEY)
+
+
+def invalidate_debt_totals():
+    """
+    Сбрасывает кэш отчетов по задолженности сменой версии ключей.
+    Вызывается при изменении компаний, контактов (страна) и курсов.
+    """
+    bump_version(DEBT_TOTALS_VERSION_KEY)
+
+
+def aggregate_debts(queryset, group_by, currency):
+    """
+    Суммарная задолженность компаний queryset по группам group_by
+    в валюте currency. Пересчет и суммирование выполняются в базе данных
+    одним запросом с группировкой по (группа, валюта): курс подставляется
+    выражением CASE по debt_currency. В Python складываются только итоги
+    групп по валютам. Валюты без курса попадают в missing_rates и в итог
+    не входят, как и валюты с нулевым курсом, записанным до появления
+    проверки курса в базе данных.
+    """
+    rates = {code: rate for code, rate in get_rates().items() if rate > 0}
+    if currency not in rates:
+        raise ValidationError({"currency": f"Нет курса для валюты {currency}"})
+    if group_by not in GROUP_BY_FIELDS:
+        raise ValidationError(
+            {"group_by": f"Допустимые значения: {', '.join(GROUP_BY_FIELDS)}"}
+        )
+
+    field = GROUP_BY_FIELDS[group_by]
+    queryset = queryset.order_by()
+    if group_by == "country":
+        # Страна первой контактной записи, чтобы компания с несколькими
+        # контактами не учитывалась дважды
+        queryset = queryset.annotate(
+            country=Subquery(
+                Contacts.objects.filter(company=OuterRef("pk"))
+                .order_by("pk")
+                .values("country")[:1]
+            )
+        )
+    factor = Case(
+        *(
+            When(debt_currency=code, then=Value(rate / rates[currency]))
+            for code, rate in rates.items()
+        ),
+        output_field=FACTOR_FIELD,
+    )
+    rows = queryset.values(field, "debt_currency").annotate(
+        amount=Sum("debt"),
+        converted=Sum(F("debt") * factor, output_field=FACTOR_FIELD),
+        companies=Count("pk"),
+    )
+
+    groups = {}
+    missing_rates = set()
+    for row in rows:
+        group = groups.setdefault(
+            row[field],
+            {"group": row[field], "total": Decimal(0), "companies": 0, "by_currency": {}},
+        )
+        group["companies"] += row["companies"]
+        group["by_currency"][row["debt_currency"]] = str(row["amount"].quantize(CENT))
+        if row["debt_currency"] in rates:
+            group["total"] += row["converted"]
+        else:
+            missing_rates.add(row["debt_currency"])
+
+    results = sorted(
+        groups.values(), key=lambda group: (group["group"] is None, group["group"])
+    )
+    for group in results:
+        group["total"] = str(group["total"].quantize(CENT))
+    return {
+        "currency": currency,
+        "group_by": group_by,
+        "results": results,
+        "missing_rates": sorted(missing_rates),
+    }
+
+
+def get_debt_totals(queryset, group_by, currency, scope):
+    """
+    Отчет aggregate_debts из кэша. scope - ключ области видимости queryset
+    (владелец или все записи), чтобы пользователи не видели чужие итоги.
+    """
+    key = (
+        f"retail_chain:debt_totals:{get_debt_totals_version()}:"
+        f"{scope}:{group_by}:{currency}"
+    )
+    report = cache.get(key)
+    if report is None:
+        report = aggregate_debts(queryset, group_by, currency)
+        cache.set(
+            key,
+            report,
+            timeout=getattr(settings, "DEBT_TOTALS_CACHE_TIMEOUT", 60 * 60),
+        )
+    return report
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from retail_chain.models import Company
+
+# Имя в ?expand= -> (поле модели Company, способ загрузки, допускает вложенность)
+EXPANDABLE_RELATIONS = {
+    "supplier": ("supplier", "select", True),
+    "contacts": ("company_contacts", "prefetch", False),
+    "products": ("products", "prefetch", False),
+}
+
+EXPAND_MAX_DEPTH_DEFAULT = 3
+
+
+def get_expand_max_depth():
+    return getattr(settings, "EXPAND_MAX_DEPTH", EXPAND_MAX_DEPTH_DEFAULT)
+
+
+def parse_expand(value, max_depth=None):
+    """
+    Разбирает параметр ?expand=supplier.supplier,contacts в дерево вида
+    {"supplier": {"supplier": {}}, "contacts": {}}.
+    Неизвестные связи и превышение глубины возвращают ошибку 400.
+    """
+    if max_depth is None:
+        max_depth = get_expand_max_depth()
+    tree = {}
+    if not value:
+        return tree
+    for path in value.split(","):
+        path = path.strip()
+        if not path:
+            continue
+        parts = path.split(".")
+        if len(parts) > max_depth:
+            raise ValidationError(
+                {"expand": f"Максимальная глубина раскрытия - {max_depth}: {path}"}
+            )
+        node = tree
+        for index, part in enumerate(parts):
+            if part not in EXPANDABLE_RELATIONS:
+                raise ValidationError({"expand": f"Неизвестная связь: {part}"})
+            nested = EXPANDABLE_RELATIONS[part][2]
+            if not nested and index < len(parts) - 1:
+                raise ValidationError(
+                    {"expand": f"Связь {part} не поддерживает вложенное раскрытие"}
+                )
+            node = node.setdefault(part, {})
+    return tree
+
+
+def build_prefetch_plan(tree, prefix=""):
+    """
+    Строит план загрузки для дерева раскрытия: списки путей для
+    select_related и prefetch_related. Число запросов зависит только
+    от дерева раскрытия, но не от количества компаний на странице.
+    Для каждого выводимого уровня компаний подгружаются products,
+    иначе список их идентификаторов дает по запросу на компанию.
+    """
+    select_related = []
+    prefetch_related = [f"{prefix}products"]
+    for name, subtree in tree.items():
+        field_name, strategy, _ = EXPANDABLE_RELATIONS[name]
+        path = f"{prefix}{field_name}"
+        if strategy == "select":
+            select_related.append(path)
+            nested_select, nested_prefetch = build_prefetch_plan(
+                subtree, prefix=f"{path}__"
+            )
+            select_related.extend(nested_select)
+            prefetch_related.extend(nested_prefetch)
+        elif path not in prefetch_related:
+            prefetch_related.append(path)
+    return select_related, prefetch_related
+
+
+def build_owner_prefetches(tree, owner):
+    """
+    План загрузки для пользователя, который видит только свои записи:
+    все связи загружаются prefetch_related с queryset, ограниченным
+    владельцем owner, вложенные компании - рекурсивно. Поставщик другого
+    владельца выводится как null, его контакты и продукты не выводятся.
+    Число запросов по-прежнему зависит только от дерева раскрытия.
+    """
+    field_names = dict.fromkeys(
+        ["products", *(EXPANDABLE_RELATIONS[name][0] for name in tree)]
+    )
+    prefetches = []
+    for field_name in field_names:
+        model = Company._meta.get_field(field_name).related_model
+        queryset = model.objects.filter(owner=owner)
+        if model is Company:
+            queryset = queryset.prefetch_related(
+                *build_owner_prefetches(tree["supplier"], owner)
+            )
+        prefetches.append(Prefetch(field_name, queryset=queryset))
+    return prefetches
+
+
+def apply_expand(queryset, tree, owner=None):
+    """
+    Подгружает связи дерева раскрытия. owner - владелец записей, видимых
+    пользователю (None - все записи): связанные записи других владельцев
+    не раскрываются.
+    """
+    if owner is not None:
+        return queryset.prefetch_related(*build_owner_prefetches(tree, owner))
+    select_related, prefetch_related = build_prefetch_plan(tree)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
@@ -0,0 +1,111 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
+
+from retail_chain.models import Contacts
+from retail_chain.versions import bump_version, get_version
+
+FACETS_VERSION_KEY = "retail_chain:facets:version"
+
+# Фасеты по полям компании и по полям контактов
+COMPANY_FACETS = ("level", "type")
+CONTACT_FACETS = ("country", "city")
+FACETS = CONTACT_FACETS + COMPANY_FACETS
+
+
+def get_facets_version():
+    return get_version(FACETS_VERSION_KEY)
+
+
+def invalidate_facets():
+    """
+    Сбрасывает кэш фасетов сменой версии ключей.
+    Вызывается при изменении компаний и контактов.
+    """
+    bump_version(FACETS_VERSION_KEY)
+
+
+def parse_facet_filters(params):
+    """
+    Активные фильтры фасетов из параметров запроса.
+    """
+    filters = {name: params[name] for name in FACETS if params.get(name)}
+    if "level" in filters:
+        try:
+            filters["level"] = int(filters["level"])
+        except ValueError:
+            raise ValidationError({"level": "Должно быть числом"})
+    return filters
+
+
+def _lookups(filters, names, prefix="", exclude=None):
+    return {
+        f"{prefix}{name}": filters[name]
+        for name in names
+        if name in filters and name != exclude
+    }
+
+
+def _companies(queryset, filters, exclude=None):
+    # Фильтры по контактам передаются одним вызовом filter(),
+    # чтобы страна и город относились к одному контакту
+    queryset = queryset.filter(**_lookups(filters, COMPANY_FACETS, exclude=exclude))
+    contact_lookups = _lookups(
+        filters, CONTACT_FACETS, prefix="company_contacts__", exclude=exclude
+    )
+    if contact_lookups:
+        queryset = queryset.filter(**contact_lookups).distinct()
+    return queryset
+
+
+def compute_facets(queryset, filters):
+    """
+    Число компаний по странам, городам, уровням и типам. Каждый фасет
+    считается с учетом всех активных фильтров, кроме собственного, чтобы
+    в нем оставались доступными другие значения. Компания с контактами
+    в нескольких городах учитывается в каждом из них.
+    """
+    queryset = queryset.order_by()
+    result = {"total": _companies(queryset, filters).count()}
+    for name in COMPANY_FACETS:
+        rows = (
+            _companies(queryset, filters, exclude=name)
+            .values(name)
+            .annotate(count=Count("pk", distinct=True))
+            .order_by("-count", name)
+        )
+        result[name] = [{"value": row[name], "count": row["count"]} for row in rows]
+    companies = queryset.filter(**_lookups(filters, COMPANY_FACETS))
+    for name in CONTACT_FACETS:
+        rows = (
+            Contacts.objects.filter(
+                company__in=companies.values("pk"),
+                **_lookups(filters, CONTACT_FACETS, exclude=name),
+            )
+            .exclude(**{f"{name}__isnull": True})
+            .values(name)
+            .annotate(count=Count("company_id", distinct=True))
+            .order_by("-count", name)
+        )
+        result[name] = [{"value": row[name], "count": row["count"]} for row in rows]
+    return result
+
+
+def get_facets(queryset, filters, scope):
+    """
+    Фасеты из кэша. scope - ключ области видимости queryset
+    (владелец или все записи).
+    """
+    digest = hashlib.md5(urlencode(sorted(filters.items())).encode()).hexdigest()
+    key = f"retail_chain:facets:{get_facets_version()}:{scope}:{digest}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset, filters)
+        cache.set(
+            key, facets, timeout=getattr(settings, "FACETS_CACHE_TIMEOUT", 60 * 60)
+        )
+    return facets
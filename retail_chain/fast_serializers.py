@@ -0,0 +1,140 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+# Представления полей, которые возвращают значение из базы данных без изменений
+IDENTITY_REPRESENTATIONS = (
+    serializers.CharField.to_representation,
+    serializers.IntegerField.to_representation,
+)
+
+
+class ValuesListSerializer:
+    """
+    Быстрый сериализатор только для чтения, построенный по ModelSerializer.
+    Вместо экземпляров модели работает с кортежами values_list() и
+    заранее подготовленными преобразователями полей, а результат совпадает
+    с выводом исходного сериализатора.
+    Поддерживаются обычные поля модели (включая MoneyField и DateTimeField
+    с DATETIME_FORMAT), внешние ключи и списки ключей ManyToMany.
+    """
+
+    _cache = {}
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        self.model = model
+        self.columns = []
+        self.getters = []
+        self.many_to_many = []
+        for field in serializer._readable_fields:
+            getter = self._compile_field(model, field)
+            if getter is not None:
+                self.getters.append((field.field_name, getter))
+
+    @classmethod
+    def for_serializer_class(cls, serializer_class):
+        """
+        Возвращает подготовленный сериализатор или None,
+        если в сериализаторе есть поля, которые нельзя вывести из values_list().
+        """
+        if serializer_class not in cls._cache:
+            try:
+                cls._cache[serializer_class] = cls(serializer_class())
+            except NotImplementedError:
+                cls._cache[serializer_class] = None
+        return cls._cache[serializer_class]
+
+    def _column_index(self, attname):
+        if attname not in self.columns:
+            self.columns.append(attname)
+        return self.columns.index(attname)
+
+    def _compile_field(self, model, field):
+        source = field.source
+        if source == "*" or "." in source:
+            raise NotImplementedError(source)
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            if hasattr(model, source):
+                raise NotImplementedError(source)
+            # Обычный сериализатор пропускает такие поля (SkipField)
+            return None
+
+        if isinstance(field, ManyRelatedField):
+            if not (
+                model_field.many_to_many
+                and isinstance(field.child_relation, PrimaryKeyRelatedField)
+                and field.child_relation.pk_field is None
+            ):
+                raise NotImplementedError(source)
+            self.many_to_many.append((source, model_field))
+            pk_index = self._column_index(model._meta.pk.attname)
+            return lambda row, related: related[source].get(row[pk_index], [])
+
+        if isinstance(field, PrimaryKeyRelatedField):
+            if not model_field.many_to_one or field.pk_field is not None:
+                raise NotImplementedError(source)
+            return self._column_getter(self._column_index(model_field.attname), None)
+
+        if (
+            isinstance(field, (serializers.BaseSerializer, serializers.RelatedField))
+            or not model_field.concrete
+            or model_field.is_relation
+        ):
+            raise NotImplementedError(source)
+
+        convert = field.to_representation
+        if type(field).to_representation in IDENTITY_REPRESENTATIONS:
+            convert = None
+        return self._column_getter(self._column_index(model_field.attname), convert)
+
+    @staticmethod
+    def _column_getter(index, convert):
+        if convert is None:
+            return lambda row, related: row[index]
+
+        def get(row, related):
+            value = row[index]
+            return None if value is None else convert(value)
+
+        return get
+
+    def values_list(self, queryset):
+        """
+        Переводит queryset в кортежи с нужными колонками.
+        """
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .values_list(*self.columns)
+        )
+
+    def _load_many_to_many(self, rows):
+        related = {}
+        if not self.many_to_many:
+            return related
+        pk_index = self.columns.index(self.model._meta.pk.attname)
+        pks = [row[pk_index] for row in rows]
+        for source, model_field in self.many_to_many:
+            through = model_field.remote_field.through
+            source_attname = through._meta.get_field(model_field.m2m_field_name()).attname
+            target_attname = through._meta.get_field(
+                model_field.m2m_reverse_field_name()
+            ).attname
+            links = (
+                through.objects.filter(**{f"{source_attname}__in": pks})
+                .order_by("pk")
+                .values_list(source_attname, target_attname)
+            )
+            values = related[source] = {}
+            for pk, target in links:
+                values.setdefault(pk, []).append(target)
+        return related
+
+    def serialize(self, rows):
+        rows = list(rows)
+        related = self._load_many_to_many(rows)
+        getters = self.getters
+        return [{name: get(row, related) for name, get in getters} for row in rows]
@@ -0,0 +1,433 @@
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from retail_chain.models import Company
+from retail_chain.versions import (
+    get_version,
+    get_versioned_changes,
+    record_versioned_change,
+)
+
+logger = logging.getLogger(__name__)
+
+GRAPH_VERSION_KEY = "retail_chain:supplier_graph:version"
+
+
+def record_company_change(company_id):
+    """
+    Отмечает изменение компании (создание, смена поставщика, удаление)
+    для инкрементального обновления графа. Если номер версии потерян,
+    графы во всех процессах перезагрузятся полностью.
+    """
+    record_versioned_change(
+        GRAPH_VERSION_KEY,
+        company_id,
+        timeout=getattr(settings, "SUPPLIER_GRAPH_CHANGES_TIMEOUT", 60 * 60),
+    )
+
+
+SupplierGraphArrays = namedtuple(
+    "SupplierGraphArrays", "ids suppliers parent depths tin tout order"
+)
+
+
+class SupplierGraph:
+    """
+    Лес поставщиков Company в компактных массивах для частых запросов
+    по иерархии без обращения к базе данных.
+
+    Узлы хранятся по возрастанию id компании, индекс узла ищется бинарным
+    поиском. Для каждого узла хранятся id, id поставщика, индекс родителя,
+    глубина и интервал обхода в глубину [tin, tout): потомки узла занимают
+    непрерывный отрезок order[tin + 1:tout]. Отсюда:
+        depth, is_upstream - O(log n),
+        descendants - O(log n + k), ancestors - O(log n + глубина).
+
+    Циклы в данных (поставщик ссылается на потомка) разрываются:
+    одна из компаний цикла считается корнем.
+
+    Изменения применяются к копиям массивов (см. _patch): перенос
+    поддерева обходит только отрезок order между его старым и новым
+    местом, полное перестроение - при удалении компании или цикле.
+
+    Память: 8 + 8 + 4 * 5 = 36 байт на компанию, около 36 МБ на миллион
+    компаний, и примерно столько же временно при изменении или перестроении.
+    """
+
+    def __init__(self):
+        # Массивы заменяются одним присваиванием, чтобы запросы из других
+        # потоков не видели граф в середине перестроения
+        self.arrays = SupplierGraphArrays(*(array(code) for code in "qqiiiii"))
+        self.version = None
+        # В массивах есть разорванный цикл: корень с поставщиком
+        self.has_cycles = False
+        # _lock - одно перестроение за раз, _thread - фоновое перестроение
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.arrays.ids)
+
+    def __contains__(self, company_id):
+        return self._find(self.arrays.ids, company_id) >= 0
+
+    @property
+    def memory_size(self):
+        """
+        Размер массивов в байтах.
+        """
+        return sum(len(values) * values.itemsize for values in self.arrays)
+
+    def _build(self, rows):
+        """
+        Перестраивает массивы по парам (id компании, id поставщика).
+        """
+        rows = sorted(rows)
+        n = len(rows)
+        ids = array("q", (company_id for company_id, _ in rows))
+        suppliers = array("q", (supplier_id or 0 for _, supplier_id in rows))
+
+        # Индексы поставщиков и списки детей в сжатом виде (CSR)
+        supplier_index = array("i", [-1]) * n
+        child_count = array("i", [0]) * (n + 1)
+        for i in range(n):
+            j = self._find(ids, suppliers[i]) if suppliers[i] else -1
+            supplier_index[i] = j
+            if j >= 0:
+                child_count[j + 1] += 1
+        for i in range(n):
+            child_count[i + 1] += child_count[i]
+        children = array("i", [0]) * n
+        fill = array("i", child_count[:n])
+        for i in range(n):
+            j = supplier_index[i]
+            if j >= 0:
+                children[fill[j]] = i
+                fill[j] += 1
+
+        parent = array("i", [-1]) * n
+        depths = array("i", [0]) * n
+        tin = array("i", [-1]) * n
+        order = array("i", [0]) * n
+        counter = 0
+
+        def visit(start):
+            nonlocal counter
+            stack = [start]
+            while stack:
+                v = stack.pop()
+                tin[v] = counter
+                order[counter] = v
+                counter += 1
+                for c in children[child_count[v] : child_count[v + 1]]:
+                    if tin[c] < 0:
+                        parent[c] = v
+                        depths[c] = depths[v] + 1
+                        stack.append(c)
+
+        for i in range(n):
+            if supplier_index[i] < 0:
+                visit(i)
+        has_cycles = False
+        for i in range(n):
+            if tin[i] >= 0:
+                continue
+            has_cycles = True
+            # Узел не достижим от корней, значит выше него цикл:
+            # поднимаемся до первой повторной компании и разрываем цикл на ней
+            seen = set()
+            v = i
+            while v not in seen:
+                seen.add(v)
+                v = supplier_index[v]
+            visit(v)
+
+        sizes = array("i", [1]) * n
+        for position in range(n - 1, -1, -1):
+            v = order[position]
+            if parent[v] >= 0:
+                sizes[parent[v]] += sizes[v]
+        tout = array("i", (tin[v] + sizes[v] for v in range(n)))
+
+        self.arrays = SupplierGraphArrays(
+            ids, suppliers, parent, depths, tin, tout, order
+        )
+        self.has_cycles = has_cycles
+
+    @staticmethod
+    def _find(ids, company_id):
+        i = bisect_left(ids, company_id)
+        if i < len(ids) and ids[i] == company_id:
+            return i
+        return -1
+
+    @classmethod
+    def _index(cls, arrays, company_id):
+        i = cls._find(arrays.ids, company_id)
+        if i < 0:
+            raise KeyError(company_id)
+        return i
+
+    def load(self):
+        """
+        Полная загрузка из базы данных.
+        """
+        version = get_version(GRAPH_VERSION_KEY)
+        self._build(Company.objects.values_list("id", "supplier_id").iterator())
+        self.version = version
+
+    def refresh(self, wait=False):
+        """
+        Обновляет граф по маркеру изменений: читает из базы только
+        измененные компании и переносит их поддеревья в массивах (_patch).
+        Если изменений слишком много или часть отметок потеряна,
+        выполняется полная загрузка.
+
+        Первая загрузка выполняется сразу. Дальше граф перестраивается
+        в фоновом потоке (SUPPLIER_GRAPH_BACKGROUND_REFRESH), а запросы
+        до замены массивов отвечают по предыдущей версии графа.
+        wait=True - дождаться актуального графа в текущем потоке.
+        """
+        if self.version is not None and cache.get(GRAPH_VERSION_KEY) == self.version:
+            return
+        if (
+            self.version is None
+            or wait
+            or not getattr(settings, "SUPPLIER_GRAPH_BACKGROUND_REFRESH", True)
+        ):
+            with self._lock:
+                self._refresh()
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._refresh_in_background,
+                name="supplier-graph-refresh",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _refresh_in_background(self):
+        try:
+            with self._lock:
+                self._refresh()
+        except Exception:
+            logger.exception("Ошибка обновления графа поставщиков")
+        finally:
+            # Соединения с базой данных привязаны к потоку
+            connections.close_all()
+
+    def _refresh(self):
+        current, changed_ids = get_versioned_changes(
+            GRAPH_VERSION_KEY,
+            self.version,
+            getattr(settings, "SUPPLIER_GRAPH_MAX_INCREMENTAL", 1000),
+        )
+        if changed_ids is None:
+            self.load()
+            return
+        if current == self.version:
+            return
+
+        rows = dict(
+            Company.objects.filter(pk__in=changed_ids).values_list("id", "supplier_id")
+        )
+        arrays = self._patch(self.arrays, changed_ids, rows)
+        if arrays is None:
+            # Удаление компании или цикл: перестроение по текущим массивам
+            merged = {
+                company_id: supplier_id or None
+                for company_id, supplier_id in zip(
+                    self.arrays.ids, self.arrays.suppliers
+                )
+                if company_id not in changed_ids
+            }
+            merged.update(rows)
+            self._build(merged.items())
+        else:
+            self.arrays = arrays
+        self.version = current
+
+    def _patch(self, arrays, changed_ids, rows):
+        """
+        Применяет изменения к копии массивов без полного перестроения.
+        rows - текущие (id компании, id поставщика) из changed_ids,
+        отсутствующие в rows компании удалены.
+
+        Новые компании с id больше имеющихся дописываются в конец,
+        поддерево компании со сменившимся поставщиком переносится
+        (см. _move): работа пропорциональна отрезку обхода между старым
+        и новым местом поддерева, а не числу компаний. Если ни один
+        поставщик не изменился, возвращаются те же массивы.
+
+        Возвращает None, если нужна полная перестройка: удалена компания,
+        id новой компании меньше имеющихся, смена поставщика образует
+        цикл или в массивах уже есть разорванный цикл (has_cycles): его
+        корень сохраняет поставщика, и изменение другой компании цикла
+        должно снова присоединить корень к поставщику.
+        """
+        ids = arrays.ids
+        created, moved = [], []
+        for company_id in sorted(changed_ids):
+            i = self._find(ids, company_id)
+            if company_id not in rows:
+                if i >= 0:
+                    return None
+                continue
+            supplier_id = rows[company_id] or 0
+            if i < 0:
+                created.append(company_id)
+                if supplier_id:
+                    moved.append((company_id, supplier_id))
+            elif arrays.suppliers[i] != supplier_id:
+                moved.append((company_id, supplier_id))
+        if not created and not moved:
+            return arrays
+        if self.has_cycles:
+            return None
+        if created and ids and created[0] < ids[-1]:
+            return None
+
+        # Копии, чтобы запросы из других потоков не видели частичных изменений
+        arrays = SupplierGraphArrays(
+            *(
+                values if values is ids and not created else values[:]
+                for values in arrays
+            )
+        )
+        for company_id in created:
+            # Новая компания - корень в конце обхода, поставщик ниже
+            n = len(arrays.ids)
+            arrays.ids.append(company_id)
+            arrays.suppliers.append(0)
+            arrays.parent.append(-1)
+            arrays.depths.append(0)
+            arrays.tin.append(n)
+            arrays.tout.append(n + 1)
+            arrays.order.append(n)
+        for company_id, supplier_id in moved:
+            v = self._find(arrays.ids, company_id)
+            p = self._find(arrays.ids, supplier_id) if supplier_id else -1
+            if (supplier_id and p < 0) or not self._move(arrays, v, p):
+                return None
+            arrays.suppliers[v] = supplier_id
+        return arrays
+
+    @staticmethod
+    def _move(arrays, v, p):
+        """
+        Переносит поддерево узла v в конец детей узла p (p = -1 - в корни).
+        Отрезок обхода поддерева переставляется в order, tin пересчитывается
+        только для отрезка между старым и новым местом, tout - для него
+        и предков старого и нового поставщика, глубины - для поддерева.
+        Возвращает False, если p внутри поддерева v.
+        """
+        parent, depths, tin, tout, order = arrays[2:]
+        a, b = tin[v], tout[v]
+        if p >= 0 and a <= tin[p] < b:
+            return False
+        size = b - a
+        q = tout[p] if p >= 0 else len(order)
+        lo, hi = (a, q) if q >= b else (q, b)
+
+        # Размеры поддеревьев до изменения tin и tout
+        sizes = {}
+        u = parent[v]
+        while u >= 0:
+            sizes[u] = tout[u] - tin[u] - size
+            u = parent[u]
+        u = p
+        while u >= 0:
+            sizes[u] = sizes.get(u, tout[u] - tin[u]) + size
+            u = parent[u]
+        for position in range(lo, hi):
+            u = order[position]
+            if u not in sizes:
+                sizes[u] = tout[u] - tin[u]
+
+        block = order[a:b]
+        if q >= b:
+            order[a:q] = order[b:q] + block
+        else:
+            order[q:b] = block + order[q:a]
+        for position in range(lo, hi):
+            tin[order[position]] = position
+        for u, subtree_size in sizes.items():
+            tout[u] = tin[u] + subtree_size
+
+        delta = (depths[p] + 1 if p >= 0 else 0) - depths[v]
+        if delta:
+            for u in order[tin[v] : tin[v] + size]:
+                depths[u] += delta
+        parent[v] = p
+        return True
+
+    def depth(self, company_id):
+        arrays = self.arrays
+        return arrays.depths[self._index(arrays, company_id)]
+
+    def supplier(self, company_id):
+        arrays = self.arrays
+        v = arrays.parent[self._index(arrays, company_id)]
+        return arrays.ids[v] if v >= 0 else None
+
+    def ancestors(self, company_id):
+        """
+        Поставщики компании снизу вверх, до корня.
+        """
+        arrays = self.arrays
+        result = []
+        v = arrays.parent[self._index(arrays, company_id)]
+        while v >= 0:
+            result.append(arrays.ids[v])
+            v = arrays.parent[v]
+        return result
+
+    def descendants(self, company_id):
+        """
+        Все звенья ниже компании в порядке обхода в глубину.
+        """
+        arrays = self.arrays
+        v = self._index(arrays, company_id)
+        return [arrays.ids[i] for i in arrays.order[arrays.tin[v] + 1 : arrays.tout[v]]]
+
+    def descendants_count(self, company_id):
+        arrays = self.arrays
+        v = self._index(arrays, company_id)
+        return arrays.tout[v] - arrays.tin[v] - 1
+
+    def is_upstream(self, upstream_id, company_id):
+        """
+        True, если upstream_id - поставщик компании на любом уровне выше.
+        """
+        arrays = self.arrays
+        u = self._index(arrays, upstream_id)
+        v = self._index(arrays, company_id)
+        return arrays.tin[u] < arrays.tin[v] and arrays.tout[v] <= arrays.tout[u]
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_supplier_graph(wait=False):
+    """
+    Граф поставщиков текущего процесса, загружается при первом обращении
+    и обновляется по маркеру изменений при каждом вызове (см. refresh).
+    """
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = SupplierGraph()
+    _graph.refresh(wait=wait)
+    return _graph
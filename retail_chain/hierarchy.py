@@ -0,0 +1,162 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Prefetch, prefetch_related_objects
+from django.db.models.expressions import RawSQL
+
+from retail_chain.models import Company, Contacts, Product
+from retail_chain.versions import bump_version, get_version
+
+DIRECTION_UP = "up"
+DIRECTION_DOWN = "down"
+DIRECTION_BOTH = "both"
+DIRECTIONS = (DIRECTION_UP, DIRECTION_DOWN, DIRECTION_BOTH)
+
+SUBTREE_PRODUCTS_VERSION_KEY = "retail_chain:subtree_products:version"
+
+
+def _company_sql_names():
+    qn = connection.ops.quote_name
+    return (
+        qn(Company._meta.db_table),
+        qn(Company._meta.pk.column),
+        qn(Company._meta.get_field("supplier").column),
+    )
+
+
+def supply_chain_ids_sql(company_id, direction=DIRECTION_UP):
+    """
+    Рекурсивный запрос (WITH RECURSIVE, работает в PostgreSQL и SQLite),
+    возвращающий идентификаторы компаний цепочки поставок, включая саму
+    компанию: поставщиков вверх по цепочке (up), все звенья ниже (down)
+    или обе части (both). UNION отбрасывает повторы, поэтому циклы
+    в поле supplier не приводят к бесконечной рекурсии.
+    """
+    table, pk, supplier = _company_sql_names()
+    ctes = []
+    selects = []
+    params = []
+    if direction in (DIRECTION_UP, DIRECTION_BOTH):
+        ctes.append(
+            f"chain_up(id) AS ("
+            f"SELECT {pk} FROM {table} WHERE {pk} = %s "
+            f"UNION "
+            f"SELECT c.{supplier} FROM {table} c JOIN chain_up ON c.{pk} = chain_up.id "
+            f"WHERE c.{supplier} IS NOT NULL)"
+        )
+        selects.append("SELECT id FROM chain_up")
+        params.append(company_id)
+    if direction in (DIRECTION_DOWN, DIRECTION_BOTH):
+        ctes.append(
+            f"chain_down(id) AS ("
+            f"SELECT {pk} FROM {table} WHERE {pk} = %s "
+            f"UNION "
+            f"SELECT c.{pk} FROM {table} c JOIN chain_down ON c.{supplier} = chain_down.id)"
+        )
+        selects.append("SELECT id FROM chain_down")
+        params.append(company_id)
+    sql = f"WITH RECURSIVE {', '.join(ctes)} {' UNION '.join(selects)}"
+    return sql, params
+
+
+def supply_chain_path_sql(company_id):
+    """
+    Рекурсивный запрос пути от компании вверх до корня (depth = 0 у самой
+    компании). Пройденные компании накапливаются в path, и если поставщик
+    уже встречался в пути, строка помечается is_cycle и рекурсия
+    останавливается. В PostgreSQL путь хранится массивом, в SQLite строкой
+    вида ",1,2,3,".
+    """
+    table, pk, supplier = _company_sql_names()
+    if connection.vendor == "postgresql":
+        path_start = f"ARRAY[{pk}]"
+        path_next = f"chain.path || c.{pk}"
+        in_path = f"c.{pk} = ANY(chain.path)"
+    else:
+        path_start = f"',' || CAST({pk} AS TEXT) || ','"
+        path_next = f"chain.path || CAST(c.{pk} AS TEXT) || ','"
+        in_path = f"chain.path LIKE '%%,' || CAST(c.{pk} AS TEXT) || ',%%'"
+    sql = (
+        f"WITH RECURSIVE chain(id, supplier_id, depth, path, is_cycle) AS ("
+        f"SELECT {pk}, {supplier}, 0, {path_start}, 0 FROM {table} WHERE {pk} = %s "
+        f"UNION ALL "
+        f"SELECT c.{pk}, c.{supplier}, chain.depth + 1, {path_next}, "
+        f"CASE WHEN {in_path} THEN 1 ELSE 0 END "
+        f"FROM {table} c JOIN chain ON c.{pk} = chain.supplier_id "
+        f"WHERE chain.is_cycle = 0"
+        f") "
+        f"SELECT c.*, chain.depth, chain.is_cycle FROM chain "
+        f"JOIN {table} c ON c.{pk} = chain.id ORDER BY chain.depth DESC"
+    )
+    return sql, [company_id]
+
+
+def get_supply_chain(company_id, owner=None):
+    """
+    Цепочка поставок от корня (завода) до компании одним запросом
+    с подгруженными контактами. Возвращает список компаний с атрибутом depth
+    и признак цикла в данных: при цикле повторная компания в список не входит.
+    owner - владелец видимых записей (None - все): компании и контакты
+    других владельцев в цепочку не входят.
+    """
+    sql, params = supply_chain_path_sql(company_id)
+    nodes = list(Company.objects.raw(sql, params))
+    has_cycle = any(node.is_cycle for node in nodes)
+    nodes = [node for node in nodes if not node.is_cycle]
+    contacts = Contacts.objects.all()
+    if owner is not None:
+        nodes = [node for node in nodes if node.owner_id == owner.pk]
+        contacts = contacts.filter(owner=owner)
+    prefetch_related_objects(nodes, Prefetch("company_contacts", queryset=contacts))
+    return nodes, has_cycle
+
+
+def subtree_products_queryset(company_id, direction=DIRECTION_UP, owner=None):
+    """
+    Продукты компаний цепочки поставок одним запросом без повторов:
+    полусоединение с таблицей связи Company.products. owner - владелец
+    видимых продуктов (None - все).
+    """
+    through = Company.products.through
+    sql, params = supply_chain_ids_sql(company_id, direction)
+    links = through.objects.filter(company_id__in=RawSQL(sql, params))
+    products = Product.objects.filter(pk__in=links.values("product_id"))
+    if owner is not None:
+        products = products.filter(owner=owner)
+    return products.order_by("pk")
+
+
+def get_subtree_products_version():
+    return get_version(SUBTREE_PRODUCTS_VERSION_KEY)
+
+
+def invalidate_subtree_products():
+    """
+    Сбрасывает кэш продуктов цепочек поставок для всех компаний
+    сменой версии ключей.
+    """
+    bump_version(SUBTREE_PRODUCTS_VERSION_KEY)
+
+
+def get_subtree_product_ids(company_id, direction=DIRECTION_UP, owner=None):
+    """
+    Идентификаторы продуктов цепочки поставок компании из кэша,
+    отдельного для каждого владельца owner (None - все продукты).
+    """
+    key = (
+        f"retail_chain:subtree_products:{get_subtree_products_version()}:"
+        f"{'all' if owner is None else owner.pk}:{company_id}:{direction}"
+    )
+    product_ids = cache.get(key)
+    if product_ids is None:
+        product_ids = list(
+            subtree_products_queryset(company_id, direction, owner).values_list(
+                "pk", flat=True
+            )
+        )
+        cache.set(
+            key,
+            product_ids,
+            timeout=getattr(settings, "SUBTREE_PRODUCTS_CACHE_TIMEOUT", 60 * 60),
+        )
+    return product_ids
@@ -0,0 +1,225 @@
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import serializers
+
+from retail_chain.models import Job
+
+logger = logging.getLogger(__name__)
+
+Status = Job.StatusChoices
+
+# Зарегистрированные задачи: имя -> функция(context, **params)
+JOB_REGISTRY = {}
+# Проверка параметров задач: имя -> класс JobParamsSerializer
+JOB_PARAMS = {}
+
+
+class JobParamsSerializer(serializers.Serializer):
+    """
+    Параметры задачи. Поля задаются в подклассах, неизвестные параметры
+    отклоняются, чтобы задача не упала в обработчике на вызове функции.
+    """
+
+    def validate(self, attrs):
+        unknown = sorted(set(self.initial_data) - set(self.fields))
+        if unknown:
+            raise serializers.ValidationError(
+                {key: "Неизвестный параметр" for key in unknown}
+            )
+        return attrs
+
+
+def register_job(name, params=JobParamsSerializer):
+    """
+    Декоратор функции фоновой задачи. Функция получает JobContext
+    и параметры задачи именованными аргументами, возвращает результат,
+    сериализуемый в JSON. params - сериализатор параметров, которым они
+    проверяются при постановке задачи в очередь.
+    """
+
+    def decorator(func):
+        JOB_REGISTRY[name] = func
+        JOB_PARAMS[name] = params
+        return func
+
+    return decorator
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """
+    Связь выполняемой задачи с очередью: отчет о прогрессе и проверка
+    отмены. Флаг отмены выставляет цикл обработчика, поэтому проверка
+    не обращается к базе данных.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.cancelled = threading.Event()
+
+    def progress(self, done, total=None):
+        """
+        Сохраняет прогресс задачи. Если задача отменена, прерывает ее
+        исключением JobCancelled.
+        """
+        fields = {"progress_done": done}
+        if total is not None:
+            fields["progress_total"] = total
+        Job.objects.filter(pk=self.job.pk).update(**fields)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self.cancelled.is_set():
+            raise JobCancelled
+
+
+def enqueue(name, params=None, owner=None, max_attempts=None):
+    """
+    Ставит задачу в очередь и возвращает Job. Неверные параметры
+    вызывают ValidationError с ошибками в поле params.
+    """
+    if name not in JOB_REGISTRY:
+        raise ValueError(f"Неизвестная задача: {name}")
+    serializer = JOB_PARAMS[name](data=params or {})
+    if not serializer.is_valid():
+        raise serializers.ValidationError({"params": serializer.errors})
+    return Job.objects.create(
+        name=name,
+        params=dict(serializer.validated_data),
+        owner=owner,
+        max_attempts=max_attempts or getattr(settings, "JOBS_MAX_ATTEMPTS", 3),
+    )
+
+
+def cancel_job(job):
+    """
+    Отменяет задачу: задача в очереди отменяется сразу, выполняемая -
+    при следующей проверке отмены. Возвращает True, если отмена принята.
+    """
+    now = timezone.now()
+    if Job.objects.filter(pk=job.pk, status=Status.PENDING).update(
+        status=Status.CANCELLED, cancel_requested=True, finished_at=now
+    ):
+        return True
+    return bool(
+        Job.objects.filter(pk=job.pk, status=Status.RUNNING).update(
+            cancel_requested=True
+        )
+    )
+
+
+def claim_job(worker):
+    """
+    Забирает первую готовую к выполнению задачу из очереди.
+    В PostgreSQL занятые строки пропускаются (SKIP LOCKED), а условный UPDATE
+    по статусу не дает двум обработчикам взять одну задачу и в других базах.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Status.PENDING, run_after__lte=now)
+            .order_by("run_after", "pk")
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=Status.PENDING).update(
+            status=Status.RUNNING,
+            attempts=F("attempts") + 1,
+            worker=worker,
+            started_at=now,
+            heartbeat_at=now,
+            error="",
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job, context=None):
+    """
+    Выполняет задачу и сохраняет результат. При ошибке задача возвращается
+    в очередь с экспоненциальной задержкой, пока не исчерпаны попытки.
+    Задача сама управляет транзакциями: после отмены или ошибки остаются
+    изменения уже завершенных ею частей.
+    """
+    context = context or JobContext(job)
+    func = JOB_REGISTRY.get(job.name)
+    try:
+        if func is None:
+            raise ValueError(f"Неизвестная задача: {job.name}")
+        context.check_cancelled()
+        result = func(context, **job.params)
+    except JobCancelled:
+        Job.objects.filter(pk=job.pk).update(
+            status=Status.CANCELLED, finished_at=timezone.now()
+        )
+        return Status.CANCELLED
+    except Exception:
+        logger.exception("Ошибка задачи %s #%s", job.name, job.pk)
+        error = traceback.format_exc()
+        if func is not None and job.attempts < job.max_attempts:
+            delay = getattr(settings, "JOBS_RETRY_DELAY", 30) * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status=Status.PENDING,
+                error=error,
+                worker="",
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+            return Status.PENDING
+        Job.objects.filter(pk=job.pk).update(
+            status=Status.FAILED, error=error, finished_at=timezone.now()
+        )
+        return Status.FAILED
+    Job.objects.filter(pk=job.pk).update(
+        status=Status.SUCCEEDED, result=result, finished_at=timezone.now()
+    )
+    return Status.SUCCEEDED
+
+
+def heartbeat(contexts):
+    """
+    Отмечает, что выполняемые задачи живы, и передает им запросы отмены.
+    contexts: {id задачи: JobContext}.
+    """
+    if not contexts:
+        return
+    Job.objects.filter(pk__in=contexts).update(heartbeat_at=timezone.now())
+    for pk in Job.objects.filter(pk__in=contexts, cancel_requested=True).values_list(
+        "pk", flat=True
+    ):
+        contexts[pk].cancelled.set()
+
+
+def requeue_stale_jobs():
+    """
+    Возвращает в очередь задачи, обработчик которых перестал отвечать
+    (например, процесс был остановлен). Если попытки исчерпаны,
+    задача завершается с ошибкой.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Status.RUNNING,
+        heartbeat_at__lt=now
+        - timedelta(seconds=getattr(settings, "JOBS_STALE_TIMEOUT", 5 * 60)),
+    )
+    cancelled = stale.filter(cancel_requested=True).update(
+        status=Status.CANCELLED, finished_at=now
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Status.FAILED, error="Обработчик перестал отвечать", finished_at=now
+    )
+    requeued = stale.update(status=Status.PENDING, worker="", run_after=now)
+    return requeued + failed + cancelled
@@ -0,0 +1,75 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from retail_chain.autocomplete import (
+    AUTOCOMPLETE_FIELDS,
+    PrefixIndex,
+    get_prefix_index,
+)
+
+
+class Command(BaseCommand):
+    """
+    Поиск по индексу автодополнения. С --synthetic N строит индекс
+    из N случайных названий без базы данных и показывает время построения
+    и скорость поиска.
+    """
+
+    help = "Поиск по индексу автодополнения в памяти процесса"
+
+    def add_arguments(self, parser):
+        parser.add_argument("prefix", nargs="?", default="")
+        parser.add_argument(
+            "--field", choices=list(AUTOCOMPLETE_FIELDS), default="company"
+        )
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument(
+            "--synthetic", type=int, help="построить индекс из N случайных названий"
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options["synthetic"]:
+            index = PrefixIndex(options["field"])
+            index._build(self.synthetic_rows(options["synthetic"]))
+        else:
+            index = get_prefix_index(options["field"])
+        self.stdout.write(
+            f"Записей: {len(index)}, загрузка {time.perf_counter() - start:.2f} с"
+        )
+        if options["synthetic"]:
+            self.bench(index)
+        if options["prefix"]:
+            for result in index.search(options["prefix"], options["limit"]):
+                self.stdout.write(f"{result['id']}: {result['value']}")
+
+    @staticmethod
+    def synthetic_rows(count):
+        letters = "абвгдеклмнопрст" + string.ascii_lowercase
+        return [
+            (
+                object_id,
+                "".join(random.choices(letters, k=random.randint(5, 30))).title(),
+                random.randint(1, 1000),
+            )
+            for object_id in range(1, count + 1)
+        ]
+
+    def bench(self, index, queries=10_000):
+        letters = "абвгдеклмнопрст" + string.ascii_lowercase
+        for length in (1, 2, 4):
+            prefixes = [
+                "".join(random.choices(letters, k=length)) for _ in range(queries)
+            ]
+            for owner_id in (None, 1):
+                start = time.perf_counter()
+                for prefix in prefixes:
+                    index.search(prefix, 10, owner_id)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"префикс {length}, владелец {owner_id}: "
+                    f"{elapsed / queries * 1e6:.1f} мкс на запрос"
+                )
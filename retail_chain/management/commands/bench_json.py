@@ -0,0 +1,126 @@
+import io
+import json
+import time
+from decimal import Decimal
+
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from retail_chain import renderers
+from retail_chain.renderers import FastJSONParser, FastJSONRenderer
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает кодирование и декодирование страниц компаний стандартными
+    JSONRenderer/JSONParser и FastJSONRenderer/FastJSONParser.
+    База данных не используется.
+    """
+
+    help = "Замер скорости JSON рендерера и парсера на страницах компаний"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stderr.write("orjson не установлен, замеряется стандартный json")
+
+        page = self.make_page(options["companies"])
+        repeat = options["repeat"]
+
+        stdlib_body = JSONRenderer().render(page)
+        fast_body = FastJSONRenderer().render(page)
+        if json.loads(stdlib_body) != json.loads(fast_body):
+            self.stderr.write("Результаты кодирования различаются")
+            return
+
+        self.report(
+            "Кодирование",
+            len(fast_body),
+            min(self.measure(JSONRenderer().render, page) for _ in range(repeat)),
+            min(self.measure(FastJSONRenderer().render, page) for _ in range(repeat)),
+        )
+        self.report(
+            "Декодирование",
+            len(fast_body),
+            min(self.measure(self.parse, JSONParser(), fast_body) for _ in range(repeat)),
+            min(
+                self.measure(self.parse, FastJSONParser(), fast_body)
+                for _ in range(repeat)
+            ),
+        )
+
+    @staticmethod
+    def make_page(count):
+        """
+        Страница в формате /companies/?expand=supplier,contacts,products.
+        """
+        now = timezone.now().strftime("%d/%m/%Y %H:%M:%S")
+        supplier = {
+            "id": 1,
+            "type": "fabric",
+            "name": "Завод электроники",
+            "level": 0,
+            "description": "Производство телевизоров и смартфонов",
+            "date_created": now,
+            "supplier": None,
+            "products": [1, 2, 3],
+        }
+        results = [
+            {
+                "id": i,
+                "type": "retail",
+                "name": f"Розничная сеть «Электроника» №{i}",
+                "level": 1,
+                "description": "Сеть магазинов бытовой техники",
+                "debt": Decimal("150000.50") + i,
+                "debt_currency": "RUB",
+                "date_created": now,
+                "supplier": supplier,
+                "products": [
+                    {
+                        "id": p,
+                        "product_name": f"Телевизор {p}",
+                        "product_model": f"TV-{p}",
+                        "product_date": "2024-12-30",
+                    }
+                    for p in range(1, 6)
+                ],
+                "contacts": [
+                    {
+                        "id": i,
+                        "email": f"shop{i}@example.com",
+                        "inn": 7700000000 + i,
+                        "country": "Россия",
+                        "city": "Москва",
+                        "street": "Тверская",
+                        "number_house": i % 100,
+                        "company": i,
+                    }
+                ],
+                "level_display": _("Поставщик от фабрики - 1 уровень"),
+            }
+            for i in range(2, count + 2)
+        ]
+        return {"count": count, "next": None, "previous": None, "results": results}
+
+    @staticmethod
+    def parse(parser, body):
+        return parser.parse(io.BytesIO(body), parser_context={"encoding": "utf-8"})
+
+    @staticmethod
+    def measure(func, *args):
+        start = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - start
+
+    def report(self, title, size, stdlib_time, fast_time):
+        self.stdout.write(
+            f"{title}: {size / 1024:.0f} КБ, json {stdlib_time * 1000:.2f} мс, "
+            f"fast {fast_time * 1000:.2f} мс, ускорение x{stdlib_time / fast_time:.1f}"
+        )
@@ -0,0 +1,112 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from retail_chain.fast_serializers import ValuesListSerializer
+from retail_chain.models import Company, Contacts, Product, normalize_product_key
+from retail_chain.serializers import (
+    CompanySerializer,
+    ContactsSerializer,
+    ProductSerializer,
+)
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает время сериализации списков через ModelSerializer и
+    ValuesListSerializer. Тестовые данные создаются в транзакции,
+    которая откатывается после замера.
+    """
+
+    help = "Замер скорости быстрой сериализации списков (values_list)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        with transaction.atomic():
+            self.create_data(rows)
+            for model, serializer_class in (
+                (Product, ProductSerializer),
+                (Contacts, ContactsSerializer),
+                (Company, CompanySerializer),
+            ):
+                self.bench(model, serializer_class, repeat)
+            transaction.set_rollback(True)
+
+    def create_data(self, rows):
+        # bulk_create не вызывает save(), ключ заполняется явно
+        products = Product.objects.bulk_create(
+            Product(
+                product_name=f"Телевизор {i}",
+                product_model=f"TV-{i}",
+                natural_key=normalize_product_key(f"Телевизор {i}", f"TV-{i}"),
+            )
+            for i in range(rows)
+        )
+        fabric = Company.objects.create(type="fabric", name="Завод", level=0)
+        companies = Company.objects.bulk_create(
+            Company(
+                type="retail",
+                name=f"Розничная сеть {i}",
+                level=1,
+                supplier=fabric,
+                debt=i,
+            )
+            for i in range(rows)
+        )
+        Company.products.through.objects.bulk_create(
+            Company.products.through(company_id=company.pk, product_id=product.pk)
+            for company, product in zip(companies, products)
+        )
+        Contacts.objects.bulk_create(
+            Contacts(
+                company=company,
+                email=f"bench{i}@example.com",
+                inn=7700000000 + i,
+                country="Россия",
+                city="Москва",
+                street="Тверская",
+                number_house=i,
+            )
+            for i, company in enumerate(companies)
+        )
+
+    def bench(self, model, serializer_class, repeat):
+        renderer = JSONRenderer()
+        values_serializer = ValuesListSerializer.for_serializer_class(serializer_class)
+        queryset = model.objects.order_by("pk")
+        if model is Company:
+            queryset = queryset.prefetch_related("products")
+        count = queryset.count()
+
+        def model_path():
+            return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+        def values_path():
+            return renderer.render(
+                values_serializer.serialize(values_serializer.values_list(queryset.all()))
+            )
+
+        if model_path() != values_path():
+            self.stderr.write(f"{model.__name__}: результаты сериализации различаются")
+            return
+
+        model_time = min(self.measure(model_path) for _ in range(repeat))
+        values_time = min(self.measure(values_path) for _ in range(repeat))
+        self.stdout.write(
+            f"{model.__name__}: {count} строк, "
+            f"ModelSerializer {model_time / count * 1e6:.1f} мкс/строка, "
+            f"values_list {values_time / count * 1e6:.1f} мкс/строка, "
+            f"ускорение x{model_time / values_time:.1f}"
+        )
+
+    @staticmethod
+    def measure(func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
@@ -0,0 +1,157 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном процессе: загрузка WSGI приложения, как при старте
+# worker, и первый запрос без тестового клиента и сервера
+CHILD_SCRIPT = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.wsgi import get_wsgi_application
+
+application = get_wsgi_application()
+loaded = time.time()
+environ = {"PATH_INFO": sys.argv[1], "HTTP_ACCEPT": "application/json"}
+if len(sys.argv) > 2:
+    environ["HTTP_AUTHORIZATION"] = "Bearer " + sys.argv[2]
+setup_testing_defaults(environ)
+status = []
+response = application(environ, lambda value, headers, exc_info=None: status.append(value))
+b"".join(response)
+response.close()
+print(json.dumps({"loaded": loaded, "served": time.time(), "status": status[0]}))
+"""
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+class Command(BaseCommand):
+    """
+    Замер времени от запуска процесса до ответа на первый запрос: импорт
+    Django, настроек и приложений, загрузка WSGI приложения и URL, первый
+    запрос. Каждый замер - новый процесс Python. Запрос выполняется
+    с JWT пользователя --user (по умолчанию первого активного), иначе
+    защищенный путь ответил бы 401, не дойдя до контроллера. Если медиана превышает
+    бюджет STARTUP_BUDGET_MS, команда завершается с ошибкой, поэтому ее
+    можно запускать в CI, чтобы не пропустить тяжелые импорты.
+    """
+
+    help = "Замер времени старта процесса до первого ответа"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            default=os.environ.get("DJANGO_SETTINGS_MODULE"),
+            help="модуль настроек, например config.settings_api",
+        )
+        parser.add_argument("--path", default="/products/", help="первый запрос")
+        parser.add_argument(
+            "--user", help="e-mail пользователя, от имени которого выполняется запрос"
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--budget",
+            type=float,
+            default=getattr(settings, "STARTUP_BUDGET_MS", None),
+            help="бюджет медианы времени до первого ответа, мс",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=0,
+            help="вывести N самых долгих импортов (python -X importtime)",
+        )
+
+    def handle(self, *args, **options):
+        profile = options["profile"]
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": profile}
+        args = [options["path"], *self.get_token(options["user"])]
+        loaded, served = [], []
+        for _ in range(options["repeat"]):
+            started = time.time()
+            result = self.run_child(env, args)
+            loaded.append((result["loaded"] - started) * 1000)
+            served.append((result["served"] - started) * 1000)
+        if int(result["status"].split()[0]) >= 400:
+            raise CommandError(f"Первый запрос {options['path']}: {result['status']}")
+
+        first_request = [total - load for total, load in zip(served, loaded)]
+        self.stdout.write(f"Профиль {profile}, запрос {options['path']}")
+        self.stdout.write(f"  ответ {result['status']}, замеров: {len(served)}")
+        for title, values in (
+            ("Загрузка приложения", loaded),
+            ("Первый запрос", first_request),
+            ("До первого ответа", served),
+        ):
+            self.stdout.write(
+                f"  {title}: медиана {statistics.median(values):.0f} мс, "
+                f"мин. {min(values):.0f} мс"
+            )
+
+        if options["top"]:
+            self.report_imports(env, args, options["top"])
+
+        median = statistics.median(served)
+        budget = options["budget"]
+        if budget is not None and median > budget:
+            raise CommandError(
+                f"Время до первого ответа {median:.0f} мс превышает бюджет {budget} мс"
+            )
+
+    @staticmethod
+    def get_token(email):
+        """
+        Аргументы процесса с токеном доступа: пустой список, если
+        пользователей нет и запрос выполняется без аутентификации.
+        """
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        users = get_user_model().objects.filter(is_active=True)
+        if email:
+            user = users.filter(email=email).first()
+            if user is None:
+                raise CommandError(f"Нет активного пользователя {email}")
+        else:
+            user = users.order_by("pk").first()
+        return [str(AccessToken.for_user(user))] if user else []
+
+    def run_child(self, env, args, *flags):
+        process = subprocess.run(
+            [sys.executable, *flags, "-c", CHILD_SCRIPT, *args],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr.strip())
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result["stderr"] = process.stderr
+        return result
+
+    def report_imports(self, env, args, count):
+        """
+        Пакеты верхнего уровня с наибольшим суммарным временем импорта.
+        """
+        result = self.run_child(env, args, "-X", "importtime")
+        packages = {}
+        for line in result["stderr"].splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match and not match.group(3):
+                package = match.group(4).split(".")[0]
+                packages[package] = packages.get(package, 0) + int(match.group(2))
+        self.stdout.write(
+            f"Самые долгие импорты (из {sum(packages.values()) // 1000} мс):"
+        )
+        for package, microseconds in sorted(
+            packages.items(), key=lambda item: item[1], reverse=True
+        )[:count]:
+            self.stdout.write(f"  {package}: {microseconds / 1000:.0f} мс")
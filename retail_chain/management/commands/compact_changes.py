@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from retail_chain.changes import compact_changes
+
+
+class Command(BaseCommand):
+    """
+    Сжатие журнала изменений: для записей старше указанного числа дней
+    остается только последнее изменение каждого объекта.
+    """
+
+    help = "Сжатие журнала изменений"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+
+    def handle(self, *args, **options):
+        deleted = compact_changes(timezone.now() - timedelta(days=options["days"]))
+        self.stdout.write(f"Удалено записей журнала: {deleted}")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from retail_chain.company_products import companies_products_changed
+from retail_chain.products import dedupe_products
+
+
+class Command(BaseCommand):
+    """
+    Объединение продуктов-дублей (одинаковые название и модель у владельца)
+    и пересчет естественных ключей, например после изменения правил
+    нормализации normalize_product_key. Связи компаний переносятся
+    на оставляемый продукт массовыми запросами.
+    """
+
+    help = "Объединение продуктов-дублей"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        merged, rekeyed, company_ids = dedupe_products(batch_size=options["batch_size"])
+        with transaction.atomic():
+            companies_products_changed(company_ids)
+        self.stdout.write(
+            f"Удалено дублей: {merged}, обновлено ключей: {rekeyed}, "
+            f"изменено компаний: {len(company_ids)}"
+        )
@@ -0,0 +1,38 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from retail_chain.models import ExchangeRate
+
+
+class Command(BaseCommand):
+    """
+    Загрузка курсов валют из CSV файла с колонками currency, rate
+    (стоимость единицы валюты в базовой валюте DEBT_BASE_CURRENCY).
+    Существующие курсы обновляются.
+    """
+
+    help = "Загрузка курсов валют из CSV файла"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="путь к CSV файлу")
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        with transaction.atomic():
+            for row in rows:
+                try:
+                    rate = Decimal(row["rate"])
+                except (InvalidOperation, KeyError, TypeError):
+                    raise CommandError(f"Неверная строка: {row}")
+                if not rate.is_finite() or rate <= 0:
+                    raise CommandError(f"Курс должен быть больше нуля: {row}")
+                # save() по одной записи, чтобы сигналы сбросили кэш отчетов
+                ExchangeRate.objects.update_or_create(
+                    currency=row["currency"].strip().upper(),
+                    defaults={"rate": rate},
+                )
+        self.stdout.write(f"Загружено курсов: {len(rows)}")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from retail_chain.summaries import check_summaries, rebuild_summaries
+
+
+class Command(BaseCommand):
+    """
+    Полный пересчет сводок по сети (NetworkSummary) или, с --check,
+    сравнение сводок с пересчетом без изменения данных.
+    """
+
+    help = "Пересчет сводок по сети"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="только сравнить сводки с полным пересчетом",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            rows = rebuild_summaries()
+            self.stdout.write(f"Строк сводок: {rows}")
+            return
+
+        differences = check_summaries()
+        for dimension, key, currency, stored, expected in differences:
+            self.stdout.write(
+                f"{dimension} {key!r} {currency}: в таблице {stored}, "
+                f"по пересчету {expected}"
+            )
+        if differences:
+            raise CommandError(f"Расхождений: {len(differences)}")
+        self.stdout.write("Сводки совпадают с пересчетом")
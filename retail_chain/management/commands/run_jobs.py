@@ -0,0 +1,100 @@
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from retail_chain.jobs import (
+    JobContext,
+    claim_job,
+    heartbeat,
+    requeue_stale_jobs,
+    run_job,
+)
+
+
+def _run_in_thread(job, context):
+    try:
+        return run_job(job, context)
+    finally:
+        # Соединения с базой данных привязаны к потоку
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    Обработчик очереди фоновых задач (retail_chain.jobs): забирает задачи
+    из базы данных и выполняет их в пуле потоков. Можно запускать несколько
+    обработчиков, в том числе на разных серверах. По SIGTERM/SIGINT новые
+    задачи не берутся, выполняемые завершаются.
+    """
+
+    help = "Обработчик фоновых задач"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "JOBS_WORKERS", 2),
+            help="число потоков выполнения задач",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=getattr(settings, "JOBS_POLL_INTERVAL", 1.0),
+            help="интервал опроса очереди, секунды",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="выполнить готовые задачи и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        workers = options["workers"]
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stop.set())
+
+        running = {}
+        self.stdout.write(f"Обработчик {worker}, потоков: {workers}")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # После остановки цикл продолжается, пока не завершатся
+            # выполняемые задачи: им нужны сигналы жизни и запросы отмены
+            while not stop.is_set() or running:
+                for pk, (future, _) in list(running.items()):
+                    if future.done():
+                        del running[pk]
+                        self.stdout.write(f"Задача #{pk}: {future.result()}")
+                requeue_stale_jobs()
+                heartbeat({pk: context for pk, (_, context) in running.items()})
+
+                claimed = False
+                while not stop.is_set() and len(running) < workers:
+                    job = claim_job(worker)
+                    if job is None:
+                        break
+                    claimed = True
+                    context = JobContext(job)
+                    running[job.pk] = (
+                        pool.submit(_run_in_thread, job, context),
+                        context,
+                    )
+                    self.stdout.write(f"Задача #{job.pk} {job.name} запущена")
+
+                if options["once"] and not running and not claimed:
+                    break
+                if running:
+                    # Следующая задача берется сразу после завершения текущей
+                    wait(
+                        [future for future, _ in running.values()],
+                        timeout=options["poll_interval"],
+                        return_when=FIRST_COMPLETED,
+                    )
+                else:
+                    stop.wait(options["poll_interval"])
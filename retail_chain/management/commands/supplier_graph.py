@@ -0,0 +1,80 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from retail_chain.graph import SupplierGraph, get_supplier_graph
+
+
+class Command(BaseCommand):
+    """
+    Загружает граф поставщиков и отвечает на запросы по иерархии.
+    С --synthetic N строит случайный лес из N компаний без базы данных
+    и показывает время построения, размер в памяти и скорость запросов.
+    """
+
+    help = "Запросы к графу поставщиков в памяти процесса"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, help="id компании")
+        parser.add_argument(
+            "--is-upstream-of",
+            type=int,
+            help="проверить, является ли компания поставщиком указанной",
+        )
+        parser.add_argument(
+            "--synthetic", type=int, help="построить случайный лес из N компаний"
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options["synthetic"]:
+            graph = SupplierGraph()
+            graph._build(self.synthetic_rows(options["synthetic"]))
+        else:
+            graph = get_supplier_graph(wait=True)
+        self.stdout.write(
+            f"Компаний: {len(graph)}, загрузка {time.perf_counter() - start:.2f} с, "
+            f"память {graph.memory_size / 1024 / 1024:.1f} МБ"
+        )
+        if options["synthetic"]:
+            self.bench(graph, options["synthetic"])
+
+        company_id = options["company"]
+        if company_id is None:
+            return
+        self.stdout.write(f"Поставщик: {graph.supplier(company_id)}")
+        self.stdout.write(f"Глубина: {graph.depth(company_id)}")
+        self.stdout.write(f"Поставщики до корня: {graph.ancestors(company_id)}")
+        self.stdout.write(f"Звеньев ниже: {graph.descendants_count(company_id)}")
+        if options["is_upstream_of"] is not None:
+            self.stdout.write(
+                f"Поставщик компании {options['is_upstream_of']}: "
+                f"{graph.is_upstream(company_id, options['is_upstream_of'])}"
+            )
+
+    @staticmethod
+    def synthetic_rows(count):
+        """
+        Заводы, поставщики первого и второго уровня в пропорции 1:10:100.
+        """
+        rows = []
+        for company_id in range(1, count + 1):
+            supplier_id = None
+            if company_id > count // 111 + 1:
+                supplier_id = random.randint(1, company_id - 1) // 10 or None
+            rows.append((company_id, supplier_id))
+        return rows
+
+    def bench(self, graph, count, queries=100_000):
+        ids = [random.randint(1, count) for _ in range(queries)]
+        for name, func in (
+            ("depth", lambda company_id: graph.depth(company_id)),
+            ("ancestors", lambda company_id: graph.ancestors(company_id)),
+            ("is_upstream", lambda company_id: graph.is_upstream(1, company_id)),
+        ):
+            start = time.perf_counter()
+            for company_id in ids:
+                func(company_id)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{name}: {elapsed / queries * 1e6:.2f} мкс на запрос")
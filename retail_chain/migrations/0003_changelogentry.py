@@ -0,0 +1,64 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("retail_chain", "0002_owner"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model_name", models.CharField(max_length=50, verbose_name="Модель")),
+                ("object_id", models.BigIntegerField(verbose_name="ID объекта")),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("insert", "Создание"),
+                            ("update", "Изменение"),
+                            ("delete", "Удаление"),
+                        ],
+                        max_length=10,
+                        verbose_name="Действие",
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        blank=True, null=True, verbose_name="Данные объекта"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Время изменения"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись журнала изменений",
+                "verbose_name_plural": "Журнал изменений",
+                "indexes": [
+                    models.Index(
+                        fields=["model_name", "object_id", "id"],
+                        name="changelog_object_idx",
+                    ),
+                    models.Index(fields=["created_at"], name="changelog_created_idx"),
+                ],
+            },
+        ),
+    ]
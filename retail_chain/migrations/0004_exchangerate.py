@@ -0,0 +1,53 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("retail_chain", "0003_changelogentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExchangeRate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        help_text="Код валюты, например USD",
+                        max_length=3,
+                        unique=True,
+                        verbose_name="Валюта",
+                    ),
+                ),
+                (
+                    "rate",
+                    models.DecimalField(
+                        decimal_places=8,
+                        help_text="Стоимость единицы валюты в базовой валюте",
+                        max_digits=18,
+                        verbose_name="Курс",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Дата обновления"),
+                ),
+            ],
+            options={
+                "verbose_name": "Курс валюты",
+                "verbose_name_plural": "Курсы валют",
+            },
+        ),
+    ]
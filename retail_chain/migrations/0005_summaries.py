@@ -0,0 +1,114 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("retail_chain", "0004_exchangerate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompanySummaryState",
+            fields=[
+                (
+                    "company_id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="ID компании"
+                    ),
+                ),
+                (
+                    "level",
+                    models.PositiveIntegerField(verbose_name="Номер уровня иерархии"),
+                ),
+                ("type", models.CharField(max_length=150, verbose_name="Тип компании")),
+                (
+                    "country",
+                    models.CharField(blank=True, max_length=150, verbose_name="Страна"),
+                ),
+                (
+                    "debt",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=14, verbose_name="Задолжность"
+                    ),
+                ),
+                (
+                    "debt_currency",
+                    models.CharField(max_length=3, verbose_name="Валюта задолжности"),
+                ),
+                (
+                    "products",
+                    models.PositiveIntegerField(verbose_name="Количество продуктов"),
+                ),
+            ],
+            options={
+                "verbose_name": "Вклад компании в сводку",
+                "verbose_name_plural": "Вклады компаний в сводку",
+            },
+        ),
+        migrations.CreateModel(
+            name="NetworkSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("level", "Уровень"),
+                            ("type", "Тип компании"),
+                            ("country", "Страна"),
+                        ],
+                        max_length=20,
+                        verbose_name="Разрез",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True, max_length=150, verbose_name="Значение"
+                    ),
+                ),
+                (
+                    "debt_currency",
+                    models.CharField(max_length=3, verbose_name="Валюта задолжности"),
+                ),
+                (
+                    "companies",
+                    models.IntegerField(default=0, verbose_name="Количество компаний"),
+                ),
+                (
+                    "debt",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=20,
+                        verbose_name="Задолжность",
+                    ),
+                ),
+                (
+                    "products",
+                    models.IntegerField(default=0, verbose_name="Количество продуктов"),
+                ),
+            ],
+            options={
+                "verbose_name": "Сводка по сети",
+                "verbose_name_plural": "Сводки по сети",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "key", "debt_currency"),
+                        name="network_summary_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:51
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def restore_leading_zeros(apps, schema_editor):
+    """
+    В числовом поле терялись ведущие нули: дополняем ИНН до 10 цифр
+    (юридические лица) или до 12 цифр (11 цифр - ИНН физического лица).
+    """
+    Contacts = apps.get_model("retail_chain", "Contacts")
+    contacts = []
+    for contact in Contacts.objects.only("inn").iterator():
+        width = 12 if len(contact.inn) == 11 else 10
+        if len(contact.inn) < width:
+            contact.inn = contact.inn.zfill(width)
+            contacts.append(contact)
+    Contacts.objects.bulk_update(contacts, ["inn"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("retail_chain", "0005_summaries"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="contacts",
+            name="inn",
+            field=models.CharField(
+                db_index=True,
+                help_text="Укажите ИНН организации (10 или 12 цифр)",
+                max_length=12,
+                validators=[
+                    django.core.validators.RegexValidator(
+                        "^(\\d{10}|\\d{12})$", "ИНН должен состоять из 10 или 12 цифр"
+                    )
+                ],
+                verbose_name="ИНН организации",
+            ),
+        ),
+        migrations.RunPython(restore_leading_zeros, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:12
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def normalize_product_key(product_name, product_model):
+    # Копия retail_chain.models.normalize_product_key на момент миграции:
+    # миграция не должна меняться вместе с кодом приложения
+    return "\n".join(
+        " ".join((value or "").split()).casefold()
+        for value in (product_name, product_model)
+    )
+
+
+def merge_duplicate_products(apps, schema_editor):
+    """
+    Заполняет natural_key и объединяет продукты-дубли перед созданием
+    уникального индекса: остается продукт с меньшим id, связи дублей
+    с компаниями переносятся на него. Сводки по сети после миграции
+    пересчитываются командой rebuild_summaries.
+    """
+    Product = apps.get_model("retail_chain", "Product")
+    Company = apps.get_model("retail_chain", "Company")
+    through = Company.products.through
+
+    keepers = {}
+    duplicates = {}
+    keys = {}
+    rows = Product.objects.order_by("pk").values_list(
+        "pk", "owner_id", "product_name", "product_model"
+    )
+    for pk, owner_id, name, model in rows.iterator(chunk_size=BATCH_SIZE):
+        key = normalize_product_key(name, model)
+        keeper = keepers.setdefault((owner_id, key), pk)
+        if keeper != pk:
+            duplicates[pk] = keeper
+        else:
+            keys[pk] = key
+
+    duplicate_items = list(duplicates.items())
+    for start in range(0, len(duplicate_items), BATCH_SIZE):
+        batch = dict(duplicate_items[start : start + BATCH_SIZE])
+        links = through.objects.filter(product_id__in=batch)
+        through.objects.bulk_create(
+            [
+                through(company_id=company_id, product_id=batch[product_id])
+                for company_id, product_id in links.values_list(
+                    "company_id", "product_id"
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        links.delete()
+        Product.objects.filter(pk__in=batch).delete()
+
+    # Уникального индекса по ключу еще нет, ключи записываются как есть
+    key_items = list(keys.items())
+    for start in range(0, len(key_items), BATCH_SIZE):
+        Product.objects.bulk_update(
+            [
+                Product(pk=pk, natural_key=key)
+                for pk, key in key_items[start : start + BATCH_SIZE]
+            ],
+            ["natural_key"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("retail_chain", "0007_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="natural_key",
+            field=models.CharField(
+                default="",
+                editable=False,
+                help_text="Название и модель в нормализованном виде (normalize_product_key)",
+                max_length=500,
+                verbose_name="Естественный ключ",
+            ),
+        ),
+        migrations.RunPython(merge_duplicate_products, migrations.RunPython.noop),
+    ]
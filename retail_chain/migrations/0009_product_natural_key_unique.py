@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Отдельная миграция: в PostgreSQL нельзя изменять таблицу в транзакции,
+    # где остались отложенные проверки внешних ключей после удаления дублей
+
+    dependencies = [
+        ("retail_chain", "0008_product_natural_key"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="product",
+            constraint=models.UniqueConstraint(
+                fields=("owner", "natural_key"), name="product_owner_natural_key_uniq"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="product",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("owner__isnull", True)),
+                fields=("natural_key",),
+                name="product_natural_key_no_owner_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+
+def delete_non_positive_rates(apps, schema_editor):
+    # Нулевой или отрицательный курс не позволяет пересчитать задолженность,
+    # такая запись равносильна отсутствию курса
+    ExchangeRate = apps.get_model("retail_chain", "ExchangeRate")
+    ExchangeRate.objects.filter(rate__lte=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("retail_chain", "0009_product_natural_key_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_non_positive_rates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="exchangerate",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("rate__gt", 0)), name="exchange_rate_positive"
+            ),
+        ),
+    ]
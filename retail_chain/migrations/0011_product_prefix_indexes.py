@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Фильтры админ-панели по началу названия и модели продукта (PrefixInputFilter)
+# используют __istartswith, в PostgreSQL это UPPER("поле"::text) LIKE 'ABC%'.
+# Такое условие использует только индекс по тому же выражению с классом
+# операторов text_pattern_ops (обычный btree не подходит для LIKE при локали,
+# отличной от C). В других базах данных индексы не создаются.
+PREFIX_INDEXES = {
+    "product_name_upper_prefix_idx": "product_name",
+    "product_model_upper_prefix_idx": "product_model",
+}
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    qn = schema_editor.quote_name
+    table = apps.get_model("retail_chain", "Product")._meta.db_table
+    for name, column in PREFIX_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {qn(name)} ON {qn(table)} "
+            f"(UPPER({qn(column)}::text) text_pattern_ops)"
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in PREFIX_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(name)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("retail_chain", "0010_exchangerate_rate_positive"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
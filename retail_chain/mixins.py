@@ -0,0 +1,72 @@
+from rest_framework.response import Response
+
+from retail_chain.fast_serializers import ValuesListSerializer
+from retail_chain.permissions import is_moderator
+from retail_chain.tracing import span
+
+
+class OwnerQuerySetMixin:
+    """
+    Ограничивает queryset записями текущего пользователя прямо в SQL,
+    поэтому список, количество и пагинация считаются одним запросом.
+    Модераторы и сотрудники (is_staff) видят все записи.
+    Новые записи получают владельцем текущего пользователя.
+    """
+
+    def get_owner_scope(self):
+        """
+        Ключ видимых записей для кэширования: "all" для модераторов
+        и сотрудников, иначе id пользователя.
+        """
+        user = self.request.user
+        if user.is_staff or is_moderator(user):
+            return "all"
+        return user.pk
+
+    def get_owner(self):
+        """
+        Владелец записей, видимых пользователю, для ограничения связанных
+        записей других моделей (раскрытые связи, цепочки поставок):
+        None, если пользователь видит все записи.
+        """
+        if self.get_owner_scope() == "all":
+            return None
+        return self.request.user
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_authenticated:
+            return queryset.none()
+        if self.get_owner_scope() != "all":
+            queryset = queryset.filter(owner=self.request.user)
+        # Страницы идут по индексу (owner, id)
+        return queryset.order_by("pk")
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+class ValuesListMixin:
+    """
+    Быстрый путь для действия list: страница выбирается через values_list()
+    и выводится ValuesListSerializer без создания экземпляров модели.
+    Если сериализатор не поддерживается, используется обычный list.
+    """
+
+    def get_values_serializer(self):
+        return ValuesListSerializer.for_serializer_class(self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = values_serializer.values_list(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        with span("serialize", serializer=type(values_serializer).__name__):
+            data = values_serializer.serialize(queryset if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
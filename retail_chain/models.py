@@ -1,10 +1,62 @@
-from django.db import models
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import RegexValidator
+from django.db import models, router, transaction
+from django.utils import timezone
 from djmoney.models.fields import MoneyField
 
 NULLABLE = {"blank": True, "null": True}
 
+INN_VALIDATOR = RegexValidator(
+    r"^(\d{10}|\d{12})$", "ИНН должен состоять из 10 или 12 цифр"
+)
 
-class Product(models.Model):
+
+def normalize_product_key(product_name, product_model):
+    """
+    Естественный ключ продукта: название и модель без учета регистра
+    и повторяющихся пробелов.
+    """
+    return "\n".join(
+        " ".join((value or "").split()).casefold()
+        for value in (product_name, product_model)
+    )
+
+
+class OwnedModel(models.Model):
+    """
+    Абстрактная модель с владельцем записи. Вместо отдельного индекса по owner
+    используется составной индекс (owner, id) в наследниках: он обслуживает
+    и фильтр по владельцу, и сортировку страниц списка по id.
+    """
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        verbose_name="Владелец",
+        help_text="Пользователь, создавший запись",
+        db_index=False,
+        related_name="+",
+        **NULLABLE,
+    )
+
+    class Meta:
+        abstract = True
+
+    # Сохранение и удаление выполняются в транзакции, чтобы запись
+    # журнала изменений (retail_chain.changes) попала в ту же транзакцию
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            return super().delete(using=using, keep_parents=keep_parents)
+
+
+class Product(OwnedModel):
     product_name = models.CharField(
         max_length=250,
         verbose_name="Название продукта",
@@ -21,16 +73,51 @@ class Product(models.Model):
         help_text="Укажите дату выхода продукта на рынок",
         **NULLABLE,
     )
+    natural_key = models.CharField(
+        max_length=500,
+        editable=False,
+        default="",
+        verbose_name="Естественный ключ",
+        help_text="Название и модель в нормализованном виде (normalize_product_key)",
+    )
 
     class Meta:
         verbose_name = "Продукт"
         verbose_name_plural = "Продукты"
+        indexes = [models.Index(fields=["owner", "id"], name="product_owner_id_idx")]
+        # Продукт с одним названием и моделью у владельца один,
+        # индекс (owner, natural_key) служит и для поиска по ключу
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "natural_key"], name="product_owner_natural_key_uniq"
+            ),
+            models.UniqueConstraint(
+                fields=["natural_key"],
+                condition=models.Q(owner__isnull=True),
+                name="product_natural_key_no_owner_uniq",
+            ),
+        ]
 
     def __str__(self):
         return self.product_name
 
+    def clean(self):
+        key = normalize_product_key(self.product_name, self.product_model)
+        duplicates = Product.objects.filter(owner=self.owner, natural_key=key)
+        if duplicates.exclude(pk=self.pk).exists():
+            raise ValidationError("Продукт с таким названием и моделью уже есть")
+
+    def save(self, *args, **kwargs):
+        self.natural_key = normalize_product_key(self.product_name, self.product_model)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"product_name", "product_model"} & set(
+            update_fields
+        ):
+            kwargs["update_fields"] = {*update_fields, "natural_key"}
+        super().save(*args, **kwargs)
 
-class Company(models.Model):
+
+class Company(OwnedModel):
     class LevelChoices(models.IntegerChoices):
         FABRIC = 0, "Завод - 0 уровень"
         SUPPLIER_FIRST = 1, "Поставщик от фабрики - 1 уровень"
@@ -90,12 +177,13 @@ class Company(models.Model):
     class Meta:
         verbose_name = "Компания"
         verbose_name_plural = "Компании"
+        indexes = [models.Index(fields=["owner", "id"], name="company_owner_id_idx")]
 
     def __str__(self):
         return f"{self.get_type_display()} - {self.name}"
 
 
-class Contacts(models.Model):
+class Contacts(OwnedModel):
     company = models.ForeignKey(
         Company,
         on_delete=models.CASCADE,
@@ -108,8 +196,12 @@ class Contacts(models.Model):
         help_text="Укажите e-mail организации",
         unique=True,
     )
-    inn = models.PositiveIntegerField(
-        verbose_name="ИНН организации", help_text="Укажите ИНН организации"
+    inn = models.CharField(
+        max_length=12,
+        db_index=True,
+        validators=[INN_VALIDATOR],
+        verbose_name="ИНН организации",
+        help_text="Укажите ИНН организации (10 или 12 цифр)",
     )
     country = models.CharField(
         max_length=150,
@@ -138,6 +230,282 @@ class Contacts(models.Model):
     class Meta:
         verbose_name = "Контактные данные"
         verbose_name_plural = "Контактные данные"
+        indexes = [models.Index(fields=["owner", "id"], name="contacts_owner_id_idx")]
 
     def __str__(self):
         return f"{self.email} - {self.inn}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Запись журнала изменений для инкрементальной синхронизации клиентов.
+    Возрастающий id служит курсором ленты /changes/?since=<id>.
+    """
+
+    class ActionChoices(models.TextChoices):
+        INSERT = "insert", "Создание"
+        UPDATE = "update", "Изменение"
+        DELETE = "delete", "Удаление"
+
+    model_name = models.CharField(
+        max_length=50,
+        verbose_name="Модель",
+    )
+    object_id = models.BigIntegerField(
+        verbose_name="ID объекта",
+    )
+    action = models.CharField(
+        max_length=10,
+        verbose_name="Действие",
+        choices=ActionChoices.choices,
+    )
+    data = models.JSONField(
+        verbose_name="Данные объекта",
+        **NULLABLE,
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Время изменения",
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = "Запись журнала изменений"
+        verbose_name_plural = "Журнал изменений"
+        indexes = [
+            models.Index(
+                fields=["model_name", "object_id", "id"],
+                name="changelog_object_idx",
+            ),
+            models.Index(fields=["created_at"], name="changelog_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} {self.object_id} - {self.action}"
+
+
+class ExchangeRate(models.Model):
+    """
+    Курс валюты к базовой валюте DEBT_BASE_CURRENCY для пересчета
+    задолженности компаний. Таблица заполняется локально (админ-панель,
+    команда load_exchange_rates), обращений к внешним сервисам нет.
+    """
+
+    currency = models.CharField(
+        max_length=3,
+        unique=True,
+        verbose_name="Валюта",
+        help_text="Код валюты, например USD",
+    )
+    rate = models.DecimalField(
+        max_digits=18,
+        decimal_places=8,
+        verbose_name="Курс",
+        help_text="Стоимость единицы валюты в базовой валюте",
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата обновления",
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = "Курс валюты"
+        verbose_name_plural = "Курсы валют"
+        # На курс делится пересчет задолженности в другую валюту
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(rate__gt=0), name="exchange_rate_positive"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.currency} - {self.rate}"
+
+
+class CompanySummaryState(models.Model):
+    """
+    Вклад компании в сводные таблицы NetworkSummary на момент последнего
+    обновления. По разнице с текущими данными сводки обновляются
+    инкрементально, без пересчета групп целиком.
+    """
+
+    company_id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="ID компании",
+    )
+    level = models.PositiveIntegerField(
+        verbose_name="Номер уровня иерархии",
+    )
+    type = models.CharField(
+        max_length=150,
+        verbose_name="Тип компании",
+    )
+    country = models.CharField(
+        max_length=150,
+        verbose_name="Страна",
+        blank=True,
+    )
+    debt = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        verbose_name="Задолжность",
+    )
+    debt_currency = models.CharField(
+        max_length=3,
+        verbose_name="Валюта задолжности",
+    )
+    products = models.PositiveIntegerField(
+        verbose_name="Количество продуктов",
+    )
+
+    class Meta:
+        verbose_name = "Вклад компании в сводку"
+        verbose_name_plural = "Вклады компаний в сводку"
+
+
+class NetworkSummary(models.Model):
+    """
+    Сводка по сети: число компаний, задолженность (по валютам)
+    и число продуктов компаний в разрезе уровня, типа или страны.
+    """
+
+    class DimensionChoices(models.TextChoices):
+        LEVEL = "level", "Уровень"
+        TYPE = "type", "Тип компании"
+        COUNTRY = "country", "Страна"
+
+    dimension = models.CharField(
+        max_length=20,
+        verbose_name="Разрез",
+        choices=DimensionChoices.choices,
+    )
+    key = models.CharField(
+        max_length=150,
+        verbose_name="Значение",
+        blank=True,
+    )
+    debt_currency = models.CharField(
+        max_length=3,
+        verbose_name="Валюта задолжности",
+    )
+    companies = models.IntegerField(
+        default=0,
+        verbose_name="Количество компаний",
+    )
+    debt = models.DecimalField(
+        max_digits=20,
+        decimal_places=2,
+        default=0,
+        verbose_name="Задолжность",
+    )
+    products = models.IntegerField(
+        default=0,
+        verbose_name="Количество продуктов",
+    )
+
+    class Meta:
+        verbose_name = "Сводка по сети"
+        verbose_name_plural = "Сводки по сети"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimension", "key", "debt_currency"],
+                name="network_summary_unique",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.key} {self.debt_currency}"
+
+
+class Job(OwnedModel):
+    """
+    Фоновая задача в очереди в базе данных (retail_chain.jobs).
+    Задачи выполняет команда run_jobs, внешний брокер не нужен.
+    """
+
+    class StatusChoices(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        SUCCEEDED = "succeeded", "Выполнена"
+        FAILED = "failed", "Ошибка"
+        CANCELLED = "cancelled", "Отменена"
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name="Задача",
+    )
+    params = models.JSONField(
+        default=dict,
+        verbose_name="Параметры",
+    )
+    status = models.CharField(
+        max_length=20,
+        verbose_name="Статус",
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+    )
+    progress_done = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Выполнено",
+    )
+    progress_total = models.PositiveBigIntegerField(
+        verbose_name="Всего",
+        **NULLABLE,
+    )
+    result = models.JSONField(
+        verbose_name="Результат",
+        **NULLABLE,
+    )
+    error = models.TextField(
+        verbose_name="Ошибка",
+        blank=True,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Попыток",
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name="Максимум попыток",
+    )
+    cancel_requested = models.BooleanField(
+        default=False,
+        verbose_name="Запрошена отмена",
+    )
+    worker = models.CharField(
+        max_length=100,
+        verbose_name="Обработчик",
+        blank=True,
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Выполнить не раньше",
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Дата создания",
+        auto_now_add=True,
+    )
+    started_at = models.DateTimeField(
+        verbose_name="Начало выполнения",
+        **NULLABLE,
+    )
+    finished_at = models.DateTimeField(
+        verbose_name="Окончание выполнения",
+        **NULLABLE,
+    )
+    heartbeat_at = models.DateTimeField(
+        verbose_name="Последний сигнал обработчика",
+        **NULLABLE,
+    )
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=["owner", "id"], name="job_owner_id_idx"),
+            models.Index(
+                fields=["status", "run_after"], name="job_status_run_after_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} - {self.status}"
@@ -1,13 +1,25 @@
 from rest_framework import permissions
 
 
+def is_moderator(user):
+    """
+    Проверяет, состоит ли пользователь в группе moderators.
+    Результат запоминается на объекте пользователя на время запроса.
+    """
+    if not user.is_authenticated:
+        return False
+    if not hasattr(user, "_is_moderator"):
+        user._is_moderator = user.groups.filter(name="moderators").exists()
+    return user._is_moderator
+
+
 class IsUserModerator(permissions.BasePermission):
     """
     Ограничение прав доступа только для пользователей из группы moderator.
     """
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="moderators").exists()
+        return is_moderator(request.user)
 
 
 class IsUserOwner(permissions.BasePermission):
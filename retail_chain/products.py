@@ -0,0 +1,175 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import CharField, Value
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Cast, Concat
+
+from retail_chain.autocomplete import record_autocomplete_change
+from retail_chain.changes import record_changes
+from retail_chain.models import (
+    ChangeLogEntry,
+    Company,
+    Product,
+    normalize_product_key,
+)
+
+Action = ChangeLogEntry.ActionChoices
+
+
+def upsert_products(items, owner):
+    """
+    Создает продукты владельца owner или обновляет существующие с тем же
+    естественным ключом (название и модель). items - словари с product_name,
+    product_model и необязательной product_date. Существующие продукты
+    ищутся одним запросом по индексу (owner, natural_key), новые создаются
+    одним INSERT. Повторы внутри items объединяются. Продукты, созданные
+    параллельным запросом между поиском и вставкой, находятся повторным
+    поиском и считаются существующими: product_date обновляется, только
+    если передана.
+    Возвращает список (продукт, создан) в порядке items.
+    """
+    items_by_key = {}
+    keys = []
+    for item in items:
+        key = normalize_product_key(item["product_name"], item["product_model"])
+        keys.append(key)
+        if key in items_by_key and "product_date" not in item:
+            continue
+        items_by_key[key] = item
+
+    with transaction.atomic():
+        while True:
+            existing = {
+                product.natural_key: product
+                for product in Product.objects.filter(
+                    owner=owner, natural_key__in=items_by_key
+                )
+            }
+            new = [
+                Product(
+                    owner=owner,
+                    natural_key=key,
+                    product_name=item["product_name"],
+                    product_model=item["product_model"],
+                    product_date=item.get("product_date"),
+                )
+                for key, item in items_by_key.items()
+                if key not in existing
+            ]
+            if not new:
+                break
+            try:
+                with transaction.atomic():
+                    Product.objects.bulk_create(new)
+            except IntegrityError:
+                # Продукт с тем же ключом создал параллельный запрос: после
+                # отката точки сохранения он виден и обновляется как существующий
+                if not Product.objects.filter(
+                    owner=owner,
+                    natural_key__in=[product.natural_key for product in new],
+                ).exists():
+                    raise
+                continue
+            break
+
+        updated = []
+        for key, product in existing.items():
+            item = items_by_key[key]
+            if "product_date" in item and item["product_date"] != product.product_date:
+                product.product_date = item["product_date"]
+                updated.append(product)
+        Product.objects.bulk_update(updated, ["product_date"])
+
+        # bulk_create и bulk_update не отправляют сигналы
+        changed = [*new, *updated]
+        record_changes(Product, [product.pk for product in new], Action.INSERT)
+        record_changes(Product, [product.pk for product in updated])
+        transaction.on_commit(
+            lambda: [
+                record_autocomplete_change(Product, product.pk) for product in changed
+            ]
+        )
+
+    created = {product.natural_key for product in new}
+    products = {**existing, **{product.natural_key: product for product in new}}
+    return [(products[key], key in created) for key in keys]
+
+
+def _merge_batch(product_model, through, duplicates):
+    """
+    Переносит связи с компаниями с дублей на оставляемые продукты одним
+    INSERT ... SELECT (существующие связи пропускаются), удаляет связи дублей
+    и сами дубли. duplicates: {id дубля: id оставляемого продукта}.
+    Возвращает id затронутых компаний.
+    """
+    qn = connection.ops.quote_name
+    company_column = qn(through._meta.get_field("company").column)
+    product_column = qn(through._meta.get_field("product").column)
+    links = through.objects.filter(product_id__in=duplicates)
+    company_ids = list(links.values_list("company_id", flat=True).distinct())
+    if company_ids:
+        cases = " ".join(["WHEN %s THEN %s"] * len(duplicates))
+        params = [value for pair in duplicates.items() for value in pair]
+        sql = (
+            f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} "
+            f"{qn(through._meta.db_table)} ({company_column}, {product_column}) "
+            f"SELECT t.{company_column}, CASE t.{product_column} {cases} END "
+            f"FROM {qn(through._meta.db_table)} t "
+            f"WHERE t.{product_column} IN ({', '.join(['%s'] * len(duplicates))}) "
+            f"{connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (*params, *duplicates))
+        links.delete()
+    product_model.objects.filter(pk__in=duplicates).delete()
+    return company_ids
+
+
+def dedupe_products(product_model=Product, company_model=Company, batch_size=1000):
+    """
+    Объединяет продукты с одинаковым естественным ключом у одного владельца:
+    остается продукт с меньшим id, связи дублей с компаниями переносятся
+    на него, дубли удаляются. Затем пересчитывает natural_key продуктов,
+    у которых он устарел.
+    Возвращает (удалено дублей, обновлено ключей, id затронутых компаний).
+    """
+    through = company_model.products.through
+    keepers = {}
+    duplicates = {}
+    stale_keys = {}
+    rows = product_model.objects.order_by("pk").values_list(
+        "pk", "owner_id", "product_name", "product_model", "natural_key"
+    )
+    for pk, owner_id, name, model, stored_key in rows.iterator(chunk_size=batch_size):
+        key = normalize_product_key(name, model)
+        keeper = keepers.setdefault((owner_id, key), pk)
+        if keeper != pk:
+            duplicates[pk] = keeper
+        elif stored_key != key:
+            stale_keys[pk] = key
+
+    company_ids = set()
+    duplicate_items = list(duplicates.items())
+    for start in range(0, len(duplicate_items), batch_size):
+        with transaction.atomic():
+            company_ids.update(
+                _merge_batch(
+                    product_model,
+                    through,
+                    dict(duplicate_items[start : start + batch_size]),
+                )
+            )
+
+    stale_items = list(stale_keys.items())
+    for start in range(0, len(stale_items), batch_size):
+        batch = dict(stale_items[start : start + batch_size])
+        with transaction.atomic():
+            # Сначала уникальные временные ключи, чтобы новые ключи
+            # не совпали с еще не обновленными старыми
+            product_model.objects.filter(pk__in=batch).update(
+                natural_key=Concat(Value("#"), Cast("pk", CharField()))
+            )
+            products = [
+                product_model(pk=pk, natural_key=key) for pk, key in batch.items()
+            ]
+            product_model.objects.bulk_update(products, ["natural_key"])
+    return len(duplicates), len(stale_keys), sorted(company_ids)
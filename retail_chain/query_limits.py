@@ -0,0 +1,313 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {"timeout_ms": 30 * 1000, "max_queries": 200}
+
+DEFAULT_EXEMPT_PATHS = ("/admin/", "/static/", "/media/")
+
+# Ограничитель текущего запроса; в потоки передается через copy_context()
+_current_limiter = ContextVar("retail_chain_query_limiter", default=None)
+
+
+class QueryLimitExceeded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class QueryTimeout(QueryLimitExceeded):
+    default_code = "query_timeout"
+
+    def __init__(self, timeout_ms):
+        super().__init__(
+            f"Запрос к базе данных выполнялся дольше {timeout_ms} мс и был "
+            "прерван. Уточните условия поиска или фильтры"
+        )
+
+
+class QueryBudgetExceeded(QueryLimitExceeded):
+    default_code = "query_budget_exceeded"
+
+    def __init__(self, max_queries):
+        super().__init__(
+            f"Превышено число запросов к базе данных ({max_queries}) "
+            "на один запрос к API"
+        )
+
+
+class StatementTimeout:
+    """
+    Ограничение времени выполнения SQL запроса для одного типа базы данных.
+    Базовый класс ничего не ограничивает (базы данных без поддержки).
+    """
+
+    def apply(self, connection, timeout_ms):
+        """
+        Устанавливает ограничение для сессии соединения (None - снимает).
+        """
+
+    @contextmanager
+    def statement(self, connection, timeout_ms):
+        """
+        Ограничение на время выполнения одного запроса.
+        """
+        yield
+
+    def is_timeout(self, error):
+        return False
+
+
+class PostgreSQLStatementTimeout(StatementTimeout):
+    """
+    statement_timeout сессии: сервер сам отменяет запрос. Устанавливается
+    через исходное соединение драйвера, в обход execute_wrapper.
+    """
+
+    def apply(self, connection, timeout_ms):
+        with connection.connection.cursor() as cursor:
+            if timeout_ms is None:
+                cursor.execute("RESET statement_timeout")
+            else:
+                cursor.execute(
+                    "SELECT set_config('statement_timeout', %s, false)",
+                    [str(int(timeout_ms))],
+                )
+
+    def is_timeout(self, error):
+        # query_canceled: psycopg2 - pgcode, psycopg 3 - sqlstate
+        cause = error.__cause__
+        code = getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)
+        return code == "57014"
+
+
+class SQLiteStatementTimeout(StatementTimeout):
+    """
+    Прерывание запроса обработчиком прогресса sqlite3 по истечении времени.
+    Ограничивается выполнение запроса до первой строки результата: сортировки,
+    соединения и агрегаты, но не последующая выборка строк.
+    """
+
+    progress_steps = 1000
+
+    @contextmanager
+    def statement(self, connection, timeout_ms):
+        deadline = time.monotonic() + timeout_ms / 1000
+        connection.connection.set_progress_handler(
+            lambda: time.monotonic() > deadline, self.progress_steps
+        )
+        try:
+            yield
+        finally:
+            connection.connection.set_progress_handler(None, self.progress_steps)
+
+    def is_timeout(self, error):
+        return str(error.__cause__) == "interrupted"
+
+
+STATEMENT_TIMEOUTS = {
+    "postgresql": PostgreSQLStatementTimeout(),
+    "sqlite": SQLiteStatementTimeout(),
+}
+
+
+def get_statement_timeout(connection):
+    return STATEMENT_TIMEOUTS.get(connection.vendor, StatementTimeout())
+
+
+def get_limits(*keys):
+    """
+    Ограничения из QUERY_LIMITS: "default", дополненные по очереди
+    ограничениями ключей keys. None - без ограничения.
+    """
+    config = getattr(settings, "QUERY_LIMITS", {})
+    limits = {**DEFAULT_LIMITS, **config.get("default", {})}
+    for key in keys:
+        limits.update(config.get(key, {}))
+    return limits
+
+
+def get_view_name(view_func, method):
+    """
+    Ключи ограничений представления: имя класса и "Класс.действие"
+    (действие ViewSet или HTTP метод в нижнем регистре).
+    """
+    view_class = getattr(view_func, "cls", None)
+    name = view_class.__name__ if view_class else view_func.__name__
+    actions = getattr(view_func, "actions", None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return name, f"{name}.{action}"
+
+
+class QueryLimiter:
+    """
+    execute_wrapper соединений потока: считает SQL запросы и ограничивает
+    время каждого. При превышении запрос прерывается исключением
+    QueryTimeout или QueryBudgetExceeded, которое DRF возвращает
+    как ответ с ошибкой.
+    """
+
+    def __init__(self, limits, parent=None, endpoint=""):
+        self.limits = limits
+        # Представление или путь запроса для журнала
+        self.endpoint = endpoint
+        self.queries = 0
+        # alias -> (установленное ограничение, установлено в транзакции)
+        self.applied = {}
+        # Соединения с базой данных и их execute_wrapper привязаны к потоку
+        self.thread = threading.get_ident()
+        self.parent = parent
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def scope(self, limits, endpoint=""):
+        """
+        Собственные ограничения вложенного запроса (например в /batch/).
+        Его SQL запросы учитываются и во внешнем счетчике.
+        """
+        outer = self.limits, self.queries, self.endpoint
+        self.limits, self.queries = limits, 0
+        self.endpoint = endpoint or self.endpoint
+        try:
+            yield self
+        finally:
+            self.limits, self.endpoint = outer[0], outer[2]
+            self.queries = outer[1] + self.queries
+
+    def add_queries(self, count):
+        """
+        Учитывает запросы ограничителя другого потока (вложенного запроса
+        /batch/, выполненного параллельно).
+        """
+        with self._lock:
+            self.queries += count
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context["connection"]
+        max_queries = self.limits["max_queries"]
+        self.queries += 1
+        if max_queries is not None and self.queries > max_queries:
+            logger.warning(
+                "Превышено число SQL запросов в %s: %s при ограничении %s: %s",
+                self.endpoint or "-",
+                self.queries,
+                max_queries,
+                sql,
+            )
+            raise QueryBudgetExceeded(max_queries)
+
+        timeout_ms = self.limits["timeout_ms"]
+        backend = get_statement_timeout(connection)
+        self.apply(backend, connection, timeout_ms)
+        try:
+            if timeout_ms is None:
+                return execute(sql, params, many, context)
+            with backend.statement(connection, timeout_ms):
+                return execute(sql, params, many, context)
+        except DatabaseError as e:
+            if timeout_ms is None or not backend.is_timeout(e):
+                raise
+            logger.warning("SQL запрос дольше %s мс прерван: %s", timeout_ms, sql)
+            raise QueryTimeout(timeout_ms) from e
+
+    def apply(self, backend, connection, timeout_ms):
+        applied = self.applied.get(connection.alias)
+        # Установка внутри транзакции отменяется ее откатом, поэтому
+        # после транзакции ограничение устанавливается повторно
+        if applied is not None and applied[0] == timeout_ms:
+            if not applied[1] or connection.in_atomic_block:
+                return
+        if applied is None and timeout_ms is None:
+            return
+        backend.apply(connection, timeout_ms)
+        self.applied[connection.alias] = (timeout_ms, connection.in_atomic_block)
+
+    def reset(self):
+        """
+        Снимает ограничения сессий, чтобы они не перешли к следующему
+        запросу через постоянное соединение.
+        """
+        for alias, (timeout_ms, _) in self.applied.items():
+            connection = connections[alias]
+            if timeout_ms is None or connection.connection is None:
+                continue
+            try:
+                get_statement_timeout(connection).apply(connection, None)
+            except Exception:
+                connection.close()
+        self.applied = {}
+
+
+@contextmanager
+def limit_queries(limits, endpoint=""):
+    """
+    Ограничивает SQL запросы текущего потока до выхода из блока. Если
+    ограничения уже действуют, блок получает свои ограничения и счетчик.
+    В другом потоке с контекстом запроса (copy_context()) блок получает
+    свой ограничитель, а его запросы учитываются в ограничителе запроса.
+    endpoint - представление или путь для журнала.
+    """
+    parent = _current_limiter.get()
+    if parent is not None and parent.thread == threading.get_ident():
+        with parent.scope(limits, endpoint):
+            yield parent
+        return
+
+    limiter = QueryLimiter(limits, parent, endpoint)
+    token = _current_limiter.set(limiter)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(limiter))
+            yield limiter
+    finally:
+        _current_limiter.reset(token)
+        limiter.reset()
+        if parent is not None:
+            parent.add_queries(limiter.queries)
+
+
+class QueryLimitsMiddleware:
+    """
+    Ограничения SQL запросов на HTTP запрос: время выполнения каждого
+    SQL запроса и их число (QUERY_LIMITS, по представлениям и действиям).
+    До определения представления действуют ограничения "default".
+    Пути QUERY_LIMITS_EXEMPT_PATHS (админ-панель) не ограничиваются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.exempt_paths = tuple(
+            getattr(settings, "QUERY_LIMITS_EXEMPT_PATHS", DEFAULT_EXEMPT_PATHS)
+        )
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.exempt_paths):
+            return self.get_response(request)
+        endpoint = f"{request.method} {request.path_info}"
+        with limit_queries(get_limits(), endpoint) as limiter:
+            request.query_limiter = limiter
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        limiter = getattr(request, "query_limiter", None)
+        if limiter is not None:
+            names = get_view_name(view_func, request.method)
+            limiter.limits = get_limits(*names)
+            limiter.endpoint = f"{request.method} {request.path_info} ({names[1]})"
+
+    def process_exception(self, request, exception):
+        # Представления DRF сами возвращают ответ на APIException
+        if isinstance(exception, QueryLimitExceeded):
+            return JsonResponse(
+                {"detail": str(exception.detail), "code": exception.default_code},
+                status=exception.status_code,
+            )
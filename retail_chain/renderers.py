@@ -0,0 +1,93 @@
+import datetime
+
+from django.conf import settings
+from djmoney.money import Money
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from retail_chain.tracing import span
+
+try:
+    import orjson
+except ImportError:  # orjson - необязательная зависимость
+    orjson = None
+
+
+class RetailJSONEncoder(JSONEncoder):
+    """
+    JSONEncoder DRF с поддержкой Money и форматов дат из настроек
+    REST_FRAMEWORK (DATETIME_FORMAT, DATE_FORMAT, TIME_FORMAT).
+    """
+
+    datetime_field = serializers.DateTimeField()
+    date_field = serializers.DateField()
+    time_field = serializers.TimeField()
+
+    def default(self, obj):
+        if isinstance(obj, Money):
+            return {"amount": str(obj.amount), "currency": str(obj.currency)}
+        if isinstance(obj, datetime.datetime):
+            return self.datetime_field.to_representation(obj)
+        if isinstance(obj, datetime.date):
+            return self.date_field.to_representation(obj)
+        if isinstance(obj, datetime.time):
+            return self.time_field.to_representation(obj)
+        return super().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON рендерер на orjson, вывод совпадает со стандартным JSONRenderer
+    с RetailJSONEncoder. Типы, которые orjson не поддерживает (Decimal, Money,
+    ленивые строки перевода, даты), передаются RetailJSONEncoder.
+    Стандартный рендерер работает без orjson, при ensure_ascii
+    (UNICODE_JSON=False), некомпактном выводе (COMPACT_JSON=False) и при
+    запросе отступов, отличных от 2.
+
+    Отличие: NaN и бесконечность orjson записывает как null, а стандартный
+    рендерер при STRICT_JSON выбрасывает ValueError.
+    """
+
+    encoder_class = RetailJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span("render", renderer=type(self).__name__):
+            return self.encode(data, accepted_media_type, renderer_context)
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        elif indent:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=option)
+        # Как и стандартный рендерер, экранируем разделители строк для JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON парсер на orjson. Без orjson или для кодировок,
+    отличных от UTF-8, работает стандартный парсер.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
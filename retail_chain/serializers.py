@@ -1,25 +1,106 @@
+from django.conf import settings
 from rest_framework import serializers
-from retail_chain.models import Company, Contacts, Product
+from retail_chain.models import (
+    INN_VALIDATOR,
+    Company,
+    Contacts,
+    Job,
+    Product,
+    normalize_product_key,
+)
 
 
 class ContactsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contacts
         fields = "__all__"
+        read_only_fields = ("owner",)
 
 
 class ProductSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        product_name = attrs.get(
+            "product_name", getattr(self.instance, "product_name", "")
+        )
+        product_model = attrs.get(
+            "product_model", getattr(self.instance, "product_model", "")
+        )
+        if self.instance is not None:
+            owner = self.instance.owner
+        else:
+            owner = self.context["request"].user if "request" in self.context else None
+        duplicates = Product.objects.filter(
+            owner=owner, natural_key=normalize_product_key(product_name, product_model)
+        )
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                "Продукт с таким названием и моделью уже есть, "
+                "используйте /products/upsert/"
+            )
+        return attrs
+
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ("natural_key",)
+        read_only_fields = ("owner",)
+
+
+class ProductUpsertSerializer(serializers.Serializer):
+    product_name = serializers.CharField(max_length=250)
+    product_model = serializers.CharField(max_length=150)
+    product_date = serializers.DateField(required=False, allow_null=True)
+
+    def validate_product_name(self, value):
+        if value.isdigit():
+            raise serializers.ValidationError(
+                "Название не может состоять только из цифр"
+            )
+        return value
+
+
+class ProductUpsertListSerializer(serializers.ListSerializer):
+    child = ProductUpsertSerializer()
+
+    def validate(self, attrs):
+        max_products = getattr(settings, "PRODUCTS_UPSERT_MAX", 1000)
+        if not attrs:
+            raise serializers.ValidationError("Список продуктов пуст")
+        if len(attrs) > max_products:
+            raise serializers.ValidationError(
+                f"Не более {max_products} продуктов в одном запросе"
+            )
+        return attrs
 
 
 class CompanyAllFieldsSerializer(serializers.ModelSerializer):
+    """
+    Принимает необязательный аргумент expand - дерево раскрытия связей
+    (см. retail_chain.expand.parse_expand). Раскрытые связи выводятся
+    вложенными объектами вместо идентификаторов.
+    """
+
     company_products = ProductSerializer(many=True, read_only=True)
 
+    def __init__(self, *args, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, subtree in (expand or {}).items():
+            if name == "supplier":
+                self.fields["supplier"] = CompanyAllFieldsSerializer(
+                    read_only=True, expand=subtree
+                )
+            elif name == "contacts":
+                self.fields["contacts"] = ContactsSerializer(
+                    many=True, read_only=True, source="company_contacts"
+                )
+            elif name == "products":
+                self.fields["products"] = ProductSerializer(many=True, read_only=True)
+
     class Meta:
         model = Company
         exclude = ("debt", "debt_currency")
+        read_only_fields = ("owner",)
 
 
 class CompanySerializer(serializers.ModelSerializer):
@@ -28,3 +109,110 @@ class CompanySerializer(serializers.ModelSerializer):
     class Meta:
         model = Company
         fields = "__all__"
+        read_only_fields = ("owner",)
+
+
+class CompanyChainSerializer(serializers.ModelSerializer):
+    depth = serializers.IntegerField(read_only=True)
+    contacts = ContactsSerializer(many=True, read_only=True, source="company_contacts")
+
+    class Meta:
+        model = Company
+        fields = ("id", "name", "type", "level", "depth", "contacts")
+
+
+class CompanyShortSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Company
+        fields = ("id", "name", "type", "level", "supplier")
+
+
+class ContactsLookupSerializer(serializers.ModelSerializer):
+    company = CompanyShortSerializer(read_only=True)
+
+    class Meta:
+        model = Contacts
+        fields = "__all__"
+
+
+class ContactsBatchLookupSerializer(serializers.Serializer):
+    inn = serializers.ListField(
+        child=serializers.CharField(validators=[INN_VALIDATOR]),
+        required=False,
+        default=list,
+    )
+    email = serializers.ListField(
+        child=serializers.EmailField(), required=False, default=list
+    )
+
+    def validate(self, attrs):
+        total = len(attrs["inn"]) + len(attrs["email"])
+        max_values = getattr(settings, "CONTACTS_LOOKUP_MAX", 1000)
+        if not total:
+            raise serializers.ValidationError("Укажите inn или email")
+        if total > max_values:
+            raise serializers.ValidationError(
+                f"Не более {max_values} значений в одном запросе"
+            )
+        return attrs
+
+
+class CompanyProductsBulkSerializer(serializers.Serializer):
+    products = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    companies = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False
+    )
+    subtree_of = serializers.IntegerField(min_value=1, required=False)
+    company_type = serializers.ChoiceField(
+        choices=list(Company.type_company.items()), required=False
+    )
+
+    def validate(self, attrs):
+        if ("companies" in attrs) == ("subtree_of" in attrs):
+            raise serializers.ValidationError("Укажите companies или subtree_of")
+        max_ids = getattr(settings, "COMPANY_PRODUCTS_BULK_MAX", 1000)
+        for field in ("products", "companies"):
+            if len(attrs.get(field, ())) > max_ids:
+                raise serializers.ValidationError(
+                    {field: f"Не более {max_ids} значений в одном запросе"}
+                )
+        return attrs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "name",
+            "params",
+            "status",
+            "progress_done",
+            "progress_total",
+            "result",
+            "error",
+            "attempts",
+            "max_attempts",
+            "cancel_requested",
+            "run_after",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "owner",
+        )
+        read_only_fields = fields
+
+
+class JobCreateSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    params = serializers.DictField(required=False, default=dict)
+
+    def validate_name(self, value):
+        allowed = self.context["allowed_jobs"]
+        if value not in allowed:
+            raise serializers.ValidationError(
+                f"Допустимые задачи: {', '.join(sorted(allowed))}"
+            )
+        return value
@@ -0,0 +1,187 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from retail_chain.autocomplete import record_autocomplete_change
+from retail_chain.changes import record_change, record_changes
+from retail_chain.debts import invalidate_debt_totals
+from retail_chain.facets import invalidate_facets
+from retail_chain.graph import record_company_change
+from retail_chain.hierarchy import invalidate_subtree_products
+from retail_chain.models import (
+    ChangeLogEntry,
+    Company,
+    Contacts,
+    ExchangeRate,
+    Product,
+)
+from retail_chain.summaries import refresh_company_summaries
+
+Action = ChangeLogEntry.ActionChoices
+
+
+@receiver(pre_save, sender=Company)
+def remember_company_supplier(sender, instance, **kwargs):
+    """
+    Запоминает прежнего поставщика, чтобы после сохранения понять,
+    изменилась ли цепочка поставок.
+    """
+    instance._previous_supplier_id = None
+    if instance.pk is not None:
+        instance._previous_supplier_id = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("supplier_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Company)
+def company_saved(sender, instance, created, **kwargs):
+    company_id = instance.pk
+    supplier_changed = instance.supplier_id != getattr(
+        instance, "_previous_supplier_id", None
+    )
+    if supplier_changed:
+        transaction.on_commit(invalidate_subtree_products)
+    if created or supplier_changed:
+        transaction.on_commit(lambda: record_company_change(company_id))
+
+
+@receiver(post_delete, sender=Company)
+def company_deleted(sender, instance, **kwargs):
+    company_id = instance.pk
+    transaction.on_commit(invalidate_subtree_products)
+    transaction.on_commit(lambda: record_company_change(company_id))
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_companies(sender, instance, **kwargs):
+    """
+    Связи продукта с компаниями удаляются каскадно без сигнала m2m_changed,
+    поэтому компании запоминаются до удаления для журнала изменений.
+    """
+    instance._company_ids = list(instance.company_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    company_ids = getattr(instance, "_company_ids", [])
+    transaction.on_commit(invalidate_subtree_products)
+    record_changes(Company, company_ids)
+    refresh_company_summaries(company_ids)
+
+
+@receiver(m2m_changed, sender=Company.products.through)
+def company_products_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._company_ids = list(instance.company_set.values_list("pk", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    transaction.on_commit(invalidate_subtree_products)
+    if not reverse:
+        record_change(instance, Action.UPDATE)
+        refresh_company_summaries([instance.pk])
+        return
+    company_ids = pk_set
+    if action == "post_clear":
+        company_ids = getattr(instance, "_company_ids", [])
+    record_changes(Company, company_ids)
+    refresh_company_summaries(company_ids)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Contacts)
+def log_saved(sender, instance, created, **kwargs):
+    record_change(instance, Action.INSERT if created else Action.UPDATE)
+
+
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Contacts)
+def log_deleted(sender, instance, **kwargs):
+    record_change(instance, Action.DELETE)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=Contacts)
+@receiver(post_delete, sender=Contacts)
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def debts_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_debt_totals)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=Contacts)
+@receiver(post_delete, sender=Contacts)
+def facets_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_facets)
+
+
+@receiver(pre_save, sender=Contacts)
+def remember_contacts_company(sender, instance, **kwargs):
+    """
+    Запоминает прежние компанию, страну и город контакта: при переносе
+    контакта меняется страна в сводках обеих компаний, а варианты фильтров
+    админ-панели зависят только от страны и города.
+    """
+    instance._previous_company_id = None
+    instance._previous_location = None
+    if instance.pk is not None:
+        row = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("company_id", "country", "city")
+            .first()
+        )
+        if row is not None:
+            instance._previous_company_id = row[0]
+            instance._previous_location = row[1:]
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def company_summaries_changed(sender, instance, **kwargs):
+    refresh_company_summaries([instance.pk])
+
+
+@receiver(post_save, sender=Contacts)
+@receiver(post_delete, sender=Contacts)
+def contacts_summaries_changed(sender, instance, **kwargs):
+    company_ids = {instance.company_id, getattr(instance, "_previous_company_id", None)}
+    refresh_company_summaries(company_ids - {None})
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def autocomplete_changed(sender, instance, **kwargs):
+    object_id = instance.pk
+    transaction.on_commit(lambda: record_autocomplete_change(sender, object_id))
+
+
+@receiver(post_save, sender=Contacts)
+def contacts_location_saved(sender, instance, **kwargs):
+    # Варианты фильтров страны и города не меняются при сохранении
+    # контакта с прежними страной и городом
+    location = (instance.country, instance.city)
+    if getattr(instance, "_previous_location", None) != location:
+        contacts_admin_filters_changed(sender)
+
+
+@receiver(post_delete, sender=Contacts)
+def contacts_admin_filters_changed(sender, **kwargs):
+    # admin_filters импортирует django.contrib.admin, который не нужен
+    # процессам API при старте
+    from retail_chain.admin_filters import invalidate_admin_filters
+
+    transaction.on_commit(lambda: invalidate_admin_filters(sender))
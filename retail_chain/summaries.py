@@ -0,0 +1,307 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from retail_chain.models import (
+    Company,
+    CompanySummaryState,
+    Contacts,
+    NetworkSummary,
+)
+
+Dimension = NetworkSummary.DimensionChoices
+
+STATE_FIELDS = ("level", "type", "country", "debt", "debt_currency", "products")
+
+
+def _country_subquery():
+    # Страна первой контактной записи компании, как и в отчете о задолженности
+    return Coalesce(
+        Subquery(
+            Contacts.objects.filter(company=OuterRef("pk"))
+            .order_by("pk")
+            .values("country")[:1]
+        ),
+        Value(""),
+    )
+
+
+def _products_subquery():
+    through = Company.products.through
+    return Coalesce(
+        Subquery(
+            through.objects.filter(company_id=OuterRef("pk"))
+            .order_by()
+            .values("company_id")
+            .annotate(count=Count("*"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+def company_states(queryset):
+    """
+    Текущий вклад компаний queryset в сводки (CompanySummaryState без записи
+    в базу), один запрос.
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(country_name=_country_subquery(), product_count=_products_subquery())
+        .values_list(
+            "pk",
+            "level",
+            "type",
+            "country_name",
+            "debt",
+            "debt_currency",
+            "product_count",
+        )
+    )
+    for pk, level, type, country, debt, debt_currency, products in rows.iterator(
+        chunk_size=2000
+    ):
+        yield CompanySummaryState(
+            company_id=pk,
+            level=level,
+            type=type,
+            country=country,
+            debt=debt,
+            debt_currency=debt_currency,
+            products=products,
+        )
+
+
+def _add_state(totals, state, sign=1):
+    for dimension, key in (
+        (Dimension.LEVEL, str(state.level)),
+        (Dimension.TYPE, state.type),
+        (Dimension.COUNTRY, state.country),
+    ):
+        total = totals[(dimension, key, state.debt_currency)]
+        total[0] += sign
+        total[1] += sign * state.debt
+        total[2] += sign * state.products
+
+
+def _new_totals():
+    return defaultdict(lambda: [0, Decimal(0), 0])
+
+
+def _same_state(old, new):
+    return all(getattr(old, name) == getattr(new, name) for name in STATE_FIELDS)
+
+
+def _apply_deltas(deltas):
+    for (dimension, key, debt_currency), (companies, debt, products) in deltas.items():
+        if not (companies or debt or products):
+            continue
+        rows = NetworkSummary.objects.filter(
+            dimension=dimension, key=key, debt_currency=debt_currency
+        )
+        increments = {
+            "companies": F("companies") + companies,
+            "debt": F("debt") + debt,
+            "products": F("products") + products,
+        }
+        if rows.update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                NetworkSummary.objects.create(
+                    dimension=dimension,
+                    key=key,
+                    debt_currency=debt_currency,
+                    companies=companies,
+                    debt=debt,
+                    products=products,
+                )
+        except IntegrityError:
+            # Строку только что создал параллельный запрос
+            rows.update(**increments)
+
+
+def refresh_company_summaries(company_ids):
+    """
+    Инкрементальное обновление сводок после изменения компаний: из сводок
+    вычитается сохраненный вклад компаний и прибавляется текущий. Удаленные
+    компании просто вычитаются. Вызывается в транзакции изменения.
+    """
+    ids = set(company_ids)
+    if not ids:
+        return
+    with transaction.atomic(savepoint=False):
+        old = CompanySummaryState.objects.select_for_update().in_bulk(ids)
+        new = {
+            state.company_id: state
+            for state in company_states(Company.objects.filter(pk__in=ids))
+        }
+        changed = [
+            state
+            for pk, state in new.items()
+            if pk not in old or not _same_state(old[pk], state)
+        ]
+        removed = old.keys() - new.keys()
+        if not changed and not removed:
+            return
+
+        deltas = _new_totals()
+        for state in changed:
+            if state.company_id in old:
+                _add_state(deltas, old[state.company_id], -1)
+            _add_state(deltas, state)
+        for pk in removed:
+            _add_state(deltas, old[pk], -1)
+        _apply_deltas(deltas)
+        if any(companies < 0 for companies, _, _ in deltas.values()):
+            NetworkSummary.objects.filter(companies=0).delete()
+
+        if removed:
+            CompanySummaryState.objects.filter(pk__in=removed).delete()
+        CompanySummaryState.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=["company_id"],
+            update_fields=STATE_FIELDS,
+        )
+
+
+def refresh_company_products(company_ids):
+    """
+    Обновление сводок после изменения только связей компаний с продуктами
+    (массовое назначение): вклад компаний меняется лишь числом продуктов,
+    поэтому разница по группам считается одним агрегатным запросом,
+    а вклады компаний обновляются одним UPDATE, без загрузки состояний.
+    Компании без сохраненного вклада обновляются refresh_company_summaries.
+    """
+    ids = set(company_ids)
+    if not ids:
+        return
+    with transaction.atomic(savepoint=False):
+        states = CompanySummaryState.objects.filter(pk__in=ids)
+        stored = set(states.select_for_update().values_list("pk", flat=True))
+        groups = (
+            states.order_by()
+            .annotate(current=_products_subquery())
+            .values("level", "type", "country", "debt_currency")
+            .annotate(delta=Sum(F("current") - F("products")))
+        )
+        deltas = _new_totals()
+        for row in groups:
+            for dimension, key in (
+                (Dimension.LEVEL, str(row["level"])),
+                (Dimension.TYPE, row["type"]),
+                (Dimension.COUNTRY, row["country"]),
+            ):
+                deltas[(dimension, key, row["debt_currency"])][2] += row["delta"]
+        _apply_deltas(deltas)
+        states.update(products=_products_subquery())
+    refresh_company_summaries(ids - stored)
+
+
+def rebuild_summaries(batch_size=2000):
+    """
+    Полный пересчет сводок и вкладов компаний.
+    """
+    totals = _new_totals()
+    with transaction.atomic():
+        CompanySummaryState.objects.all().delete()
+        NetworkSummary.objects.all().delete()
+        batch = []
+        for state in company_states(Company.objects.all()):
+            _add_state(totals, state)
+            batch.append(state)
+            if len(batch) >= batch_size:
+                CompanySummaryState.objects.bulk_create(batch)
+                batch = []
+        CompanySummaryState.objects.bulk_create(batch)
+        NetworkSummary.objects.bulk_create(
+            (
+                NetworkSummary(
+                    dimension=dimension,
+                    key=key,
+                    debt_currency=debt_currency,
+                    companies=companies,
+                    debt=debt,
+                    products=products,
+                )
+                for (dimension, key, debt_currency), (
+                    companies,
+                    debt,
+                    products,
+                ) in totals.items()
+            ),
+            batch_size=batch_size,
+        )
+    return len(totals)
+
+
+def compute_summaries():
+    """
+    Сводки, посчитанные заново агрегатными запросами по Company,
+    Contacts и таблице связи с продуктами, без таблиц сводок.
+    """
+    queryset = Company.objects.order_by().annotate(
+        country_name=_country_subquery(), product_count=_products_subquery()
+    )
+    result = {}
+    for dimension, field in (
+        (Dimension.LEVEL, "level"),
+        (Dimension.TYPE, "type"),
+        (Dimension.COUNTRY, "country_name"),
+    ):
+        rows = queryset.values(field, "debt_currency").annotate(
+            companies=Count("pk"),
+            debt_total=Sum("debt"),
+            products=Sum("product_count"),
+        )
+        for row in rows:
+            result[(dimension, str(row[field]), row["debt_currency"])] = (
+                row["companies"],
+                row["debt_total"],
+                row["products"],
+            )
+    return result
+
+
+def check_summaries():
+    """
+    Сравнивает таблицу сводок с полным пересчетом. Возвращает список
+    расхождений (разрез, значение, валюта, в таблице, по пересчету).
+    """
+    expected = compute_summaries()
+    stored = {
+        (row.dimension, row.key, row.debt_currency): (
+            row.companies,
+            row.debt,
+            row.products,
+        )
+        for row in NetworkSummary.objects.all()
+    }
+    differences = []
+    for key in sorted(expected.keys() | stored.keys()):
+        if expected.get(key) != stored.get(key):
+            differences.append((*key, stored.get(key), expected.get(key)))
+    return differences
+
+
+def get_network_summary():
+    """
+    Сводки для панели управления: по каждому разрезу список значений
+    с числом компаний, продуктов и задолженностью по валютам.
+    Читается только таблица сводок, размер которой не зависит
+    от числа компаний.
+    """
+    result = {dimension: {} for dimension in Dimension.values}
+    for row in NetworkSummary.objects.order_by("dimension", "key", "debt_currency"):
+        item = result[row.dimension].setdefault(
+            row.key,
+            {"key": row.key or None, "companies": 0, "products": 0, "debt": {}},
+        )
+        item["companies"] += row.companies
+        item["products"] += row.products
+        item["debt"][row.debt_currency] = str(row.debt)
+    return {dimension: list(items.values()) for dimension, items in result.items()}
@@ -0,0 +1,148 @@
+import csv
+import io
+import secrets
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from rest_framework import serializers
+
+from retail_chain.changes import record_changes
+from retail_chain.debts import invalidate_debt_totals
+from retail_chain.facets import invalidate_facets
+from retail_chain.graph import get_supplier_graph
+from retail_chain.jobs import JobParamsSerializer, register_job
+from retail_chain.models import Company
+from retail_chain.permissions import is_moderator
+from retail_chain.summaries import refresh_company_summaries
+
+EXPORT_DIR = "exports"
+EXPORT_COMPANY_FIELDS = (
+    "id",
+    "name",
+    "type",
+    "level",
+    "supplier_id",
+    "debt",
+    "debt_currency",
+    "date_created",
+)
+
+
+def _batch_size():
+    return getattr(settings, "JOBS_BATCH_SIZE", 1000)
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start : start + size]
+
+
+def zero_company_debt(ids):
+    """
+    Обнуляет задолженность компаний одним UPDATE. update() не отправляет
+    сигналы, поэтому журнал изменений и сводки обновляются явно.
+    """
+    with transaction.atomic():
+        Company.objects.filter(pk__in=ids).update(debt=0)
+        record_changes(Company, ids)
+        refresh_company_summaries(ids)
+        transaction.on_commit(invalidate_debt_totals)
+
+
+class ZeroDebtParams(JobParamsSerializer):
+    company_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+
+
+@register_job("zero_debt", params=ZeroDebtParams)
+def zero_debt(context, company_ids):
+    """
+    Обнуление задолженности выбранных компаний частями по JOBS_BATCH_SIZE,
+    каждая часть в своей транзакции.
+    """
+    ids = sorted(set(company_ids))
+    done = 0
+    context.progress(done, len(ids))
+    for chunk in _chunks(ids, _batch_size()):
+        zero_company_debt(chunk)
+        done += len(chunk)
+        context.progress(done)
+    return {"companies": done}
+
+
+@register_job("recompute_levels")
+def recompute_levels(context):
+    """
+    Пересчет уровня иерархии компаний по глубине в графе поставщиков:
+    завод - 0, поставщик от завода - 1, все ниже - 2.
+    """
+    graph = get_supplier_graph(wait=True)
+    max_level = max(Company.LevelChoices.values)
+    rows = list(Company.objects.order_by("pk").values_list("pk", "level"))
+    done = changed = 0
+    context.progress(done, len(rows))
+    for chunk in _chunks(rows, _batch_size()):
+        by_level = {}
+        for pk, level in chunk:
+            try:
+                new_level = min(graph.depth(pk), max_level)
+            except KeyError:
+                # Компания создана после загрузки графа
+                continue
+            if new_level != level:
+                by_level.setdefault(new_level, []).append(pk)
+        if by_level:
+            with transaction.atomic():
+                ids = []
+                for level, level_ids in by_level.items():
+                    Company.objects.filter(pk__in=level_ids).update(level=level)
+                    ids.extend(level_ids)
+                record_changes(Company, ids)
+                refresh_company_summaries(ids)
+                transaction.on_commit(invalidate_debt_totals)
+                transaction.on_commit(invalidate_facets)
+            changed += len(ids)
+        done += len(chunk)
+        context.progress(done)
+    return {"companies": done, "changed": changed}
+
+
+@register_job("export_companies")
+def export_companies(context):
+    """
+    Выгрузка компаний в CSV в хранилище файлов (MEDIA_ROOT/exports/).
+    Пользователь выгружает свои компании, модераторы и сотрудники - все.
+    Имя файла случайное, файл отдается владельцу задачи через
+    GET /jobs/<id>/result/.
+    """
+    owner = context.job.owner
+    queryset = Company.objects.order_by("pk")
+    if owner is None or not (owner.is_staff or is_moderator(owner)):
+        queryset = queryset.filter(owner=owner)
+    total = queryset.count()
+    context.progress(0, total)
+
+    done = 0
+    with tempfile.TemporaryFile() as file:
+        text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COMPANY_FIELDS)
+        for row in queryset.values_list(*EXPORT_COMPANY_FIELDS).iterator(
+            chunk_size=_batch_size()
+        ):
+            writer.writerow(row)
+            done += 1
+            if done % _batch_size() == 0:
+                context.progress(done)
+        text.flush()
+        file.seek(0)
+        name = default_storage.save(
+            f"{EXPORT_DIR}/companies-{secrets.token_urlsafe(16)}.csv", File(file)
+        )
+        text.detach()
+    context.progress(done)
+    return {"rows": done, "file": name}
@@ -0,0 +1,86 @@
+from contextlib import nullcontext
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from retail_chain.models import Company, Contacts, Product
+from users.models import User
+
+
+class RetailChainTestMixin:
+    """
+    Общая основа тестов API: пользователи с разными ролями и создание
+    компаний, продуктов и контактов. Кэш очищается перед каждым тестом,
+    чтобы версии кэшей и состояние ограничений частоты не переходили
+    между тестами.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = self.create_user("user@test.ru")
+        self.other = self.create_user("other@test.ru")
+        self.moderator = self.create_user("moderator@test.ru", moderator=True)
+
+    @staticmethod
+    def create_user(email, moderator=False, **extra_fields):
+        user = User.objects.create_user(email=email, password="pw", **extra_fields)
+        if moderator:
+            group, _ = Group.objects.get_or_create(name="moderators")
+            user.groups.add(group)
+        return user
+
+    def login(self, user):
+        self.client.force_authenticate(user)
+
+    def on_commit(self):
+        """
+        Выполняет хуки transaction.on_commit блока: в TestCase транзакция
+        не фиксируется, в TransactionTestCase хуки выполняются сами.
+        """
+        if hasattr(self, "captureOnCommitCallbacks"):
+            return self.captureOnCommitCallbacks(execute=True)
+        return nullcontext()
+
+    def create_company(self, name, owner=None, supplier=None, **fields):
+        level = fields.pop("level", 0 if supplier is None else 1)
+        fields.setdefault("type", "fabric" if supplier is None else "retail")
+        # Сигналы сбрасывают кэши и отмечают изменения графа после фиксации
+        with self.on_commit():
+            return Company.objects.create(
+                name=name,
+                owner=owner or self.user,
+                supplier=supplier,
+                level=level,
+                **fields,
+            )
+
+    def create_product(self, name, model="M1", owner=None, **fields):
+        with self.on_commit():
+            return Product.objects.create(
+                product_name=name,
+                product_model=model,
+                owner=owner or self.user,
+                **fields,
+            )
+
+    def create_contacts(self, company, email, inn="1234567890", **fields):
+        with self.on_commit():
+            return Contacts.objects.create(
+                company=company,
+                email=email,
+                inn=inn,
+                owner=fields.pop("owner", company.owner),
+                **fields,
+            )
+
+
+class RetailChainTestCase(RetailChainTestMixin, APITestCase):
+    pass
+
+
+class RetailChainTransactionTestCase(RetailChainTestMixin, APITransactionTestCase):
+    """
+    Для тестов, в которых запросы к базе данных выполняются из других
+    потоков: они видят только зафиксированные данные.
+    """
@@ -0,0 +1,98 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import override_settings
+
+from retail_chain.admin_filters import _version_key
+from retail_chain.models import Contacts, Product
+from retail_chain.tests.base import RetailChainTestCase
+from retail_chain.versions import get_version
+
+
+class AdminFiltersTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_user("admin@test.ru", is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+
+        self.company = self.create_company("Сеть")
+        self.moscow = self.create_contacts(
+            self.company, "moscow@test.ru", country="Россия", city="Москва"
+        )
+        self.create_contacts(
+            self.company, "kazan@test.ru", country="Россия", city="Казань"
+        )
+        self.create_contacts(self.company, "minsk@test.ru", country="Беларусь")
+
+    def changelist(self, model, **params):
+        response = self.client.get(
+            f"/admin/retail_chain/{model._meta.model_name}/", params
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_choices_with_counts(self):
+        response = self.changelist(Contacts)
+        self.assertContains(response, "Россия (2)")
+        self.assertContains(response, "Беларусь (1)")
+
+        response = self.changelist(Contacts, country="Беларусь")
+        self.assertEqual(
+            [contacts.pk for contacts in response.context["cl"].result_list],
+            list(
+                Contacts.objects.filter(country="Беларусь").values_list("pk", flat=True)
+            ),
+        )
+
+    @override_settings(ADMIN_FILTER_MAX_CHOICES=1)
+    def test_only_frequent_choices(self):
+        response = self.changelist(Contacts)
+        self.assertContains(response, "Россия (2)")
+        self.assertNotContains(response, "Беларусь (1)")
+
+    def test_cache_is_reset_only_when_location_changes(self):
+        version = get_version(_version_key(Contacts))
+        with self.on_commit():
+            self.moscow.email = "msk@test.ru"
+            self.moscow.save()
+        self.assertEqual(get_version(_version_key(Contacts)), version)
+
+        self.changelist(Contacts)
+        with self.on_commit():
+            self.moscow.country = "Беларусь"
+            self.moscow.save()
+        self.assertEqual(get_version(_version_key(Contacts)), version + 1)
+        response = self.changelist(Contacts)
+        self.assertContains(response, "Беларусь (2)")
+        self.assertContains(response, "Россия (1)")
+
+        with self.on_commit():
+            self.moscow.delete()
+        self.assertEqual(get_version(_version_key(Contacts)), version + 2)
+
+    def test_prefix_filter(self):
+        # Латиница: UPPER в SQLite не меняет регистр кириллицы
+        milk = self.create_product("Milk")
+        self.create_product("Flour")
+        self.create_product("Butter", model="Milky")
+        response = self.changelist(Product, product_name="mil")
+        self.assertEqual(list(response.context["cl"].result_list), [milk])
+        response = self.changelist(Product, product_model="MIL")
+        self.assertEqual(
+            [product.product_name for product in response.context["cl"].result_list],
+            ["Butter"],
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "индексы только для PostgreSQL")
+    def test_prefix_filter_uses_index(self):
+        indexes = connection.introspection.get_constraints(
+            connection.cursor(), Product._meta.db_table
+        )
+        self.assertIn("product_name_upper_prefix_idx", indexes)
+        self.assertIn("product_model_upper_prefix_idx", indexes)
+
+        queryset = Product.objects.filter(product_name__istartswith="мол")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        self.assertIn("product_name_upper_prefix_idx", plan)
@@ -0,0 +1,53 @@
+from retail_chain.autocomplete import AUTOCOMPLETE_VERSION_KEY, get_prefix_index
+from retail_chain.models import Company
+from retail_chain.tests.base import RetailChainTestCase
+from retail_chain.versions import get_version
+
+
+class AutocompleteTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fabric = self.create_company("Молочный завод")
+        self.create_company("Мясокомбинат")
+        self.create_company("Молокосбыт", owner=self.other)
+        self.login(self.user)
+
+    def complete(self, q, **params):
+        response = self.client.get("/autocomplete/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item["value"] for item in response.data["results"]]
+
+    def test_prefix_search(self):
+        self.assertEqual(self.complete("м"), ["Молочный завод", "Мясокомбинат"])
+        self.assertEqual(self.complete("МОЛ"), ["Молочный завод"])
+        self.assertEqual(self.complete("м", limit=1), ["Молочный завод"])
+        self.assertEqual(self.complete(""), [])
+
+        self.login(self.moderator)
+        self.assertEqual(self.complete("мол"), ["Молокосбыт", "Молочный завод"])
+
+    def test_index_follows_inserts_and_deletes(self):
+        index = get_prefix_index("company")
+        version = index.version
+        self.assertEqual(self.complete("мол"), ["Молочный завод"])
+
+        shop = self.create_company("Молочная лавка", supplier=self.fabric)
+        with self.on_commit():
+            Company.objects.filter(name="Мясокомбинат").delete()
+        self.assertEqual(
+            get_version(AUTOCOMPLETE_VERSION_KEY.format("company")), version + 2
+        )
+
+        self.assertEqual(self.complete("м"), ["Молочная лавка", "Молочный завод"])
+        self.assertEqual(index.version, version + 2)
+
+        with self.on_commit():
+            shop.name = "Сырная лавка"
+            shop.save()
+        self.assertEqual(self.complete("мол"), ["Молочный завод"])
+        self.assertEqual(self.complete("сыр"), ["Сырная лавка"])
+
+    def test_invalid_params(self):
+        for params in ({"field": "email"}, {"limit": "x"}, {"limit": 0}):
+            response = self.client.get("/autocomplete/", {"q": "м", **params})
+            self.assertEqual(response.status_code, 400)
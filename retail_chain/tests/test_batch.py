@@ -0,0 +1,150 @@
+import threading
+from contextvars import copy_context
+from unittest import mock
+
+from django.db import connections
+from django.test import override_settings
+
+from retail_chain.batch import BatchAPIView
+from retail_chain.models import Product
+from retail_chain.query_limits import (
+    QueryBudgetExceeded,
+    get_limits,
+    limit_queries,
+)
+from retail_chain.tests.base import RetailChainTransactionTestCase
+from retail_chain.tracing import get_exporter
+
+
+class MemoryExporter:
+    traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+def walk_spans(span):
+    yield span
+    for child in span["children"]:
+        yield from walk_spans(child)
+
+
+class BatchTests(RetailChainTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.company = self.create_company("Завод")
+        self.product = self.create_product("Продукт")
+        self.login(self.user)
+
+    def batch(self, *requests):
+        return self.client.post("/batch/", {"requests": list(requests)}, format="json")
+
+    def test_reads_and_writes_in_order(self):
+        response = self.batch(
+            {"id": "company", "path": f"/companies/{self.company.pk}/"},
+            {"id": "products", "path": "/products/"},
+            {
+                "id": "create",
+                "method": "POST",
+                "path": "/products/upsert/",
+                "body": {"product_name": "Новый", "product_model": "X"},
+            },
+            {"id": "after", "path": "/products/"},
+            {"id": "missing", "path": "/companies/999999/"},
+        )
+        self.assertEqual(response.status_code, 200)
+        results = {item["id"]: item for item in response.data["responses"]}
+        self.assertEqual(
+            list(results), ["company", "products", "create", "after", "missing"]
+        )
+        self.assertEqual(results["company"]["body"]["name"], "Завод")
+        self.assertEqual(results["products"]["body"]["count"], 1)
+        self.assertEqual(results["create"]["status"], 201)
+        self.assertEqual(results["after"]["body"]["count"], 2)
+        self.assertEqual(results["missing"]["status"], 404)
+
+    def test_paths_outside_api_are_rejected(self):
+        for path in ("/admin/", "/swagger/", "/batch/", "/unknown/"):
+            with self.subTest(path=path):
+                response = self.batch({"path": path})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_error_in_one_request_does_not_break_batch(self):
+        get_body = BatchAPIView.get_body
+        calls = []
+
+        def fail_first(response):
+            calls.append(response)
+            if len(calls) == 1:
+                raise ValueError("render")
+            return get_body(response)
+
+        with mock.patch.object(
+            BatchAPIView, "get_body", side_effect=fail_first
+        ), self.assertLogs("retail_chain.batch", "ERROR"):
+            response = self.batch(
+                {"id": "broken", "path": "/products/"},
+                {
+                    "id": "ok",
+                    "method": "DELETE",
+                    "path": f"/products/{self.product.pk}/",
+                },
+            )
+        statuses = [item["status"] for item in response.data["responses"]]
+        self.assertEqual(statuses, [500, 204])
+
+    def test_query_limits_apply_in_threads(self):
+        with override_settings(
+            QUERY_LIMITS={
+                "default": {"max_queries": None},
+                "ProductViewSet.list": {"max_queries": 1},
+            }
+        ), self.assertLogs("retail_chain.query_limits", "WARNING"):
+            response = self.batch(
+                {"path": "/products/"}, {"path": f"/companies/{self.company.pk}/"}
+            )
+        statuses = [item["status"] for item in response.data["responses"]]
+        self.assertEqual(statuses, [QueryBudgetExceeded.status_code, 200])
+
+    def test_thread_queries_are_counted_in_request(self):
+        thread_limiters = []
+
+        def run_queries():
+            try:
+                with limit_queries(get_limits()) as thread_limiter:
+                    list(Product.objects.all())
+                    list(Product.objects.all())
+                thread_limiters.append(thread_limiter)
+            finally:
+                connections.close_all()
+
+        with limit_queries(get_limits()) as limiter:
+            thread = threading.Thread(target=copy_context().run, args=(run_queries,))
+            thread.start()
+            thread.join()
+            self.assertEqual(limiter.queries, 2)
+        self.assertIsNot(thread_limiters[0], limiter)
+
+    @override_settings(
+        TRACING_SAMPLE_RATE=1.0,
+        TRACING_EXPORTER="retail_chain.tests.test_batch.MemoryExporter",
+        TRACING_EXPORTER_OPTIONS={},
+    )
+    def test_spans_of_threads_are_traced(self):
+        get_exporter.cache_clear()
+        self.addCleanup(get_exporter.cache_clear)
+        MemoryExporter.traces = []
+        self.batch({"path": "/products/"}, {"path": f"/companies/{self.company.pk}/"})
+
+        (trace,) = MemoryExporter.traces
+        views = [
+            span
+            for span in walk_spans(trace["spans"])
+            if span["name"] in ("view ProductViewSet", "view CompanyViewSet")
+        ]
+        self.assertEqual(len(views), 2)
+        for view in views:
+            self.assertTrue(
+                any(span["name"] == "sql" for span in walk_spans(view)), view["name"]
+            )
@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from retail_chain.autocomplete import PrefixIndex
+from retail_chain.models import Product
+from retail_chain.tests.base import RetailChainTestCase
+from retail_chain.versions import (
+    bump_version,
+    get_version,
+    get_versioned_changes,
+    record_versioned_change,
+)
+
+VERSION_KEY = "retail_chain:test:version"
+
+
+class VersionTests(RetailChainTestCase):
+    def test_bump_version(self):
+        version = get_version(VERSION_KEY)
+        self.assertEqual(bump_version(VERSION_KEY), version + 1)
+        self.assertEqual(get_version(VERSION_KEY), version + 1)
+
+        cache.delete(VERSION_KEY)
+        self.assertIsNone(bump_version(VERSION_KEY))
+        self.assertGreater(get_version(VERSION_KEY), version + 1)
+
+    def test_versioned_changes(self):
+        version = get_version(VERSION_KEY)
+        record_versioned_change(VERSION_KEY, 1, timeout=60)
+        record_versioned_change(VERSION_KEY, 2, timeout=60)
+        record_versioned_change(VERSION_KEY, 1, timeout=60)
+        self.assertEqual(
+            get_versioned_changes(VERSION_KEY, version, 10), (version + 3, {1, 2})
+        )
+        self.assertEqual(
+            get_versioned_changes(VERSION_KEY, version + 3, 10), (version + 3, set())
+        )
+        # Изменений больше предела или версия не загружалась
+        self.assertIsNone(get_versioned_changes(VERSION_KEY, version, 2)[1])
+        self.assertIsNone(get_versioned_changes(VERSION_KEY, None, 10)[1])
+
+        cache.delete(f"{VERSION_KEY}:change:{version + 2}")
+        self.assertIsNone(get_versioned_changes(VERSION_KEY, version, 10)[1])
+
+
+class PrefixIndexTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        for name, model in (("Молоко", "M1"), ("молоко", "M2"), ("Мука", "M1")):
+            self.create_product(name, model)
+        self.create_product("Масло")
+        self.create_product("Мед", owner=self.other)
+
+    def search(self, index, prefix, owner=None):
+        return [
+            (item["id"], item["value"])
+            for item in index.search(prefix, 100, owner and owner.pk)
+        ]
+
+    def assert_same_as_full_load(self, index):
+        loaded = PrefixIndex("product_name")
+        loaded.load()
+        self.assertEqual(index.arrays, loaded.arrays)
+        for prefix, owner in (("м", None), ("мо", None), ("м", self.user)):
+            self.assertEqual(
+                self.search(index, prefix, owner), self.search(loaded, prefix, owner)
+            )
+
+    def test_changes_are_applied_without_full_load(self):
+        index = PrefixIndex("product_name")
+        index.refresh()
+
+        milk = Product.objects.get(product_name="Молоко", product_model="M1")
+        with self.on_commit():
+            milk.product_name = "Сыр"
+            milk.save()
+        with self.on_commit():
+            Product.objects.filter(product_name="Мука").delete()
+        honey = Product.objects.get(product_name="Мед")
+        with self.on_commit():
+            honey.owner = self.user
+            honey.save()
+        self.create_product("Манка")
+
+        with mock.patch.object(PrefixIndex, "load") as load:
+            index.refresh()
+        load.assert_not_called()
+        self.assertEqual(
+            [value for _, value in self.search(index, "м", self.user)],
+            ["Манка", "Масло", "Мед", "молоко"],
+        )
+        self.assertEqual(self.search(index, "сыр"), [(milk.pk, "Сыр")])
+        self.assert_same_as_full_load(index)
+
+    @override_settings(AUTOCOMPLETE_MAX_INCREMENTAL=1)
+    def test_many_changes_reload_index(self):
+        index = PrefixIndex("product_name")
+        index.refresh()
+        self.create_product("Манка")
+        self.create_product("Мясо")
+        with mock.patch.object(PrefixIndex, "load", autospec=True) as load:
+            index.refresh()
+        load.assert_called_once_with(index)
+
+
+@override_settings(SUPPLIER_GRAPH_BACKGROUND_REFRESH=False)
+class CachedReportTests(RetailChainTestCase):
+    """
+    Кэшированные отчеты обновляются после изменения данных.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.fabric = self.create_company("Завод")
+        self.company = self.create_company("Сеть", supplier=self.fabric)
+        self.create_contacts(self.company, "mine@test.ru", country="Россия")
+        self.login(self.user)
+
+    @staticmethod
+    def counts(facet):
+        return {item["value"]: item["count"] for item in facet}
+
+    def test_facets(self):
+        response = self.client.get("/companies/facets/")
+        self.assertEqual(self.counts(response.data["level"]), {0: 1, 1: 1})
+        self.create_company("Магазин", supplier=self.company, level=2)
+        response = self.client.get("/companies/facets/")
+        self.assertEqual(self.counts(response.data["level"]), {0: 1, 1: 1, 2: 1})
+
+    def test_subtree_products(self):
+        path = f"/companies/{self.company.pk}/products/"
+        self.assertEqual(self.client.get(path).data["count"], 0)
+        product = self.create_product("Молоко")
+        with self.on_commit():
+            self.fabric.products.add(product)
+        self.assertEqual(self.client.get(path).data["count"], 1)
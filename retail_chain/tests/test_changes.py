@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from retail_chain.changes import get_changes
+from retail_chain.models import ChangeLogEntry
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class ChangeFeedTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        ChangeLogEntry.objects.all().delete()
+        self.entries = [
+            ChangeLogEntry.objects.create(
+                model_name="company", object_id=i, action="insert"
+            )
+            for i in range(3)
+        ]
+
+    def age(self, entry, seconds):
+        ChangeLogEntry.objects.filter(pk=entry.pk).update(
+            created_at=timezone.now() - timedelta(seconds=seconds)
+        )
+
+    def ids(self, since=0):
+        return [change["id"] for change in get_changes(since, [], 100)]
+
+    @override_settings(CHANGE_FEED_SAFETY_LAG=10)
+    def test_recent_entries_are_withheld(self):
+        self.assertEqual(self.ids(), [])
+        for entry in self.entries:
+            self.age(entry, 60)
+        self.assertEqual(self.ids(), [entry.pk for entry in self.entries])
+
+    @override_settings(CHANGE_FEED_SAFETY_LAG=10)
+    def test_feed_stops_before_first_recent_entry(self):
+        # Запись с меньшим id может быть новее записи с большим id
+        first, recent, last = self.entries
+        self.age(first, 60)
+        self.age(last, 60)
+        self.assertEqual(self.ids(), [first.pk])
+        self.age(recent, 60)
+        self.assertEqual(self.ids(first.pk), [recent.pk, last.pk])
+
+    @override_settings(CHANGE_FEED_SAFETY_LAG=0)
+    def test_without_lag(self):
+        self.assertEqual(self.ids(), [entry.pk for entry in self.entries])
+
+    @override_settings(CHANGE_FEED_SAFETY_LAG=0, CHANGE_FEED_PAGE_SIZE=2)
+    def test_endpoint_pages(self):
+        self.login(self.user)
+        self.assertEqual(self.client.get("/changes/").status_code, 403)
+
+        self.login(self.moderator)
+        response = self.client.get("/changes/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["has_more"])
+        self.assertEqual(response.data["next"], str(self.entries[1].pk))
+
+        response = self.client.get("/changes/", {"since": response.data["next"]})
+        self.assertFalse(response.data["has_more"])
+        self.assertEqual(
+            [change["id"] for change in response.data["changes"]],
+            [self.entries[2].pk],
+        )
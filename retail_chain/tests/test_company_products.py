@@ -0,0 +1,86 @@
+from retail_chain.models import ChangeLogEntry, CompanySummaryState
+from retail_chain.summaries import check_summaries
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class CompanyProductsBulkTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fabric = self.create_company("Завод")
+        self.retail = self.create_company("Сеть", supplier=self.fabric)
+        self.foreign = self.create_company("Чужая сеть", owner=self.other)
+        self.phone = self.create_product("Телефон")
+        self.tablet = self.create_product("Планшет")
+        self.retail.products.add(self.phone)
+        ChangeLogEntry.objects.all().delete()
+        self.login(self.user)
+
+    def post(self, action, **data):
+        with self.on_commit():
+            return self.client.post(
+                f"/companies/products/{action}/", data, format="json"
+            )
+
+    def changed_companies(self):
+        return sorted(
+            ChangeLogEntry.objects.filter(model_name="company").values_list(
+                "object_id", flat=True
+            )
+        )
+
+    def test_add_skips_existing_links(self):
+        response = self.post(
+            "add",
+            companies=[self.fabric.pk, self.retail.pk],
+            products=[self.phone.pk, self.tablet.pk],
+        )
+        self.assertEqual(response.status_code, 200)
+        # У сети телефон уже был: добавлены 3 связи у обеих компаний
+        self.assertEqual(response.data, {"added": 3, "companies": 2})
+        self.assertEqual(set(self.retail.products.all()), {self.phone, self.tablet})
+        self.assertEqual(
+            self.changed_companies(), sorted([self.fabric.pk, self.retail.pk])
+        )
+        entry = ChangeLogEntry.objects.get(object_id=self.fabric.pk)
+        self.assertEqual(
+            sorted(entry.data["products"]), sorted([self.phone.pk, self.tablet.pk])
+        )
+        self.assertEqual(CompanySummaryState.objects.get(pk=self.fabric.pk).products, 2)
+        self.assertEqual(check_summaries(), [])
+
+    def test_add_existing_links_is_noop(self):
+        # Права, продукты и INSERT без строк: журнал и сводки не трогаются
+        with self.assertNumQueries(5):
+            response = self.post(
+                "add", companies=[self.retail.pk], products=[self.phone.pk]
+            )
+        self.assertEqual(response.data, {"added": 0, "companies": 0})
+        self.assertEqual(self.changed_companies(), [])
+        self.assertEqual(check_summaries(), [])
+
+    def test_add_by_subtree(self):
+        response = self.post(
+            "add", subtree_of=self.fabric.pk, products=[self.tablet.pk]
+        )
+        self.assertEqual(response.data, {"added": 2, "companies": 2})
+        self.assertEqual(check_summaries(), [])
+
+    def test_only_own_companies_are_changed(self):
+        response = self.post(
+            "add",
+            companies=[self.retail.pk, self.foreign.pk],
+            products=[self.tablet.pk],
+        )
+        self.assertEqual(response.data, {"added": 1, "companies": 1})
+        self.assertFalse(self.foreign.products.exists())
+
+    def test_remove(self):
+        response = self.post(
+            "remove",
+            companies=[self.fabric.pk, self.retail.pk],
+            products=[self.phone.pk],
+        )
+        self.assertEqual(response.data, {"removed": 1, "companies": 1})
+        self.assertFalse(self.retail.products.exists())
+        self.assertEqual(self.changed_companies(), [self.retail.pk])
+        self.assertEqual(check_summaries(), [])
@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from retail_chain import concurrency
+from retail_chain.concurrency import (
+    HEAVY,
+    READ,
+    WRITE,
+    AdaptiveConcurrencyMiddleware,
+    ConcurrencyLimiter,
+    get_limiter,
+)
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+    def run_requests(self, limiter, latency, count, inflight=None):
+        for _ in range(count):
+            started_with = limiter.acquire()
+            limiter.release(latency, started_with if inflight is None else inflight)
+
+    def test_rejects_over_limit(self):
+        limiter = ConcurrencyLimiter("test", initial=2, min=1, max=10)
+        self.assertEqual(limiter.acquire(), 0)
+        self.assertEqual(limiter.acquire(), 1)
+        self.assertIsNone(limiter.acquire())
+        limiter.release(0.1, 1)
+        self.assertEqual(limiter.acquire(), 1)
+        state = limiter.state()
+        self.assertEqual((state["accepted"], state["rejected"]), (3, 1))
+
+    def test_limit_grows_under_load_with_stable_latency(self):
+        limiter = ConcurrencyLimiter("test", initial=10, min=1, max=20)
+        self.run_requests(limiter, 0.05, 200, inflight=19)
+        self.assertEqual(limiter.limit, 20)
+
+    def test_idle_limit_does_not_grow(self):
+        limiter = ConcurrencyLimiter("test", initial=10, min=1, max=20)
+        self.run_requests(limiter, 0.05, 200)
+        self.assertEqual(limiter.limit, 10)
+
+    def test_limit_shrinks_when_latency_grows(self):
+        limiter = ConcurrencyLimiter("test", initial=10, min=2, max=20)
+        self.run_requests(limiter, 0.05, 50, inflight=9)
+        limit = limiter.limit
+        self.run_requests(limiter, 1.0, 5, inflight=9)
+        self.assertLess(limiter.limit, limit * 0.6)
+        self.run_requests(limiter, 5.0, 30, inflight=9)
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.retry_after(), 5)
+
+        # Долгое замедление становится новым обычным временем ответа
+        self.run_requests(limiter, 5.0, 200, inflight=9)
+        self.assertGreater(limiter.limit, 2)
+
+
+class AdaptiveConcurrencyMiddlewareTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict(concurrency._limiters, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.login(self.user)
+
+    def test_classify(self):
+        middleware = AdaptiveConcurrencyMiddleware(lambda request: None)
+        factory = RequestFactory()
+        for request, route_class in (
+            (factory.get("/products/"), READ),
+            (factory.get("/products/?search=молоко"), HEAVY),
+            (factory.get("/companies/debt/"), HEAVY),
+            (factory.get("/companies/1/chain/"), HEAVY),
+            (factory.post("/products/"), WRITE),
+            (factory.get("/monitoring/concurrency/"), None),
+            # За прокси с префиксом учитывается только path_info
+            (factory.get("/companies/debt/", SCRIPT_NAME="/api"), HEAVY),
+            (factory.get("/monitoring/concurrency/", SCRIPT_NAME="/api"), None),
+        ):
+            with self.subTest(path=request.get_full_path(), method=request.method):
+                self.assertEqual(middleware.classify(request), route_class)
+
+    def test_heavy_requests_do_not_block_reads(self):
+        limiter = get_limiter(HEAVY)
+        for _ in range(int(limiter.limit)):
+            limiter.acquire()
+
+        response = self.client.get("/companies/debt/")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(self.client.get("/products/").status_code, 200)
+        self.assertEqual(get_limiter(READ).inflight, 0)
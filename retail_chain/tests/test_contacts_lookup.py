@@ -0,0 +1,105 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.test import override_settings
+
+from retail_chain.models import Contacts
+from retail_chain.tests.base import RetailChainTestCase
+
+inn_migration = import_module("retail_chain.migrations.0006_contacts_inn_char")
+
+
+class ContactsLookupTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.company = self.create_company("Сеть")
+        self.contacts = self.create_contacts(
+            self.company, "shop@test.ru", inn="0123456789"
+        )
+        self.person = self.create_contacts(
+            self.company, "person@test.ru", inn="123456789012"
+        )
+        foreign = self.create_company("Чужая сеть", owner=self.other)
+        self.foreign = self.create_contacts(
+            foreign, "foreign@test.ru", inn="0123456789"
+        )
+        self.login(self.user)
+
+    def lookup(self, data=None, params=None):
+        if data is not None:
+            return self.client.post("/contacts/lookup/", data, format="json")
+        return self.client.get("/contacts/lookup/", params)
+
+    def test_get_by_inn_with_leading_zero(self):
+        response = self.lookup(params={"inn": "0123456789"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data], [self.contacts.pk])
+        self.assertEqual(response.data[0]["inn"], "0123456789")
+        self.assertEqual(response.data[0]["company"]["id"], self.company.pk)
+
+    def test_get_by_email(self):
+        response = self.lookup(params={"email": "person@test.ru"})
+        self.assertEqual([item["id"] for item in response.data], [self.person.pk])
+        self.assertEqual(self.lookup(params={}).status_code, 400)
+
+    def test_post_groups_by_value(self):
+        response = self.lookup(
+            {
+                "inn": ["0123456789", "9999999999"],
+                "email": ["person@test.ru", "foreign@test.ru"],
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        ids = {
+            key: {
+                value: [item["id"] for item in items] for value, items in found.items()
+            }
+            for key, found in response.data.items()
+        }
+        # Чужие контакты не находятся, для ненайденных значений - пустой список
+        self.assertEqual(
+            ids,
+            {
+                "inn": {"0123456789": [self.contacts.pk], "9999999999": []},
+                "email": {"person@test.ru": [self.person.pk], "foreign@test.ru": []},
+            },
+        )
+
+    def test_moderator_sees_all(self):
+        self.login(self.moderator)
+        response = self.lookup(params={"inn": "0123456789"})
+        self.assertEqual(
+            sorted(item["id"] for item in response.data),
+            sorted([self.contacts.pk, self.foreign.pk]),
+        )
+
+    def test_invalid_inn(self):
+        for inn in ("123456789", "12345678901", "1234567890123", "12345abcde"):
+            with self.subTest(inn=inn):
+                self.assertEqual(self.lookup(params={"inn": inn}).status_code, 400)
+                self.assertEqual(self.lookup({"inn": [inn]}).status_code, 400)
+
+    @override_settings(CONTACTS_LOOKUP_MAX=2)
+    def test_max_values(self):
+        response = self.lookup({"inn": ["0123456789"], "email": ["shop@test.ru"]})
+        self.assertEqual(response.status_code, 200)
+        response = self.lookup(
+            {"inn": ["0123456789", "123456789012"], "email": ["shop@test.ru"]}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.lookup({}).status_code, 400)
+
+    def test_migration_restores_leading_zeros(self):
+        # После смены типа поля числовые ИНН без ведущих нулей
+        Contacts.objects.filter(pk=self.contacts.pk).update(inn="123456789")
+        Contacts.objects.filter(pk=self.person.pk).update(inn="23456789012")
+        Contacts.objects.filter(pk=self.foreign.pk).update(inn="1234567890")
+        inn_migration.restore_leading_zeros(apps, None)
+        self.assertEqual(
+            dict(Contacts.objects.values_list("pk", "inn")),
+            {
+                self.contacts.pk: "0123456789",
+                self.person.pk: "023456789012",
+                self.foreign.pk: "1234567890",
+            },
+        )
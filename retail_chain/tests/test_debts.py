@@ -0,0 +1,54 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from retail_chain.debts import aggregate_debts
+from retail_chain.models import Company, ExchangeRate
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class DebtTotalsTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_company("Рубли", debt=Decimal("100"), debt_currency="RUB")
+        self.create_company("Доллары", debt=Decimal("2"), debt_currency="USD")
+        self.create_company("Евро", debt=Decimal("3"), debt_currency="EUR")
+        ExchangeRate.objects.create(currency="USD", rate=Decimal("90"))
+
+    def test_rate_must_be_positive(self):
+        for rate in (Decimal("0"), Decimal("-1")):
+            with self.subTest(rate=rate):
+                with self.assertRaises(DjangoValidationError):
+                    ExchangeRate(currency="EUR", rate=rate).full_clean()
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    ExchangeRate.objects.create(currency="EUR", rate=rate)
+
+    def test_missing_rates_are_reported(self):
+        report = aggregate_debts(Company.objects.all(), "level", "RUB")
+        self.assertEqual(report["missing_rates"], ["EUR"])
+        self.assertEqual(report["results"][0]["total"], "280.00")
+
+    def test_zero_rate_is_treated_as_missing(self):
+        # Курс, сохраненный до появления проверки в базе данных
+        rates = {"RUB": Decimal(1), "USD": Decimal(0), "EUR": Decimal(100)}
+        with mock.patch("retail_chain.debts.get_rates", return_value=rates):
+            report = aggregate_debts(Company.objects.all(), "level", "RUB")
+            self.assertEqual(report["missing_rates"], ["USD"])
+            self.assertEqual(report["results"][0]["total"], "400.00")
+
+            with self.assertRaises(ValidationError):
+                aggregate_debts(Company.objects.all(), "level", "USD")
+
+    def test_endpoint(self):
+        self.login(self.user)
+        response = self.client.get("/companies/debt/", {"currency": "usd"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["currency"], "USD")
+        self.assertEqual(response.data["missing_rates"], ["EUR"])
+        self.assertEqual(response.data["results"][0]["total"], "3.11")
+
+        response = self.client.get("/companies/debt/", {"currency": "GBP"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class CompanyExpandTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fabric = self.create_company("Завод")
+        self.retail = self.create_company("Сеть", supplier=self.fabric)
+        self.create_contacts(self.retail, "retail@test.ru", country="Россия")
+        self.retail.products.add(self.create_product("Телефон"))
+        foreign = self.create_company("Чужой завод", owner=self.other)
+        self.shop = self.create_company("Магазин", supplier=foreign)
+        self.login(self.user)
+
+    def get(self, path, expand, **params):
+        return self.client.get(path, {"expand": expand, **params})
+
+    def test_retrieve_nested_supplier(self):
+        shop = self.create_company("Точка", supplier=self.retail, level=2)
+        response = self.get(f"/companies/{shop.pk}/", "supplier.supplier,contacts")
+        self.assertEqual(response.status_code, 200)
+        supplier = response.data["supplier"]
+        self.assertEqual(supplier["id"], self.retail.pk)
+        self.assertEqual(supplier["supplier"]["id"], self.fabric.pk)
+        self.assertEqual(response.data["contacts"], [])
+        # Без раскрытия - идентификатор
+        response = self.client.get(f"/companies/{shop.pk}/")
+        self.assertEqual(response.data["supplier"], self.retail.pk)
+
+    def test_max_depth(self):
+        path = f"/companies/{self.retail.pk}/"
+        self.assertEqual(self.get(path, "supplier.supplier.supplier").status_code, 200)
+        response = self.get(path, "supplier.supplier.supplier.supplier")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("expand", response.data)
+        with override_settings(EXPAND_MAX_DEPTH=1):
+            self.assertEqual(self.get(path, "supplier").status_code, 200)
+            self.assertEqual(self.get(path, "supplier.supplier").status_code, 400)
+
+    def test_invalid_relations(self):
+        for expand in ("owner", "supplier.owner", "contacts.company", "products.x"):
+            with self.subTest(expand=expand):
+                response = self.get("/companies/", expand)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("expand", response.data)
+
+    def test_other_owner_supplier_is_null(self):
+        response = self.get(f"/companies/{self.shop.pk}/", "supplier")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["supplier"])
+
+        self.login(self.moderator)
+        response = self.get(f"/companies/{self.shop.pk}/", "supplier")
+        self.assertEqual(response.data["supplier"]["name"], "Чужой завод")
+
+    def test_queries_do_not_depend_on_page_size(self):
+        for index in range(8):
+            company = self.create_company(f"Точка {index}", supplier=self.retail)
+            self.create_contacts(company, f"shop{index}@test.ru")
+            company.products.add(self.create_product(f"Товар {index}"))
+        # Страницы одинакового вида: у всех компаний есть поставщик поставщика,
+        # иначе prefetch пропускает запрос для пустого уровня
+        expand = "supplier.supplier,contacts,products"
+        for user in (self.user, self.moderator):
+            self.login(user)
+            # is_moderator запоминается на объекте пользователя из force_authenticate
+            self.get("/companies/", expand)
+            counts = []
+            for page_size in (2, 10):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.get(
+                        "/companies/", expand, page_size=page_size, search="Точка"
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data["results"]), min(page_size, 8))
+                counts.append(len(queries))
+            with self.subTest(user=user.email):
+                self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,68 @@
+from retail_chain.facets import FACETS_VERSION_KEY
+from retail_chain.tests.base import RetailChainTestCase
+from retail_chain.versions import get_version
+
+
+class CompanyFacetsTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fabric = self.create_company("Завод")
+        self.retail = self.create_company("Сеть", supplier=self.fabric)
+        self.contacts = self.create_contacts(
+            self.retail, "shop@test.ru", country="Россия", city="Москва"
+        )
+        self.create_contacts(self.fabric, "fabric@test.ru", country="Китай")
+        self.create_company("Чужой завод", owner=self.other)
+        self.login(self.user)
+
+    def facets(self, **params):
+        response = self.client.get("/companies/facets/", params)
+        self.assertEqual(response.status_code, 200)
+        return {
+            name: {item["value"]: item["count"] for item in values}
+            for name, values in response.data.items()
+            if name != "total"
+        } | {"total": response.data["total"]}
+
+    def test_counts_and_filters(self):
+        self.assertEqual(
+            self.facets(),
+            {
+                "total": 2,
+                "country": {"Китай": 1, "Россия": 1},
+                "city": {"Москва": 1},
+                "level": {0: 1, 1: 1},
+                "type": {"fabric": 1, "retail": 1},
+            },
+        )
+        facets = self.facets(country="Россия")
+        self.assertEqual(facets["total"], 1)
+        self.assertEqual(facets["level"], {1: 1})
+        # Собственный фильтр не сужает фасет
+        self.assertEqual(facets["country"], {"Китай": 1, "Россия": 1})
+
+        response = self.client.get("/companies/facets/", {"level": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_until_dimension_changes(self):
+        self.assertEqual(self.facets(country="Россия")["total"], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.facets(country="Россия")["total"], 1)
+
+        version = get_version(FACETS_VERSION_KEY)
+        with self.on_commit():
+            self.contacts.country = "Казахстан"
+            self.contacts.save()
+        self.assertEqual(get_version(FACETS_VERSION_KEY), version + 1)
+        facets = self.facets(country="Россия")
+        self.assertEqual(facets["total"], 0)
+        self.assertEqual(facets["country"], {"Казахстан": 1, "Китай": 1})
+
+        with self.on_commit():
+            self.retail.level = 2
+            self.retail.save()
+        self.assertEqual(self.facets()["level"], {0: 1, 2: 1})
+
+        with self.on_commit():
+            self.retail.delete()
+        self.assertEqual(self.facets()["type"], {"fabric": 1})
@@ -0,0 +1,155 @@
+import random
+import threading
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from retail_chain.graph import (
+    GRAPH_VERSION_KEY,
+    SupplierGraph,
+    get_supplier_graph,
+    record_company_change,
+)
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class SupplierGraphTests(RetailChainTestCase):
+    def test_queries_on_built_graph(self):
+        graph = SupplierGraph()
+        graph._build([(1, None), (2, 1), (3, 2), (4, 1), (5, None)])
+        self.assertEqual(graph.depth(3), 2)
+        self.assertEqual(graph.supplier(3), 2)
+        self.assertIsNone(graph.supplier(5))
+        self.assertEqual(graph.ancestors(3), [2, 1])
+        self.assertEqual(sorted(graph.descendants(1)), [2, 3, 4])
+        self.assertEqual(graph.descendants_count(1), 3)
+        self.assertTrue(graph.is_upstream(1, 3))
+        self.assertFalse(graph.is_upstream(4, 3))
+        self.assertFalse(graph.is_upstream(3, 3))
+        with self.assertRaises(KeyError):
+            graph.depth(6)
+
+    def test_cycle_is_broken(self):
+        graph = SupplierGraph()
+        graph._build([(1, 3), (2, 1), (3, 2)])
+        self.assertEqual(sorted(graph.depth(i) for i in (1, 2, 3)), [0, 1, 2])
+
+    def assertSameForest(self, graph, rows):
+        expected = SupplierGraph()
+        expected._build(rows.items())
+        self.assertEqual(list(graph.arrays.ids), list(expected.arrays.ids))
+        for company_id in rows:
+            self.assertEqual(graph.depth(company_id), expected.depth(company_id))
+            self.assertEqual(
+                graph.ancestors(company_id), expected.ancestors(company_id)
+            )
+            self.assertEqual(
+                sorted(graph.descendants(company_id)),
+                sorted(expected.descendants(company_id)),
+            )
+
+    def test_patch_moves_only_changed_subtree(self):
+        graph = SupplierGraph()
+        graph._build([(1, None), (2, 1), (3, None), (4, 3), (5, 4), (6, None)])
+        before = graph.arrays
+        tin = {i: graph.arrays.tin[graph._find(before.ids, i)] for i in (1, 2)}
+
+        # Поставщик не изменился - массивы те же
+        self.assertIs(graph._patch(before, {2}, {2: 1}), before)
+
+        graph.arrays = graph._patch(before, {4}, {4: 6})
+        self.assertIs(graph.arrays.ids, before.ids)
+        self.assertEqual(graph.ancestors(5), [4, 6])
+        self.assertEqual(graph.descendants_count(3), 0)
+        # Узлы до перенесенного отрезка обхода не изменились
+        for company_id, value in tin.items():
+            self.assertEqual(
+                graph.arrays.tin[graph._find(before.ids, company_id)], value
+            )
+        self.assertEqual(before.depths[before.ids.index(5)], 2)
+        self.assertSameForest(graph, {1: None, 2: 1, 3: None, 4: 6, 5: 4, 6: None})
+
+    def test_patch_falls_back_to_rebuild(self):
+        graph = SupplierGraph()
+        graph._build([(1, None), (2, 1), (3, 2)])
+        # Цикл, удаление, новая компания с меньшим id
+        self.assertIsNone(graph._patch(graph.arrays, {1}, {1: 3}))
+        self.assertIsNone(graph._patch(graph.arrays, {3}, {}))
+        graph._build([(2, None), (3, 2)])
+        self.assertIsNone(graph._patch(graph.arrays, {1}, {1: 2}))
+
+    def test_patch_after_broken_cycle(self):
+        graph = SupplierGraph()
+        graph._build([(1, 2), (2, 1)])
+        self.assertTrue(graph.has_cycles)
+        # Цикл исправлен изменением компании 2, а корнем цикла могла стать 1:
+        # ее поставщик должен снова учитываться, нужна полная перестройка
+        self.assertIsNone(graph._patch(graph.arrays, {2}, {2: None}))
+
+        graph._build([(1, 2), (2, None)])
+        self.assertFalse(graph.has_cycles)
+        self.assertEqual(graph.supplier(1), 2)
+        self.assertEqual(graph.depth(1), 1)
+        self.assertTrue(graph.is_upstream(2, 1))
+        self.assertIsNotNone(graph._patch(graph.arrays, {1}, {1: None}))
+
+    def test_patch_matches_full_build(self):
+        rng = random.Random(31)
+        rows = {1: None}
+        for company_id in range(2, 60):
+            rows[company_id] = rng.choice([None, *rows])
+        graph = SupplierGraph()
+        graph._build(rows.items())
+        for _ in range(200):
+            if rng.random() < 0.3:
+                company_id = max(rows) + 1
+                excluded = set()
+            else:
+                company_id = rng.choice(list(rows))
+                excluded = {company_id, *graph.descendants(company_id)}
+            supplier_id = rng.choice([None, *(set(rows) - excluded)])
+            changes = {company_id: supplier_id}
+            graph.arrays = graph._patch(graph.arrays, {company_id}, changes)
+            rows.update(changes)
+            self.assertSameForest(graph, rows)
+
+    @override_settings(SUPPLIER_GRAPH_BACKGROUND_REFRESH=False)
+    def test_incremental_refresh_applies_changes(self):
+        fabric = self.create_company("Завод")
+        graph = get_supplier_graph()
+        version = graph.version
+        retail = self.create_company("Сеть", supplier=fabric)
+        new_fabric = self.create_company("Новый завод")
+        with self.captureOnCommitCallbacks(execute=True):
+            fabric.supplier = new_fabric
+            fabric.save()
+
+        graph = get_supplier_graph()
+        self.assertEqual(graph.version, version + 3)
+        self.assertEqual(graph.ancestors(retail.pk), [fabric.pk, fabric.supplier_id])
+
+    def test_refresh_does_not_block_queries(self):
+        graph = SupplierGraph()
+        graph._build([(1, None), (2, 1)])
+        graph.version = cache.get_or_set(GRAPH_VERSION_KEY, 1, timeout=None)
+        record_company_change(3)
+
+        started, release = threading.Event(), threading.Event()
+
+        def slow_refresh():
+            started.set()
+            release.wait(5)
+            graph._build([(1, None), (2, 1), (3, 2)])
+            graph.version = cache.get(GRAPH_VERSION_KEY)
+
+        graph._refresh = slow_refresh
+        graph.refresh()
+        self.assertTrue(started.wait(5))
+        # Пока граф перестраивается, запросы отвечают по прежней версии
+        graph.refresh()
+        self.assertEqual(len(graph), 2)
+        self.assertEqual(graph.depth(2), 1)
+
+        release.set()
+        graph._thread.join(5)
+        self.assertEqual(graph.depth(3), 2)
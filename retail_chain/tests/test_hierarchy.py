@@ -0,0 +1,82 @@
+from retail_chain.hierarchy import (
+    DIRECTION_BOTH,
+    DIRECTION_DOWN,
+    DIRECTION_UP,
+    get_subtree_product_ids,
+    get_supply_chain,
+)
+from retail_chain.models import Company
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class SupplyChainTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fabric = self.create_company("Завод")
+        self.supplier = self.create_company("Поставщик", supplier=self.fabric)
+        self.retail = self.create_company(
+            "Сеть", supplier=self.supplier, level=2, type="individual_entrepreneur"
+        )
+        self.other_branch = self.create_company("Другая сеть", supplier=self.fabric)
+
+    def test_chain_from_root_to_company(self):
+        nodes, has_cycle = get_supply_chain(self.retail.pk)
+        self.assertFalse(has_cycle)
+        self.assertEqual(
+            [(node.pk, node.depth) for node in nodes],
+            [(self.fabric.pk, 2), (self.supplier.pk, 1), (self.retail.pk, 0)],
+        )
+
+    def test_cycle_is_detected_and_not_repeated(self):
+        Company.objects.filter(pk=self.fabric.pk).update(supplier=self.retail)
+        nodes, has_cycle = get_supply_chain(self.retail.pk)
+        self.assertTrue(has_cycle)
+        self.assertEqual(
+            sorted(node.pk for node in nodes),
+            sorted([self.fabric.pk, self.supplier.pk, self.retail.pk]),
+        )
+
+    def test_subtree_products_by_direction(self):
+        products = {
+            company.pk: self.create_product(company.name)
+            for company in (self.fabric, self.supplier, self.retail, self.other_branch)
+        }
+        for company_id, product in products.items():
+            Company.objects.get(pk=company_id).products.add(product)
+
+        def ids(*companies):
+            return sorted(products[company.pk].pk for company in companies)
+
+        self.assertEqual(
+            get_subtree_product_ids(self.supplier.pk, DIRECTION_UP),
+            ids(self.fabric, self.supplier),
+        )
+        self.assertEqual(
+            get_subtree_product_ids(self.supplier.pk, DIRECTION_DOWN),
+            ids(self.supplier, self.retail),
+        )
+        self.assertEqual(
+            get_subtree_product_ids(self.supplier.pk, DIRECTION_BOTH),
+            ids(self.fabric, self.supplier, self.retail),
+        )
+
+    def test_subtree_products_survive_cycles(self):
+        Company.objects.filter(pk=self.fabric.pk).update(supplier=self.retail)
+        product = self.create_product("Продукт")
+        self.fabric.products.add(product)
+        self.assertEqual(
+            get_subtree_product_ids(self.retail.pk, DIRECTION_BOTH), [product.pk]
+        )
+
+    def test_chain_endpoint(self):
+        self.create_contacts(self.fabric, "fabric@test.ru")
+        self.login(self.user)
+        response = self.client.get(f"/companies/{self.retail.pk}/chain/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data["has_cycle"])
+        chain = response.data["chain"]
+        self.assertEqual(
+            [node["id"] for node in chain],
+            [self.fabric.pk, self.supplier.pk, self.retail.pk],
+        )
+        self.assertEqual(chain[0]["contacts"][0]["email"], "fabric@test.ru")
@@ -0,0 +1,184 @@
+import csv
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from retail_chain import jobs
+from retail_chain.jobs import (
+    claim_job,
+    enqueue,
+    register_job,
+    requeue_stale_jobs,
+    run_job,
+)
+from retail_chain.models import Job
+from retail_chain.tests.base import RetailChainTestCase
+from retail_chain.throttling import TokenBucketThrottle
+
+Status = Job.StatusChoices
+
+
+class JobQueueTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        for registry in (jobs.JOB_REGISTRY, jobs.JOB_PARAMS):
+            patcher = mock.patch.dict(registry)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        @register_job("flaky")
+        def flaky(context):
+            self.calls.append(context.job.attempts)
+            if len(self.calls) < 3:
+                raise RuntimeError("сбой")
+            return {"calls": len(self.calls)}
+
+    def run_next(self):
+        job = claim_job("test")
+        self.assertIsNotNone(job)
+        return job, run_job(job)
+
+    @override_settings(JOBS_RETRY_DELAY=10)
+    def test_failed_job_is_retried_with_backoff(self):
+        job = enqueue("flaky", max_attempts=3)
+        delays = []
+        for _ in range(2):
+            started = timezone.now()
+            with self.assertLogs("retail_chain.jobs", "ERROR"):
+                self.assertEqual(self.run_next()[1], Status.PENDING)
+            job.refresh_from_db()
+            self.assertIn("RuntimeError", job.error)
+            delays.append(round((job.run_after - started).total_seconds()))
+            # Повтор еще не готов к выполнению
+            self.assertIsNone(claim_job("test"))
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(delays, [10, 20])
+
+        self.assertEqual(self.run_next()[1], Status.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {"calls": 3})
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(job.error, "")
+        self.assertEqual(self.calls, [1, 2, 3])
+
+    def test_job_fails_after_last_attempt(self):
+        job = enqueue("flaky", max_attempts=1)
+        with self.assertLogs("retail_chain.jobs", "ERROR"):
+            self.assertEqual(self.run_next()[1], Status.FAILED)
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stale_job_is_requeued(self):
+        job = enqueue("flaky", max_attempts=2)
+        claim_job("dead-worker")
+        Job.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Status.PENDING, ""))
+
+        claim_job("dead-worker")
+        Job.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Status.FAILED)
+
+    def test_params_are_validated_at_enqueue(self):
+        for name, params in (
+            ("flaky", {"unexpected": 1}),
+            ("zero_debt", {}),
+            ("zero_debt", {"company_ids": []}),
+            ("zero_debt", {"company_ids": ["x"]}),
+            ("export_companies", {"owner": 1}),
+        ):
+            with self.subTest(name=name, params=params):
+                with self.assertRaises(ValidationError) as error:
+                    enqueue(name, params)
+                self.assertIn("params", error.exception.detail)
+        self.assertFalse(Job.objects.exists())
+
+        job = enqueue("zero_debt", {"company_ids": ["1", 2]})
+        self.assertEqual(job.params, {"company_ids": [1, 2]})
+
+
+class JobAPITests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.create_company("Мой завод")
+        self.create_company("Чужой завод", owner=self.other)
+
+    def export(self):
+        self.login(self.user)
+        response = self.client.post("/jobs/", {"name": "export_companies"})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(run_job(claim_job("test")), Status.SUCCEEDED)
+        return Job.objects.get(pk=response.data["id"])
+
+    def test_export_is_downloaded_by_owner(self):
+        job = self.export()
+        self.assertRegex(
+            job.result["file"], r"^exports/companies-[A-Za-z0-9_-]{22}\.csv$"
+        )
+        self.assertNotEqual(self.export().result["file"], job.result["file"])
+
+        response = self.client.get(f"/jobs/{job.pk}/result/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'filename="export_companies-{job.pk}.csv"', response["Content-Disposition"]
+        )
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row["name"] for row in rows], ["Мой завод"])
+
+        self.login(self.other)
+        self.assertEqual(self.client.get(f"/jobs/{job.pk}/result/").status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(f"/jobs/{job.pk}/result/").status_code, 401)
+
+    def test_result_of_unfinished_job(self):
+        self.login(self.user)
+        response = self.client.post("/jobs/", {"name": "export_companies"})
+        self.assertEqual(
+            self.client.get(f"/jobs/{response.data['id']}/result/").status_code, 404
+        )
+
+    def test_invalid_params(self):
+        self.login(self.user)
+        response = self.client.post(
+            "/jobs/",
+            {"name": "export_companies", "params": {"owner": self.other.pk}},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("owner", response.data["params"])
+
+    @mock.patch.object(
+        TokenBucketThrottle,
+        "THROTTLE_RATES",
+        {"user": "100/min", "search": "100/min", "jobs": "2/hour"},
+    )
+    def test_job_creation_is_throttled(self):
+        self.login(self.user)
+        for _ in range(2):
+            response = self.client.post("/jobs/", {"name": "export_companies"})
+            self.assertEqual(response.status_code, 202)
+        response = self.client.post("/jobs/", {"name": "export_companies"})
+        self.assertEqual(response.status_code, 429)
+        # Опрос статуса не ограничен ставкой jobs
+        self.assertEqual(self.client.get("/jobs/").status_code, 200)
@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from retail_chain.graph import SupplierGraph
+from retail_chain.tests.base import RetailChainTestCase
+
+
+@override_settings(SUPPLIER_GRAPH_BACKGROUND_REFRESH=False)
+class OwnerScopingTests(RetailChainTestCase):
+    """
+    Пользователь видит только свои записи, в том числе в раскрытых связях,
+    цепочках поставок и иерархии. Модератор видит все записи.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Завод другого пользователя поставляет компании пользователя
+        self.fabric = self.create_company("Чужой завод", owner=self.other)
+        self.create_contacts(self.fabric, "secret@test.ru", inn="9999999999")
+        self.fabric.products.add(self.create_product("Чужой", owner=self.other))
+        self.company = self.create_company("Моя сеть", supplier=self.fabric)
+        self.create_contacts(self.company, "mine@test.ru")
+        self.product = self.create_product("Мой")
+        self.company.products.add(self.product)
+        self.shop = self.create_company("Мой магазин", supplier=self.company, level=2)
+
+    def test_list_and_retrieve(self):
+        self.login(self.user)
+        response = self.client.get("/companies/", {"page_size": 10})
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [self.company.pk, self.shop.pk],
+        )
+        response = self.client.get(f"/companies/{self.fabric.pk}/")
+        self.assertEqual(response.status_code, 404)
+
+        self.login(self.moderator)
+        response = self.client.get("/companies/", {"page_size": 10})
+        self.assertEqual(response.data["count"], 3)
+
+    def test_expand_hides_other_owners(self):
+        self.login(self.user)
+        response = self.client.get(
+            f"/companies/{self.shop.pk}/",
+            {"expand": "supplier.supplier,contacts,products"},
+        )
+        self.assertEqual(response.status_code, 200)
+        supplier = response.data["supplier"]
+        self.assertEqual(supplier["id"], self.company.pk)
+        self.assertIsNone(supplier["supplier"])
+
+        response = self.client.get(
+            "/companies/", {"expand": "supplier.contacts,products", "page_size": 10}
+        )
+        company = response.data["results"][0]
+        self.assertIsNone(company["supplier"])
+        self.assertEqual(
+            [product["id"] for product in company["products"]], [self.product.pk]
+        )
+
+    def test_moderator_expands_all(self):
+        self.login(self.moderator)
+        response = self.client.get(
+            f"/companies/{self.company.pk}/", {"expand": "supplier.contacts"}
+        )
+        self.assertEqual(response.data["supplier"]["id"], self.fabric.pk)
+        self.assertEqual(
+            response.data["supplier"]["contacts"][0]["email"], "secret@test.ru"
+        )
+
+    def test_chain_hides_other_owners(self):
+        self.login(self.user)
+        response = self.client.get(f"/companies/{self.shop.pk}/chain/")
+        self.assertEqual(
+            [node["id"] for node in response.data["chain"]],
+            [self.company.pk, self.shop.pk],
+        )
+        self.assertNotIn("secret@test.ru", str(response.data))
+
+    def test_subtree_products_hide_other_owners(self):
+        self.login(self.user)
+        response = self.client.get(f"/companies/{self.company.pk}/products/")
+        self.assertEqual(
+            [product["id"] for product in response.data["results"]], [self.product.pk]
+        )
+        self.login(self.moderator)
+        response = self.client.get(f"/companies/{self.company.pk}/products/")
+        self.assertEqual(response.data["count"], 2)
+
+    def test_hierarchy(self):
+        self.login(self.user)
+        response = self.client.get(
+            f"/companies/{self.shop.pk}/hierarchy/",
+            {"is_upstream_of": self.shop.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["depth"], 2)
+        self.assertEqual(response.data["ancestors"], [self.company.pk])
+
+        response = self.client.get(
+            f"/companies/{self.company.pk}/hierarchy/",
+            {"is_upstream_of": self.shop.pk},
+        )
+        self.assertTrue(response.data["is_upstream_of"])
+
+        for path, params in (
+            (f"/companies/{self.fabric.pk}/hierarchy/", {}),
+            (
+                f"/companies/{self.company.pk}/hierarchy/",
+                {"is_upstream_of": self.fabric.pk},
+            ),
+        ):
+            with self.subTest(path=path, params=params):
+                self.assertEqual(self.client.get(path, params).status_code, 404)
+
+    def test_hierarchy_of_company_created_after_graph_load(self):
+        self.login(self.user)
+        self.client.get(f"/companies/{self.shop.pk}/hierarchy/")
+        # Фоновое перестроение не успело выполниться
+        with override_settings(
+            SUPPLIER_GRAPH_BACKGROUND_REFRESH=True
+        ), mock.patch.object(SupplierGraph, "_refresh_in_background"):
+            company = self.create_company("Новый магазин", supplier=self.company)
+            response = self.client.get(f"/companies/{company.pk}/hierarchy/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["supplier"], self.company.pk)
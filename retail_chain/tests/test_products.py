@@ -0,0 +1,160 @@
+import datetime
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+from retail_chain.models import ChangeLogEntry, Product, normalize_product_key
+from retail_chain.products import dedupe_products
+from retail_chain.tests.base import RetailChainTestCase
+
+merge_migration = import_module("retail_chain.migrations.0008_product_natural_key")
+
+
+class ProductUpsertTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product("Молоко", "M1")
+        self.login(self.user)
+
+    def upsert(self, data):
+        return self.client.post("/products/upsert/", data, format="json")
+
+    def test_single_item(self):
+        response = self.upsert({"product_name": "  МОЛОКО ", "product_model": "m1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], self.product.pk)
+        self.assertFalse(response.data["created"])
+
+        response = self.upsert({"product_name": "Кефир", "product_model": "K1"})
+        self.assertEqual(response.status_code, 201)
+        product = Product.objects.get(pk=response.data["id"])
+        self.assertEqual(
+            (product.owner, product.natural_key),
+            (self.user, normalize_product_key("Кефир", "K1")),
+        )
+
+    def test_list_creates_and_updates_in_few_queries(self):
+        items = [
+            {
+                "product_name": "Молоко",
+                "product_model": "M1",
+                "product_date": "2024-01-01",
+            },
+            {"product_name": "Кефир", "product_model": "K1"},
+            {"product_name": "кефир", "product_model": "K1"},
+            {"product_name": "Сыр", "product_model": "S1"},
+        ]
+        # Проверка роли, поиск существующих, обновление, вставка в точке
+        # сохранения и журнал изменений: число запросов не зависит от длины списка
+        with self.assertNumQueries(12):
+            response = self.upsert(items)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["created"] for item in response.data], [False, True, True, True]
+        )
+        self.assertEqual(response.data[1]["id"], response.data[2]["id"])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.product_date, datetime.date(2024, 1, 1))
+        self.assertEqual(Product.objects.filter(owner=self.user).count(), 3)
+
+    def test_product_created_concurrently_is_not_reported_as_created(self):
+        filter_products = Product.objects.filter
+        concurrent = []
+
+        def filter_before_concurrent_insert(*args, **kwargs):
+            # Первый поиск выполняется до вставки параллельного запроса
+            if not concurrent:
+                concurrent.append(
+                    Product.objects.create(
+                        product_name="Кефир",
+                        product_model="K1",
+                        product_date=datetime.date(2024, 1, 1),
+                        owner=self.user,
+                    )
+                )
+                return Product.objects.none()
+            return filter_products(*args, **kwargs)
+
+        ChangeLogEntry.objects.all().delete()
+        with mock.patch.object(
+            Product.objects, "filter", side_effect=filter_before_concurrent_insert
+        ):
+            response = self.upsert(
+                [
+                    {"product_name": "Кефир", "product_model": "K1"},
+                    {"product_name": "Сыр", "product_model": "S1"},
+                ]
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["created"] for item in response.data], [False, True])
+        self.assertEqual(response.data[0]["id"], concurrent[0].pk)
+        # Дата, переданная параллельным запросом, не затерта
+        concurrent[0].refresh_from_db()
+        self.assertEqual(concurrent[0].product_date, datetime.date(2024, 1, 1))
+        self.assertEqual(
+            list(
+                ChangeLogEntry.objects.filter(model_name="product").values_list(
+                    "object_id", "action"
+                )
+            ),
+            [
+                (concurrent[0].pk, ChangeLogEntry.ActionChoices.INSERT),
+                (response.data[1]["id"], ChangeLogEntry.ActionChoices.INSERT),
+            ],
+        )
+
+    def test_keys_are_separate_per_owner(self):
+        self.login(self.other)
+        response = self.upsert({"product_name": "Молоко", "product_model": "M1"})
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.data["id"], self.product.pk)
+
+
+class DedupeProductsTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.keeper = self.create_product("Молоко", "M1")
+        self.duplicate = self.create_product("Кефир", "M1")
+        self.other_product = self.create_product("Сыр", "S1", owner=self.other)
+        # Название изменено без save(): ключ устарел и совпадает с keeper
+        Product.objects.filter(pk=self.duplicate.pk).update(product_name=" молоко")
+
+        self.shop = self.create_company("Магазин")
+        self.shop.products.add(self.duplicate)
+        self.market = self.create_company("Рынок")
+        self.market.products.add(self.keeper, self.duplicate)
+
+    def assert_merged(self):
+        self.assertFalse(Product.objects.filter(pk=self.duplicate.pk).exists())
+        for company in (self.shop, self.market):
+            self.assertEqual(
+                list(company.products.values_list("pk", flat=True)), [self.keeper.pk]
+            )
+
+    def test_dedupe_products(self):
+        merged, rekeyed, company_ids = dedupe_products(batch_size=1)
+        self.assertEqual((merged, rekeyed), (1, 0))
+        self.assertEqual(company_ids, sorted([self.shop.pk, self.market.pk]))
+        self.assert_merged()
+
+        Product.objects.filter(pk=self.keeper.pk).update(product_name="Кефир")
+        self.assertEqual(dedupe_products(), (0, 1, []))
+        self.keeper.refresh_from_db()
+        self.assertEqual(self.keeper.natural_key, normalize_product_key("Кефир", "M1"))
+
+    def test_migration_merges_duplicates(self):
+        # До миграции ключей нет, а уникальный индекс уже создан в тестовой
+        # базе, поэтому ключи заменяются уникальными заглушками
+        Product.objects.update(natural_key=Concat(Value("#"), Cast("pk", CharField())))
+        merge_migration.merge_duplicate_products(apps, None)
+        self.assert_merged()
+        self.assertEqual(
+            dict(Product.objects.values_list("pk", "natural_key")),
+            {
+                self.keeper.pk: normalize_product_key("Молоко", "M1"),
+                self.other_product.pk: normalize_product_key("Сыр", "S1"),
+            },
+        )
@@ -0,0 +1,63 @@
+from django.test import RequestFactory, override_settings
+
+from retail_chain.query_limits import (
+    QueryBudgetExceeded,
+    QueryLimitsMiddleware,
+    get_limits,
+    limit_queries,
+)
+from retail_chain.tests.base import RetailChainTestCase
+from users.models import User
+
+
+class QueryLimitsTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(self.user)
+
+    def test_limits_by_view_and_action(self):
+        with override_settings(
+            QUERY_LIMITS={
+                "default": {"max_queries": 10},
+                "ProductViewSet": {"timeout_ms": 100},
+                "ProductViewSet.list": {"max_queries": 5},
+            }
+        ):
+            self.assertEqual(
+                get_limits("ProductViewSet", "ProductViewSet.list"),
+                {"timeout_ms": 100, "max_queries": 5},
+            )
+            self.assertEqual(
+                get_limits("ProductViewSet", "ProductViewSet.retrieve"),
+                {"timeout_ms": 100, "max_queries": 10},
+            )
+
+    def test_budget_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs(
+            "retail_chain.query_limits", "WARNING"
+        ) as logs:
+            with limit_queries({"timeout_ms": None, "max_queries": 1}, "тест"):
+                User.objects.count()
+                User.objects.count()
+        self.assertIn("в тест: 2 при ограничении 1", logs.output[0])
+
+    @override_settings(QUERY_LIMITS={"ProductViewSet.list": {"max_queries": 1}})
+    def test_api_returns_503(self):
+        with self.assertLogs("retail_chain.query_limits", "WARNING") as logs:
+            response = self.client.get("/products/")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data["detail"].code, "query_budget_exceeded")
+        self.assertIn("GET /products/ (ProductViewSet.list): 2", logs.output[0])
+        # Ограничение действия не распространяется на другие представления
+        self.assertEqual(self.client.get("/companies/").status_code, 200)
+
+    def test_exempt_paths_under_script_name(self):
+        # За прокси с префиксом /api путь приложения - path_info
+        middleware = QueryLimitsMiddleware(
+            lambda request: getattr(request, "query_limiter", None)
+        )
+        factory = RequestFactory()
+        request = factory.get("/admin/", SCRIPT_NAME="/api")
+        self.assertEqual(request.path, "/api/admin/")
+        self.assertIsNone(middleware(request))
+        self.assertIsNotNone(middleware(factory.get("/products/", SCRIPT_NAME="/api")))
@@ -0,0 +1,96 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.utils.translation import gettext_lazy
+from djmoney.money import Money
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from retail_chain import renderers
+from retail_chain.models import Company
+from retail_chain.renderers import FastJSONParser, FastJSONRenderer, RetailJSONEncoder
+from retail_chain.serializers import CompanySerializer
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class RetailJSONRenderer(JSONRenderer):
+    encoder_class = RetailJSONEncoder
+
+
+@skipIf(renderers.orjson is None, "orjson не установлен")
+class FastJSONRendererTests(RetailChainTestCase):
+    def test_company_payload_matches_drf(self):
+        fabric = self.create_company("Завод «Восток»", debt=Decimal("12.50"))
+        # Разделитель строк экранируется для JavaScript
+        retail = self.create_company("Сеть\u2028", supplier=fabric)
+        retail.products.add(self.create_product("Телефон"))
+        self.create_contacts(retail, "shop@test.ru", country="Россия")
+        data = CompanySerializer(Company.objects.order_by("pk"), many=True).data
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+
+    def test_types_handled_by_encoder(self):
+        data = {
+            "decimal": Decimal("1.10"),
+            "money": Money("10.50", "USD"),
+            "lazy": gettext_lazy("Телефон"),
+            "datetime": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456),
+            "date": datetime.date(2024, 5, 1),
+            1: "non-str key",
+        }
+        fast = FastJSONRenderer().render(data)
+        self.assertEqual(fast, RetailJSONRenderer().render(data))
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), fast)
+
+    def test_ensure_ascii_uses_standard_renderer(self):
+        renderer = FastJSONRenderer()
+        renderer.ensure_ascii = True
+        self.assertEqual(
+            renderer.render({"name": "Завод"}),
+            b'{"name":"\\u0417\\u0430\\u0432\\u043e\\u0434"}',
+        )
+
+    def test_nan_is_rendered_as_null(self):
+        # Отличие от стандартного рендерера, который отказывается выводить NaN
+        self.assertEqual(
+            FastJSONRenderer().render({"value": float("nan")}), b'{"value":null}'
+        )
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({"value": float("nan")})
+
+    def test_none(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+@skipIf(renderers.orjson is None, "orjson не установлен")
+class FastJSONParserTests(RetailChainTestCase):
+    def parse(self, parser, content, encoding="utf-8"):
+        return parser.parse(io.BytesIO(content), parser_context={"encoding": encoding})
+
+    def test_matches_drf(self):
+        content = '{"name": "Завод", "items": [1, 2.5, null, true]}'.encode()
+        self.assertEqual(
+            self.parse(FastJSONParser(), content), self.parse(JSONParser(), content)
+        )
+
+    def test_invalid_json(self):
+        with self.assertRaises(ParseError):
+            self.parse(FastJSONParser(), b'{"name": ')
+
+    def test_other_encoding_uses_standard_parser(self):
+        content = '{"name": "Завод"}'.encode("cp1251")
+        self.assertEqual(
+            self.parse(FastJSONParser(), content, "cp1251"), {"name": "Завод"}
+        )
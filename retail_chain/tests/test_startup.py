@@ -0,0 +1,31 @@
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from rest_framework_simplejwt.tokens import AccessToken
+
+from retail_chain.management.commands.bench_startup import Command
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class BenchStartupTests(RetailChainTestCase):
+    def bench(self, status="200 OK", **options):
+        result = {"loaded": 0, "served": 0, "status": status, "stderr": ""}
+        with mock.patch.object(Command, "run_child", return_value=result) as run_child:
+            call_command("bench_startup", repeat=1, stdout=mock.Mock(), **options)
+        return run_child.call_args.args[1]
+
+    def test_request_is_authenticated(self):
+        path, token = self.bench()
+        self.assertEqual(path, "/products/")
+        first = min((self.user, self.other, self.moderator), key=lambda user: user.pk)
+        self.assertEqual(AccessToken(token)["user_id"], str(first.pk))
+
+        path, token = self.bench(user=self.other.email)
+        self.assertEqual(AccessToken(token)["user_id"], str(self.other.pk))
+
+        with self.assertRaises(CommandError):
+            self.bench(user="nobody@test.ru")
+
+    def test_error_response_fails(self):
+        with self.assertRaisesMessage(CommandError, "401"):
+            self.bench(status="401 Unauthorized")
@@ -0,0 +1,141 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from retail_chain.models import Company, CompanySummaryState, NetworkSummary
+from retail_chain.summaries import check_summaries, rebuild_summaries
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class NetworkSummaryTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fabric = self.create_company("Завод", debt=Decimal("100"))
+        self.retail = self.create_company(
+            "Сеть", supplier=self.fabric, debt=Decimal("20"), debt_currency="USD"
+        )
+        self.contacts = self.create_contacts(
+            self.fabric, "fabric@test.ru", country="Россия"
+        )
+        self.retail.products.add(
+            self.create_product("Телефон"), self.create_product("Планшет")
+        )
+        self.login(self.moderator)
+
+    def summary(self, dimension):
+        response = self.client.get("/analytics/summary/")
+        self.assertEqual(response.status_code, 200)
+        return {
+            item["key"]: (
+                item["companies"],
+                item["products"],
+                {currency: Decimal(debt) for currency, debt in item["debt"].items()},
+            )
+            for item in response.data[dimension]
+        }
+
+    def assertConsistent(self):
+        self.assertEqual(check_summaries(), [])
+        self.assertEqual(CompanySummaryState.objects.count(), Company.objects.count())
+
+    def test_endpoint(self):
+        self.assertConsistent()
+        self.assertEqual(
+            self.summary("level"),
+            {"0": (1, 0, {"RUB": 100}), "1": (1, 2, {"USD": 20})},
+        )
+        self.assertEqual(
+            self.summary("type"),
+            {"fabric": (1, 0, {"RUB": 100}), "retail": (1, 2, {"USD": 20})},
+        )
+        self.assertEqual(
+            self.summary("country"),
+            {"Россия": (1, 0, {"RUB": 100}), None: (1, 2, {"USD": 20})},
+        )
+
+    def test_moderators_only(self):
+        self.login(self.user)
+        self.assertEqual(self.client.get("/analytics/summary/").status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/analytics/summary/").status_code, 401)
+
+    def test_company_create_update_delete(self):
+        shop = self.create_company(
+            "Магазин", supplier=self.retail, level=2, debt=Decimal("5")
+        )
+        self.assertConsistent()
+        self.assertEqual(self.summary("level")["2"], (1, 0, {"RUB": 5}))
+
+        # Смена поставщика и уровня, типа и задолженности
+        shop.supplier = self.fabric
+        shop.level = 1
+        shop.type = "individual_entrepreneur"
+        shop.debt = Decimal("7")
+        shop.save()
+        self.assertConsistent()
+        self.assertNotIn("2", self.summary("level"))
+        self.assertEqual(self.summary("level")["1"], (2, 2, {"USD": 20, "RUB": 7}))
+        self.assertEqual(
+            self.summary("type")["individual_entrepreneur"], (1, 0, {"RUB": 7})
+        )
+
+        shop.delete()
+        self.assertConsistent()
+        self.assertNotIn("individual_entrepreneur", self.summary("type"))
+        self.assertEqual(self.summary("level")["1"], (1, 2, {"USD": 20}))
+
+    def test_contacts_create_update_move_delete(self):
+        contacts = self.create_contacts(
+            self.retail, "retail@test.ru", country="Беларусь"
+        )
+        self.assertConsistent()
+        self.assertEqual(self.summary("country")["Беларусь"], (1, 2, {"USD": 20}))
+
+        contacts.country = "Казахстан"
+        contacts.save()
+        self.assertConsistent()
+        self.assertNotIn("Беларусь", self.summary("country"))
+
+        # Перенос контакта: страна меняется у обеих компаний
+        self.contacts.company = self.retail
+        self.contacts.save()
+        self.assertConsistent()
+        self.assertEqual(
+            self.summary("country"),
+            {"Россия": (1, 2, {"USD": 20}), None: (1, 0, {"RUB": 100})},
+        )
+
+        self.contacts.delete()
+        self.assertConsistent()
+        self.assertEqual(
+            self.summary("country"),
+            {"Казахстан": (1, 2, {"USD": 20}), None: (1, 0, {"RUB": 100})},
+        )
+
+    def test_products_change(self):
+        self.fabric.products.add(self.create_product("Ноутбук"))
+        self.retail.products.clear()
+        self.assertConsistent()
+        self.assertEqual(
+            self.summary("level"),
+            {"0": (1, 1, {"RUB": 100}), "1": (1, 0, {"USD": 20})},
+        )
+
+    def test_rebuild_summaries(self):
+        NetworkSummary.objects.filter(key="fabric").update(companies=5)
+        CompanySummaryState.objects.filter(pk=self.retail.pk).delete()
+        self.assertEqual(len(check_summaries()), 1)
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "Расхождений: 1"):
+            call_command("rebuild_summaries", "--check", stdout=out)
+        self.assertIn("type 'fabric' RUB", out.getvalue())
+
+        call_command("rebuild_summaries", stdout=StringIO())
+        self.assertConsistent()
+        out = StringIO()
+        call_command("rebuild_summaries", "--check", stdout=out)
+        self.assertIn("Сводки совпадают", out.getvalue())
+        # Уровень, тип и страна для двух валют
+        self.assertEqual(rebuild_summaries(), 6)
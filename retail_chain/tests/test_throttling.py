@@ -0,0 +1,113 @@
+from unittest import mock
+
+from rest_framework.test import APIRequestFactory
+
+from retail_chain.tests.base import RetailChainTestCase
+from retail_chain.throttling import (
+    RoleRateThrottle,
+    SearchRateThrottle,
+    TokenBucketThrottle,
+)
+
+RATES = {
+    "anon": "3/min",
+    "user": "3/min",
+    "moderator": "6/min",
+    "staff": "60/min",
+    "search": "1/min",
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@mock.patch.object(TokenBucketThrottle, "THROTTLE_RATES", RATES)
+class TokenBucketThrottleTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        patcher = mock.patch.object(
+            TokenBucketThrottle, "timer", lambda _: self.clock()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, user=None, path="/products/", ip="10.0.0.1"):
+        request = APIRequestFactory().get(path, REMOTE_ADDR=ip)
+        request.user = user
+        request.query_params = request.GET
+        return request
+
+    def allow(self, request, throttle_class=RoleRateThrottle):
+        throttle = throttle_class()
+        return throttle.allow_request(request, None), throttle.wait()
+
+    def test_burst_then_steady_rate(self):
+        request = self.request(self.user)
+        for _ in range(3):
+            self.assertTrue(self.allow(request)[0])
+        allowed, wait = self.allow(request)
+        self.assertFalse(allowed)
+        self.assertEqual(wait, 20)
+
+        # Ведро пополняется на один запрос за 60 / 3 секунд
+        self.clock.now += 19
+        self.assertFalse(self.allow(request)[0])
+        self.clock.now += 1
+        self.assertTrue(self.allow(request)[0])
+        self.assertFalse(self.allow(request)[0])
+
+    def test_rejected_requests_do_not_consume_tokens(self):
+        request = self.request(self.user)
+        for _ in range(3):
+            self.allow(request)
+        for _ in range(10):
+            self.assertFalse(self.allow(request)[0])
+        self.clock.now += 20
+        self.assertTrue(self.allow(request)[0])
+
+    def test_bucket_refills_after_idle(self):
+        request = self.request(self.user)
+        for _ in range(3):
+            self.allow(request)
+        self.clock.now += 600
+        for _ in range(3):
+            self.assertTrue(self.allow(request)[0])
+        self.assertFalse(self.allow(request)[0])
+
+    def test_buckets_are_separate(self):
+        for _ in range(3):
+            self.allow(self.request(self.user))
+        self.assertFalse(self.allow(self.request(self.user))[0])
+        self.assertTrue(self.allow(self.request(self.other))[0])
+
+        anonymous = mock.Mock(is_authenticated=False)
+        for _ in range(3):
+            self.assertTrue(self.allow(self.request(anonymous))[0])
+        self.assertFalse(self.allow(self.request(anonymous))[0])
+        self.assertTrue(self.allow(self.request(anonymous, ip="10.0.0.2"))[0])
+
+    def test_rate_depends_on_role(self):
+        request = self.request(self.moderator)
+        for _ in range(6):
+            self.assertTrue(self.allow(request)[0])
+        self.assertFalse(self.allow(request)[0])
+
+    def test_search_has_its_own_rate(self):
+        search = self.request(self.user, path="/products/?search=молоко")
+        self.assertTrue(self.allow(search, SearchRateThrottle)[0])
+        self.assertFalse(self.allow(search, SearchRateThrottle)[0])
+        self.assertTrue(self.allow(self.request(self.user), SearchRateThrottle)[0])
+
+    def test_api_returns_retry_after(self):
+        self.login(self.user)
+        for _ in range(3):
+            self.assertEqual(self.client.get("/products/").status_code, 200)
+        response = self.client.get("/products/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "20")
@@ -0,0 +1,131 @@
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from retail_chain import tracing
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class StubExporter:
+    """
+    Экспортер, собирающий трассы в список.
+    """
+
+    traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+class FailingExporter:
+    def export(self, trace):
+        raise OSError("collector is down")
+
+
+def names(spans):
+    return [item["name"] for item in spans["children"]]
+
+
+def find(spans, name):
+    return next(item for item in spans["children"] if item["name"] == name)
+
+
+def walk(spans):
+    yield spans
+    for child in spans["children"]:
+        yield from walk(child)
+
+
+@override_settings(
+    TRACING_SAMPLE_RATE=1,
+    TRACING_SLOW_REQUEST_MS=None,
+    TRACING_EXPORTER="retail_chain.tests.test_tracing.StubExporter",
+    TRACING_EXPORTER_OPTIONS={},
+)
+class TracingMiddlewareTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        StubExporter.traces = []
+        tracing.get_exporter.cache_clear()
+        self.addCleanup(tracing.get_exporter.cache_clear)
+        self.create_product("Телефон")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def test_span_tree(self):
+        response = self.client.get("/products/")
+        self.assertEqual(response.status_code, 200)
+        [trace] = StubExporter.traces
+        self.assertEqual(response["X-Trace-Id"], trace["trace_id"])
+        self.assertEqual(trace["dropped_spans"], 0)
+
+        root = trace["spans"]
+        self.assertEqual(root["name"], "request")
+        self.assertEqual(
+            root["attributes"], {"method": "GET", "path": "/products/", "status": 200}
+        )
+        self.assertEqual(names(root), ["view ProductViewSet", "render"])
+        view = find(root, "view ProductViewSet")
+        self.assertEqual(view["attributes"], {"action": "list", "user": self.user.pk})
+        self.assertEqual(
+            names(view),
+            ["authentication", "permissions", "throttles", "queryset", "serialize"],
+        )
+        self.assertEqual(
+            find(view, "serialize")["attributes"],
+            {"serializer": "ValuesListSerializer"},
+        )
+
+        # JWT: аутентификатор и загрузка пользователя из базы
+        auth = find(find(view, "authentication"), "auth JWTAuthentication")
+        self.assertEqual(auth["attributes"], {"method": "authenticate"})
+        self.assertEqual(names(auth), ["sql"])
+        self.assertIn("users_user", auth["children"][0]["attributes"]["sql"])
+
+        permissions = find(view, "permissions")
+        self.assertTrue(names(permissions))
+        self.assertTrue(
+            all(name.startswith("permission ") for name in names(permissions))
+        )
+
+        queryset = find(view, "queryset")
+        self.assertTrue(names(queryset))
+        self.assertEqual(set(names(queryset)), {"sql"})
+        self.assertIn(
+            "retail_chain_product",
+            " ".join(s["attributes"]["sql"] for s in queryset["children"]),
+        )
+        for item in walk(root):
+            self.assertGreaterEqual(item["duration_ms"], 0)
+            for child in item["children"]:
+                self.assertGreaterEqual(child["start_ms"], item["start_ms"])
+
+    @override_settings(TRACING_MAX_SPANS=3)
+    def test_spans_over_limit_are_dropped(self):
+        self.client.get("/products/")
+        [trace] = StubExporter.traces
+        recorded = sum(1 for _ in walk(trace["spans"])) - 1
+        self.assertEqual(recorded, 3)
+        self.assertGreater(trace["dropped_spans"], 0)
+
+    @override_settings(TRACING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = self.client.get("/products/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Trace-Id", response)
+        self.assertEqual(StubExporter.traces, [])
+        self.assertIsNone(tracing.current_span())
+
+    @override_settings(TRACING_SAMPLE_RATE=0, TRACING_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_exported(self):
+        response = self.client.get("/products/")
+        [trace] = StubExporter.traces
+        self.assertEqual(response["X-Trace-Id"], trace["trace_id"])
+
+    @override_settings(
+        TRACING_EXPORTER="retail_chain.tests.test_tracing.FailingExporter"
+    )
+    def test_export_error_does_not_break_request(self):
+        with self.assertLogs("retail_chain.tracing", "ERROR"):
+            response = self.client.get("/products/")
+        self.assertEqual(response.status_code, 200)
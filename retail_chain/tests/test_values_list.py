@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from retail_chain.fast_serializers import ValuesListSerializer
+from retail_chain.models import Company, Contacts, Product
+from retail_chain.serializers import (
+    CompanyAllFieldsSerializer,
+    CompanyChainSerializer,
+    CompanySerializer,
+    ContactsSerializer,
+    ProductSerializer,
+)
+from retail_chain.tests.base import RetailChainTestCase
+
+
+class ValuesListSerializerTests(RetailChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fabric = self.create_company("Завод", description="Описание")
+        self.retail = self.create_company("Сеть", supplier=self.fabric)
+        self.products = [self.create_product(f"Продукт {i}") for i in range(3)]
+        self.retail.products.add(*self.products[:2])
+        self.create_contacts(self.fabric, "fabric@test.ru", country="Россия")
+
+    def assertSameOutput(self, serializer_class, queryset):
+        values_serializer = ValuesListSerializer.for_serializer_class(serializer_class)
+        self.assertIsNotNone(values_serializer)
+        queryset = queryset.order_by("pk")
+        self.assertEqual(
+            values_serializer.serialize(values_serializer.values_list(queryset)),
+            [dict(item) for item in serializer_class(queryset, many=True).data],
+        )
+
+    def test_company_output_matches_model_serializer(self):
+        for serializer_class in (CompanySerializer, CompanyAllFieldsSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertSameOutput(serializer_class, Company.objects.all())
+
+    def test_product_and_contacts_output_matches_model_serializer(self):
+        self.assertSameOutput(ProductSerializer, Product.objects.all())
+        self.assertSameOutput(ContactsSerializer, Contacts.objects.all())
+
+    def test_nested_serializer_is_not_supported(self):
+        self.assertIsNone(
+            ValuesListSerializer.for_serializer_class(CompanyChainSerializer)
+        )
+
+
+class ValuesListMixinTests(RetailChainTestCase):
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/companies/", {"page_size": 10})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data["results"]
+
+    def test_list_matches_regular_serializer(self):
+        fabric = self.create_company("Завод")
+        self.create_company("Сеть", supplier=fabric).products.add(
+            self.create_product("Продукт")
+        )
+        self.login(self.user)
+        _, results = self.count_list_queries()
+        expected = CompanyAllFieldsSerializer(
+            Company.objects.order_by("pk"), many=True
+        ).data
+        self.assertEqual(results, [dict(item) for item in expected])
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.login(self.user)
+        product = self.create_product("Продукт")
+        for i in range(2):
+            self.create_company(f"Компания {i}").products.add(product)
+        # Первый запрос дополнительно проверяет группу модераторов
+        self.count_list_queries()
+        few, _ = self.count_list_queries()
+        for i in range(2, 8):
+            self.create_company(f"Компания {i}").products.add(product)
+        many, results = self.count_list_queries()
+        self.assertEqual(len(results), 8)
+        self.assertEqual(few, many)
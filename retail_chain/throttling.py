@@ -0,0 +1,109 @@
+import time
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from retail_chain.permissions import is_moderator
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты запросов «ведром токенов» в общем кэше.
+    Ставка "N/период" означает ведро на N запросов, которое пополняется
+    со скоростью N за период: клиент может сделать до N запросов подряд,
+    а дальше - не чаще одного в период/N.
+
+    Состояние ведра - одно целое число в кэше: теоретическое время
+    следующего запроса в микросекундах (алгоритм GCRA). Каждый запрос -
+    один атомарный cache.incr на интервал между запросами, без чтения
+    и записи в два шага. Если время в прошлом (ведро полное), оно
+    сдвигается на текущее. Отклоненный запрос возвращает интервал обратно.
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def __init__(self):
+        # Ставка выбирается в allow_request, когда известен запрос
+        pass
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user{request.user.pk}"
+        return f"ip{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        if self.scope is None:
+            return True
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        num_requests, duration = self.parse_rate(self.rate)
+        period = duration * 1_000_000
+        interval = period // num_requests
+        key = self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident_key(request),
+        }
+
+        now = int(self.timer() * 1_000_000)
+        try:
+            arrival = self.cache.incr(key, interval)
+        except ValueError:
+            arrival = None
+        if arrival is None or arrival - interval < now:
+            arrival = now + interval
+            self.cache.set(key, arrival, timeout=duration * 2)
+        if arrival - now <= period:
+            return True
+
+        self.cache.decr(key, interval)
+        # Ключ активного нарушителя не должен истечь раньше времени
+        self.cache.touch(key, timeout=duration * 2)
+        self.wait_seconds = (arrival - period - now) / 1_000_000
+        return False
+
+    def wait(self):
+        return getattr(self, "wait_seconds", None)
+
+    def timer(self):
+        return time.time()
+
+
+class RoleRateThrottle(TokenBucketThrottle):
+    """
+    Общий лимит по роли: anon, user, moderator, staff.
+    """
+
+    def get_scope(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return "anon"
+        if user.is_staff:
+            return "staff"
+        if is_moderator(user):
+            return "moderator"
+        return "user"
+
+
+class SearchRateThrottle(TokenBucketThrottle):
+    """
+    Отдельный, более строгий лимит для запросов с полнотекстовым ?search=.
+    """
+
+    def get_scope(self, request, view):
+        if request.query_params.get("search"):
+            return "search"
+        return None
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Лимит для дорогих контроллеров с атрибутом throttle_scope
+    (регистрация, вход, массовые операции).
+    """
+
+    def get_scope(self, request, view):
+        return getattr(view, "throttle_scope", None)
@@ -0,0 +1,333 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import cache, wraps
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Текущий span запроса; None - запрос не трассируется
+_current_span = ContextVar("retail_chain_tracing_span", default=None)
+
+
+class Trace:
+    def __init__(self, max_spans):
+        self.trace_id = uuid.uuid4().hex
+        self.timestamp = timezone.now()
+        self.max_spans = max_spans
+        self.spans = 0
+        self.dropped = 0
+
+
+class Span:
+    __slots__ = ("trace", "name", "attributes", "start", "end", "children")
+
+    def __init__(self, trace, name, attributes):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    def to_dict(self, origin):
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Вложенный span текущего запроса. Если запрос не трассируется
+    или в трассе уже TRACING_MAX_SPANS span, ничего не записывает.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    trace = parent.trace
+    if trace.spans >= trace.max_spans:
+        trace.dropped += 1
+        yield None
+        return
+    trace.spans += 1
+    child = Span(trace, name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def trace_sql(execute, sql, params, many, context):
+    """
+    execute_wrapper соединений с базой данных: span на каждый SQL запрос.
+    Параметры запросов не записываются.
+    """
+    with span(
+        "sql",
+        sql=sql[: getattr(settings, "TRACING_SQL_MAX_LENGTH", 1000)],
+        many=many,
+        alias=context["connection"].alias,
+    ):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def trace_connections():
+    """
+    Записывает SQL запросы соединений текущего потока, если запрос
+    трассируется. Нужна в потоках, которые получили контекст запроса
+    через copy_context(): соединения с базой данных привязаны к потоку.
+    """
+    if _current_span.get() is None:
+        yield
+        return
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(trace_sql))
+        yield
+
+
+class JSONFileExporter:
+    """
+    Дописывает трассы в файл по одной JSON строке (JSON Lines).
+    Не требует внешних сервисов; файл можно смотреть jq или загрузить
+    в любой просмотрщик трасс.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, trace):
+        line = json.dumps(trace, ensure_ascii=False, default=str) + "\n"
+        with self.lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line)
+
+
+class LoggingExporter:
+    """
+    Передает трассы в логгер: доставка в сборщик настраивается
+    обработчиками LOGGING.
+    """
+
+    def __init__(self, logger_name="retail_chain.tracing.traces"):
+        self.logger = logging.getLogger(logger_name)
+
+    def export(self, trace):
+        self.logger.info(json.dumps(trace, ensure_ascii=False, default=str))
+
+
+@cache
+def get_exporter():
+    """
+    Экспортер трасс из TRACING_EXPORTER (путь к классу с методом export(trace))
+    с параметрами TRACING_EXPORTER_OPTIONS, один на процесс.
+    """
+    exporter_class = import_string(
+        getattr(settings, "TRACING_EXPORTER", "retail_chain.tracing.JSONFileExporter")
+    )
+    options = getattr(
+        settings,
+        "TRACING_EXPORTER_OPTIONS",
+        {"path": os.path.join(settings.BASE_DIR, "traces", "traces.jsonl")},
+    )
+    return exporter_class(**options)
+
+
+def export_trace(trace, root):
+    data = {
+        "trace_id": trace.trace_id,
+        "timestamp": trace.timestamp.isoformat(),
+        "duration_ms": round((root.end - root.start) * 1000, 3),
+        "spans": root.to_dict(root.start),
+        "dropped_spans": trace.dropped,
+    }
+    try:
+        get_exporter().export(data)
+    except Exception:
+        # Ошибка экспорта не должна ломать запрос
+        logger.exception("Ошибка экспорта трассы %s", trace.trace_id)
+
+
+class TracingMiddleware:
+    """
+    Трассировка запросов: доля TRACING_SAMPLE_RATE запросов записывается
+    целиком (span запроса, вложенные span DRF из TracingViewMixin и span
+    каждого SQL запроса) и передается экспортеру. Если задан
+    TRACING_SLOW_REQUEST_MS, записываются все запросы, а экспортируются
+    выбранные и более медленные, чем порог. Идентификатор трассы
+    возвращается в заголовке X-Trace-Id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, "TRACING_SAMPLE_RATE", 0.0)
+        slow_ms = getattr(settings, "TRACING_SLOW_REQUEST_MS", None)
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        if not sampled and slow_ms is None:
+            return self.get_response(request)
+
+        trace = Trace(getattr(settings, "TRACING_MAX_SPANS", 1000))
+        root = Span(trace, "request", {"method": request.method, "path": request.path})
+        token = _current_span.set(root)
+        try:
+            with trace_connections():
+                response = self.get_response(request)
+        finally:
+            root.end = time.perf_counter()
+            _current_span.reset(token)
+
+        root.attributes["status"] = response.status_code
+        if sampled or (root.end - root.start) * 1000 >= slow_ms:
+            export_trace(trace, root)
+            response["X-Trace-Id"] = trace.trace_id
+        return response
+
+
+def _component_name(component):
+    # Разрешения, объединенные через | и &, - экземпляры OR/AND/NOT
+    if hasattr(component, "op2"):
+        operator = {"OR": "|", "AND": "&"}.get(type(component).__name__, " ")
+        return (
+            f"({_component_name(component.op1)} {operator} "
+            f"{_component_name(component.op2)})"
+        )
+    if hasattr(component, "op1"):
+        return f"~{_component_name(component.op1)}"
+    return type(component).__name__
+
+
+class TracedComponent:
+    """
+    Обертка аутентификатора или разрешения: каждый вызов его методов
+    записывается span с именем класса.
+    """
+
+    def __init__(self, component, kind):
+        self._component = component
+        self._span_name = f"{kind} {_component_name(component)}"
+
+    def __getattr__(self, name):
+        value = getattr(self._component, name)
+        if name.startswith("_") or not callable(value):
+            return value
+
+        @wraps(value)
+        def traced(*args, **kwargs):
+            with span(self._span_name, method=name):
+                return value(*args, **kwargs)
+
+        return traced
+
+
+class TracedSerializer:
+    """
+    Обертка сериализатора: проверка данных и вывод (data) записываются span.
+    """
+
+    def __init__(self, serializer):
+        self._serializer = serializer
+
+    def __getattr__(self, name):
+        return getattr(self._serializer, name)
+
+    def is_valid(self, *args, **kwargs):
+        with span("validate", serializer=type(self._serializer).__name__):
+            return self._serializer.is_valid(*args, **kwargs)
+
+    @property
+    def data(self):
+        with span("serialize", serializer=type(self._serializer).__name__):
+            return self._serializer.data
+
+
+class TracingViewMixin:
+    """
+    Span этапов DRF: аутентификация (JWT), проверка каждого класса
+    разрешений, ограничение частоты, выборка queryset (страница или объект),
+    проверка и вывод сериализатора. Без активной трассы ничего не делает.
+    Подключается первым базовым классом представления.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with span(f"view {type(self).__name__}") as view_span:
+            response = super().dispatch(request, *args, **kwargs)
+            if view_span is not None:
+                view_span.attributes["action"] = getattr(
+                    self, "action", request.method.lower()
+                )
+                user = getattr(self.request, "user", None)
+                if user is not None and user.is_authenticated:
+                    view_span.attributes["user"] = user.pk
+            return response
+
+    def get_authenticators(self):
+        authenticators = super().get_authenticators()
+        if current_span() is None:
+            return authenticators
+        return [TracedComponent(item, "auth") for item in authenticators]
+
+    def get_permissions(self):
+        permissions = super().get_permissions()
+        if current_span() is None:
+            return permissions
+        return [TracedComponent(item, "permission") for item in permissions]
+
+    def perform_authentication(self, request):
+        with span("authentication"):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with span("permissions"):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with span("object permissions"):
+            super().check_object_permissions(request, obj)
+
+    def check_throttles(self, request):
+        with span("throttles"):
+            super().check_throttles(request)
+
+    def paginate_queryset(self, queryset):
+        with span("queryset"):
+            return super().paginate_queryset(queryset)
+
+    def get_object(self):
+        with span("queryset"):
+            return super().get_object()
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if current_span() is None:
+            return serializer
+        return TracedSerializer(serializer)
@@ -2,7 +2,16 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from retail_chain.apps import RetailChainConfig
-from retail_chain.views import CompanyViewSet, ProductViewSet, ContactsViewSet
+from retail_chain.views import (
+    AutocompleteAPIView,
+    ChangeFeedAPIView,
+    CompanyViewSet,
+    ConcurrencyStateAPIView,
+    ContactsViewSet,
+    JobViewSet,
+    NetworkSummaryAPIView,
+    ProductViewSet,
+)
 
 app_name = RetailChainConfig.name
 
@@ -12,8 +21,21 @@ router2 = DefaultRouter()
 router2.register(r"products", ProductViewSet, basename="products")
 router3 = DefaultRouter()
 router3.register(r"contacts", ContactsViewSet, basename="contacts")
+router4 = DefaultRouter()
+router4.register(r"jobs", JobViewSet, basename="jobs")
 urlpatterns = [
     path("", include(router1.urls)),
     path("", include(router2.urls)),
     path("", include(router3.urls)),
+    path("", include(router4.urls)),
+    path("autocomplete/", AutocompleteAPIView.as_view(), name="autocomplete"),
+    path("changes/", ChangeFeedAPIView.as_view(), name="changes"),
+    path(
+        "analytics/summary/", NetworkSummaryAPIView.as_view(), name="network_summary"
+    ),
+    path(
+        "monitoring/concurrency/",
+        ConcurrencyStateAPIView.as_view(),
+        name="concurrency_state",
+    ),
 ]
@@ -0,0 +1,59 @@
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """
+    Номер версии ключей кэша, хранящийся по ключу key. Номер начинается
+    от текущего времени, чтобы после вытеснения ключа версии не вернулись
+    записи, сохраненные под старыми номерами.
+    """
+    return cache.get_or_set(key, time.time_ns, timeout=None)
+
+
+def bump_version(key):
+    """
+    Меняет версию key, записи под прежним номером больше не читаются.
+    Возвращает новый номер или None, если версия была потеряна
+    и начата заново.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+        return None
+
+
+def _change_key(version_key, version):
+    return f"{version_key}:change:{version}"
+
+
+def record_versioned_change(version_key, object_id, timeout):
+    """
+    Меняет версию key и отмечает под новым номером id измененного объекта
+    для инкрементального обновления копий данных в памяти процессов.
+    Если номер версии потерян, копии перезагрузятся полностью.
+    """
+    version = bump_version(version_key)
+    if version is not None:
+        cache.set(_change_key(version_key, version), object_id, timeout=timeout)
+
+
+def get_versioned_changes(version_key, since, max_changes):
+    """
+    Текущая версия и множество id объектов, измененных после версии since.
+    Вместо множества возвращается None, если изменения нельзя восстановить:
+    версия потеряна, изменений больше max_changes или часть отметок
+    вытеснена из кэша. Тогда нужна полная загрузка.
+    """
+    current = cache.get(version_key)
+    if since is None or current is None or not 0 <= current - since <= max_changes:
+        return current, None
+    keys = [
+        _change_key(version_key, version) for version in range(since + 1, current + 1)
+    ]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return current, None
+    return current, set(changes.values())
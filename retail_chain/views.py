@@ -1,28 +1,101 @@
-from django.http import JsonResponse
+import os
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse
 from rest_framework.response import Response
-from rest_framework import viewsets, filters, status
-from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly
+from rest_framework import generics, mixins, viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (
+    IsAdminUser,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
 
-from retail_chain.models import Company, Product, Contacts
+from retail_chain.autocomplete import AUTOCOMPLETE_FIELDS, get_prefix_index
+from retail_chain.changes import CHANGE_LOG_MODELS, get_changes
+from retail_chain.company_products import (
+    add_company_products,
+    remove_company_products,
+)
+from retail_chain.concurrency import get_limiter_state
+from retail_chain.debts import get_base_currency, get_debt_totals
+from retail_chain.expand import apply_expand, parse_expand
+from retail_chain.facets import get_facets, parse_facet_filters
+from retail_chain.graph import get_supplier_graph
+from retail_chain.hierarchy import (
+    DIRECTIONS,
+    DIRECTION_DOWN,
+    DIRECTION_UP,
+    get_subtree_product_ids,
+    get_supply_chain,
+    supply_chain_ids_sql,
+)
+from retail_chain.jobs import JOB_REGISTRY, cancel_job, enqueue
+from retail_chain.mixins import OwnerQuerySetMixin, ValuesListMixin
+from retail_chain.models import Company, Product, Contacts, Job
 from retail_chain.paginators import Pagination
-from retail_chain.permissions import IsUserModerator, IsUserOwner
+from retail_chain.permissions import IsUserModerator, IsUserOwner, is_moderator
+from retail_chain.products import upsert_products
 from retail_chain.serializers import (
-    CompanySerializer,
     CompanyAllFieldsSerializer,
+    CompanyChainSerializer,
+    CompanyProductsBulkSerializer,
     ProductSerializer,
+    ProductUpsertListSerializer,
+    ProductUpsertSerializer,
     ContactsSerializer,
+    ContactsBatchLookupSerializer,
+    ContactsLookupSerializer,
+    JobCreateSerializer,
+    JobSerializer,
 )
+from retail_chain.summaries import get_network_summary
+from retail_chain.tracing import TracingViewMixin
 
 
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(
+    TracingViewMixin, OwnerQuerySetMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     Контроллер для работы с моделью Company, реализует следующие функции:
 
     Поиск и фильтрация:
-        Поддерживает поиск по полям: type, name, supplier, level, date_created
+        Поддерживает поиск по полям: type, name, supplier__name, level, date_created
         с использованием SearchFilter.
+    Раскрытие связей:
+        Параметр ?expand=supplier.supplier,contacts,products выводит связанные
+        объекты вложенными. Глубина раскрытия ограничена EXPAND_MAX_DEPTH.
+    Список компаний без ?expand= выводится быстрым путем ValuesListMixin.
+    Продукты цепочки поставок:
+        /companies/{id}/products/?direction=up|down|both возвращает продукты
+        всех компаний цепочки без повторов, с пагинацией и кэшированием.
+    Цепочка поставок:
+        /companies/{id}/chain/ возвращает путь от завода до компании
+        одним рекурсивным запросом, циклы в данных обнаруживаются.
+    Положение в иерархии:
+        /companies/{id}/hierarchy/ отвечает из графа поставщиков в памяти
+        процесса (retail_chain.graph) без запросов к таблице компаний.
+    Задолженность:
+        /companies/debt/?group_by=supplier|level|country&currency=USD
+        возвращает суммы задолженности по группам в одной валюте
+        по локальной таблице курсов ExchangeRate, с кэшированием.
+    Фасеты:
+        /companies/facets/?country=&city=&level=&type= возвращает число
+        компаний по странам, городам, уровням и типам с учетом фильтров,
+        из кэша, сбрасываемого при изменении компаний и контактов.
+    Массовое назначение продуктов:
+        POST /companies/products/add/ и /companies/products/remove/
+        {"products": [...], "companies": [...]} или {"products": [...],
+        "subtree_of": <id>, "company_type": "retail"} добавляют или удаляют
+        продукты у компаний одним INSERT/DELETE по таблице связи.
     Права доступа:
         Список компаний: доступен для чтения всем аутентифицированным пользователям.
+        Пользователь видит только свои записи (owner), модераторы
+        и администраторы - все. Фильтр по владельцу выполняется в SQL.
     Создание, обновление, удаление, просмотр компании:
         доступно пользователям с правами:
          IsUserModerator, IsUserOwner, или администратору.
@@ -38,19 +111,215 @@ class CompanyViewSet(viewsets.ModelViewSet):
     serializer_class = CompanyAllFieldsSerializer
     pagination_class = Pagination
     filter_backends = [filters.SearchFilter]
-    search_fields = ["type", "name", "supplier", "level", "date_created"]
+    search_fields = ["type", "name", "supplier__name", "level", "date_created"]
+
+    def get_expand(self):
+        """
+        Дерево раскрытия связей из параметра ?expand=, только для чтения.
+        """
+        if not hasattr(self, "_expand"):
+            self._expand = {}
+            if self.request is not None and self.action in ["list", "retrieve"]:
+                self._expand = parse_expand(self.request.query_params.get("expand"))
+        return self._expand
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Для анонимного пользователя queryset пуст (OwnerQuerySetMixin)
+        if self.action in ["list", "retrieve"] and self.request.user.is_authenticated:
+            queryset = apply_expand(queryset, self.get_expand(), self.get_owner())
+        return queryset
+
+    def get_values_serializer(self):
+        if self.get_expand():
+            return None
+        return super().get_values_serializer()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.get_serializer_class() is CompanyAllFieldsSerializer:
+            kwargs.setdefault("expand", self.get_expand())
+        return super().get_serializer(*args, **kwargs)
 
     def get_permissions(self):
         if not self.request.user.is_staff and self.request.user.is_active:
             if self.action in ["update", "retrieve", "create", "destroy"]:
                 self.permission_classes = (IsUserModerator | IsUserOwner,)
-            elif self.action == "list":
+            elif self.action in [
+                "list",
+                "subtree_products",
+                "chain",
+                "hierarchy",
+                "debt_totals",
+                "facets",
+            ]:
                 self.permission_classes = (IsAuthenticatedOrReadOnly,)
+            elif self.action in ["add_products", "remove_products"]:
+                # Компании и продукты ограничены записями пользователя
+                self.permission_classes = (IsAuthenticated,)
         return super().get_permissions()
-        serializer_class = CompanySerializer
-        if self.action:
-            self.permission_classes = (IsAdminUser,)
-        return super().get_permissions()
+
+    @action(detail=True, methods=["get"], url_path="products")
+    def subtree_products(self, request, pk=None):
+        """
+        Продукты, доступные компании по цепочке поставок:
+            direction=up - продукты компании и всех ее поставщиков (по умолчанию)
+            direction=down - продукты компании и всех звеньев ниже
+            direction=both - обе части цепочки
+        """
+        direction = request.query_params.get("direction", DIRECTION_UP)
+        if direction not in DIRECTIONS:
+            raise ValidationError(
+                {"direction": f"Допустимые значения: {', '.join(DIRECTIONS)}"}
+            )
+        company = self.get_object()
+        page = self.paginate_queryset(
+            get_subtree_product_ids(company.pk, direction, self.get_owner())
+        )
+        products = Product.objects.in_bulk(page)
+        serializer = ProductSerializer(
+            [products[pk] for pk in page if pk in products], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    def get_bulk_products_targets(self, request):
+        """
+        Компании (queryset) и продукты массового назначения. Пользователь
+        изменяет только свои компании и назначает только свои продукты,
+        модераторы и сотрудники - любые.
+        """
+        serializer = CompanyProductsBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        companies = self.get_queryset()
+        if "companies" in data:
+            companies = companies.filter(pk__in=data["companies"])
+        else:
+            sql, params = supply_chain_ids_sql(data["subtree_of"], DIRECTION_DOWN)
+            companies = companies.filter(pk__in=RawSQL(sql, params))
+        if "company_type" in data:
+            companies = companies.filter(type=data["company_type"])
+
+        products = Product.objects.filter(pk__in=data["products"])
+        if self.get_owner_scope() != "all":
+            products = products.filter(owner=request.user)
+        missing = set(data["products"]) - set(products.values_list("pk", flat=True))
+        if missing:
+            raise ValidationError(
+                {"products": f"Продукты не найдены: {sorted(missing)}"}
+            )
+        return companies, data["products"]
+
+    @action(detail=False, methods=["post"], url_path="products/add")
+    def add_products(self, request):
+        """
+        Добавляет продукты компаниям, существующие связи пропускаются.
+        Возвращает число добавленных связей и измененных компаний.
+        """
+        links, companies = add_company_products(
+            *self.get_bulk_products_targets(request)
+        )
+        return Response({"added": links, "companies": companies})
+
+    @action(detail=False, methods=["post"], url_path="products/remove")
+    def remove_products(self, request):
+        """
+        Удаляет продукты у компаний. Возвращает число удаленных связей
+        и измененных компаний.
+        """
+        links, companies = remove_company_products(
+            *self.get_bulk_products_targets(request)
+        )
+        return Response({"removed": links, "companies": companies})
+
+    @action(detail=True, methods=["get"])
+    def chain(self, request, pk=None):
+        """
+        Цепочка поставок от завода до компании: название, тип, уровень,
+        глубина (0 - сама компания) и контакты каждого звена.
+        has_cycle - в цепочке найден цикл (поставщик ссылается на потомка).
+        """
+        company = self.get_object()
+        nodes, has_cycle = get_supply_chain(company.pk, self.get_owner())
+        return Response(
+            {
+                "company": company.pk,
+                "has_cycle": has_cycle,
+                "chain": CompanyChainSerializer(nodes, many=True).data,
+            }
+        )
+
+    @action(detail=True, methods=["get"])
+    def hierarchy(self, request, pk=None):
+        """
+        Положение компании в иерархии: поставщик, глубина, поставщики до корня
+        и число звеньев ниже. С параметром ?is_upstream_of=<id> дополнительно
+        сообщает, является ли компания поставщиком указанной на любом уровне.
+        Обе компании должны быть видны пользователю, в списке поставщиков
+        до корня выводятся только видимые пользователю компании.
+        """
+        company = self.get_object()
+        company_ids = [company.pk]
+        downstream = request.query_params.get("is_upstream_of")
+        if downstream is not None:
+            try:
+                downstream = self.get_queryset().get(pk=int(downstream)).pk
+            except (ValueError, Company.DoesNotExist):
+                raise Http404
+            company_ids.append(downstream)
+
+        graph = get_supplier_graph()
+        if not all(company_id in graph for company_id in company_ids):
+            # Компания создана после последнего перестроения графа
+            graph = get_supplier_graph(wait=True)
+        try:
+            ancestors = graph.ancestors(company.pk)
+            data = {
+                "company": company.pk,
+                "supplier": graph.supplier(company.pk),
+                "depth": graph.depth(company.pk),
+                "ancestors": ancestors,
+                "descendants_count": graph.descendants_count(company.pk),
+            }
+            if downstream is not None:
+                data["is_upstream_of"] = graph.is_upstream(company.pk, downstream)
+        except KeyError:
+            raise Http404
+        if self.get_owner() is not None:
+            visible = set(
+                self.get_queryset()
+                .filter(pk__in=ancestors)
+                .values_list("pk", flat=True)
+            )
+            data["ancestors"] = [pk for pk in ancestors if pk in visible]
+        return Response(data)
+
+    @action(detail=False, methods=["get"], url_path="debt")
+    def debt_totals(self, request):
+        """
+        Задолженность видимых пользователю компаний по группам
+        (group_by=supplier|level|country, по умолчанию level) в валюте
+        currency (по умолчанию DEBT_BASE_CURRENCY): итог в валюте, суммы
+        по исходным валютам и число компаний.
+        """
+        group_by = request.query_params.get("group_by", "level")
+        currency = request.query_params.get("currency", get_base_currency()).upper()
+        return Response(
+            get_debt_totals(
+                self.get_queryset(), group_by, currency, self.get_owner_scope()
+            )
+        )
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        Число видимых пользователю компаний по странам, городам, уровням
+        и типам. Параметры country, city, level, type сужают остальные фасеты.
+        """
+        facet_filters = parse_facet_filters(request.query_params)
+        return Response(
+            get_facets(self.get_queryset(), facet_filters, self.get_owner_scope())
+        )
 
     def create(self, request, *args, **kwargs):
         """
@@ -98,7 +367,9 @@ class CompanyViewSet(viewsets.ModelViewSet):
         Response(serializer.data)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(
+    TracingViewMixin, OwnerQuerySetMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     Контроллер для работы с моделью Product, реализует следующие функции:
 
@@ -107,6 +378,8 @@ class ProductViewSet(viewsets.ModelViewSet):
         с использованием SearchFilter.
     Права доступа:
         Список продуктов: доступен для чтения всем аутентифицированным пользователям.
+        Пользователь видит только свои записи (owner), модераторы
+        и администраторы - все. Фильтр по владельцу выполняется в SQL.
         Создание, обновление, удаление, просмотр продукта:
             доступно пользователям с правами
             IsUserModerator, IsUserOwner, или администратору.
@@ -115,6 +388,12 @@ class ProductViewSet(viewsets.ModelViewSet):
         Поле product_name не должно быть пустым и не может
             содержать только числовые значения.
         В случае несоответствия возвращается ошибка с кодом 400.
+        Продукт с тем же названием и моделью (без учета регистра и лишних
+        пробелов) у владельца может быть только один.
+    Создание или обновление по названию и модели:
+        POST /products/upsert/ с объектом или списком объектов
+        {"product_name", "product_model", "product_date"} возвращает
+        найденные или созданные продукты с признаком created.
     """
 
     queryset = Product.objects.all()
@@ -155,16 +434,51 @@ class ProductViewSet(viewsets.ModelViewSet):
         self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"])
+    def upsert(self, request):
+        """
+        Создание или обновление продуктов по естественному ключу
+        (название и модель). Существующие продукты пользователя ищутся
+        одним запросом на весь список, новые создаются одним INSERT,
+        у найденных обновляется product_date, если она передана.
+        """
+        many = isinstance(request.data, list)
+        if many:
+            serializer = ProductUpsertListSerializer(data=request.data)
+        else:
+            serializer = ProductUpsertSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data if many else [serializer.validated_data]
+
+        results = [
+            {**ProductSerializer(product).data, "created": created}
+            for product, created in upsert_products(items, request.user)
+        ]
+        if many:
+            return Response(results)
+        if results[0]["created"]:
+            return Response(results[0], status=status.HTTP_201_CREATED)
+        return Response(results[0])
 
-class ContactsViewSet(viewsets.ModelViewSet):
+
+class ContactsViewSet(
+    TracingViewMixin, OwnerQuerySetMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     Контроллер для работы с моделью Contacts, реализует следующие функции:
 
     Поиск и фильтрация:
         Поддерживает поиск по полю: country с использованием SearchFilter.
+    Точный поиск по ИНН и e-mail:
+        GET /contacts/lookup/?inn=<ИНН> или ?email=<e-mail> - контакты
+        с данными компании; POST /contacts/lookup/ {"inn": [...], "email": [...]}
+        - пакетный поиск (до CONTACTS_LOOKUP_MAX значений). Один запрос
+        по индексам inn и email.
     Права доступа:
         Все действия (list, create, retrieve, update, destroy) доступны пользователям
         с правами IsUserModerator, IsUserOwner, или администратору.
+        Пользователь видит только свои записи (owner), модераторы
+        и администраторы - все. Фильтр по владельцу выполняется в SQL.
     """
 
     queryset = Contacts.objects.all()
@@ -178,3 +492,252 @@ class ContactsViewSet(viewsets.ModelViewSet):
             if self.action:
                 self.permission_classes = (IsUserModerator | IsUserOwner | IsAdminUser,)
         return super().get_permissions()
+
+    def get_lookup_queryset(self, inns=(), emails=()):
+        return (
+            self.get_queryset()
+            .filter(Q(inn__in=inns) | Q(email__in=emails))
+            .select_related("company")
+        )
+
+    @action(detail=False, methods=["get", "post"], url_path="lookup")
+    def lookup(self, request):
+        """
+        Точный поиск контактов по ИНН и e-mail.
+        GET ?inn= или ?email= возвращает список найденных контактов.
+        POST {"inn": [...], "email": [...]} возвращает найденные контакты
+        по каждому значению: {"inn": {ИНН: [...]}, "email": {e-mail: [...]}},
+        для ненайденных значений - пустой список.
+        """
+        if request.method == "GET":
+            serializer = ContactsBatchLookupSerializer(
+                data={
+                    key: [request.query_params[key]]
+                    for key in ("inn", "email")
+                    if key in request.query_params
+                }
+            )
+            serializer.is_valid(raise_exception=True)
+            contacts = self.get_lookup_queryset(
+                serializer.validated_data["inn"], serializer.validated_data["email"]
+            )
+            return Response(ContactsLookupSerializer(contacts, many=True).data)
+
+        serializer = ContactsBatchLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        inns = serializer.validated_data["inn"]
+        emails = serializer.validated_data["email"]
+        result = {
+            "inn": {inn: [] for inn in inns},
+            "email": {email: [] for email in emails},
+        }
+        for contact in ContactsLookupSerializer(
+            self.get_lookup_queryset(inns, emails), many=True
+        ).data:
+            if contact["inn"] in result["inn"]:
+                result["inn"][contact["inn"]].append(contact)
+            if contact["email"] in result["email"]:
+                result["email"][contact["email"]].append(contact)
+        return Response(result)
+
+
+class JobViewSet(
+    TracingViewMixin,
+    OwnerQuerySetMixin,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Фоновые задачи (retail_chain.jobs), которые выполняет команда run_jobs.
+
+    POST /jobs/ {"name": "export_companies", "params": {}} ставит задачу
+    в очередь и сразу возвращает ее с кодом 202. Статус, прогресс
+    (progress_done из progress_total), результат и ошибка последней
+    попытки - GET /jobs/<id>/. POST /jobs/<id>/cancel/ отменяет задачу.
+    Файл результата (выгрузка) - GET /jobs/<id>/result/.
+    Постановка задач ограничена по частоте (throttle_scope jobs).
+    Права доступа:
+        Пользователь видит и отменяет свои задачи и может запускать
+        задачи из USER_JOBS. Модераторы и администраторы видят все задачи
+        и запускают любые.
+    """
+
+    USER_JOBS = ("export_companies",)
+
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    pagination_class = Pagination
+    permission_classes = (IsAuthenticated,)
+
+    @property
+    def throttle_scope(self):
+        # Ограничена только постановка задач, опрос статуса - общим лимитом
+        return "jobs" if self.action == "create" else None
+
+    def get_allowed_jobs(self):
+        if self.get_owner_scope() == "all":
+            return set(JOB_REGISTRY)
+        return set(self.USER_JOBS) & set(JOB_REGISTRY)
+
+    def create(self, request, *args, **kwargs):
+        serializer = JobCreateSerializer(
+            data=request.data, context={"allowed_jobs": self.get_allowed_jobs()}
+        )
+        serializer.is_valid(raise_exception=True)
+        job = enqueue(
+            serializer.validated_data["name"],
+            serializer.validated_data["params"],
+            owner=request.user,
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["post"])
+    def cancel(self, request, pk=None):
+        """
+        Отмена задачи: задача в очереди отменяется сразу, выполняемая -
+        при следующем отчете о прогрессе. Завершенную задачу отменить нельзя.
+        """
+        job = self.get_object()
+        if not cancel_job(job):
+            return Response(
+                {"detail": "Задача уже завершена"}, status=status.HTTP_409_CONFLICT
+            )
+        job.refresh_from_db()
+        return Response(JobSerializer(job).data)
+
+    @action(detail=True, methods=["get"])
+    def result(self, request, pk=None):
+        """
+        Файл результата завершенной задачи. Файлы выгрузок не раздаются
+        из MEDIA_ROOT напрямую: скачать файл может только тот, кто видит
+        задачу.
+        """
+        job = self.get_object()
+        name = job.result.get("file") if isinstance(job.result, dict) else None
+        if job.status != Job.StatusChoices.SUCCEEDED or not name:
+            raise Http404("У задачи нет файла результата")
+        try:
+            file = default_storage.open(name, "rb")
+        except FileNotFoundError:
+            raise Http404("Файл результата удален")
+        return FileResponse(
+            file,
+            as_attachment=True,
+            filename=f"{job.name}-{job.pk}{os.path.splitext(name)[1]}",
+        )
+
+
+class ChangeFeedAPIView(TracingViewMixin, generics.GenericAPIView):
+    """
+    Лента изменений для инкрементальной синхронизации.
+    GET /changes/?since=<курсор>&models=company,product,contacts
+    Возвращает создания, изменения и удаления после курсора в порядке записи
+    вместе с данными объектов на момент изменения, курсор next для
+    следующего запроса и признак has_more. Без since лента читается с начала.
+    Записи моложе CHANGE_FEED_SAFETY_LAG секунд отдаются в следующих запросах.
+    Старые записи сжимаются командой compact_changes: для каждого объекта
+    остается последнее изменение.
+    Права доступа: модераторы и администраторы.
+    """
+
+    permission_classes = (IsUserModerator | IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.query_params.get("since", 0))
+        except ValueError:
+            raise ValidationError({"since": "Курсор должен быть числом"})
+        model_names = [
+            name for name in request.query_params.get("models", "").split(",") if name
+        ]
+        known_models = {name for name, _ in CHANGE_LOG_MODELS.values()}
+        if set(model_names) - known_models:
+            raise ValidationError(
+                {"models": f"Допустимые значения: {', '.join(sorted(known_models))}"}
+            )
+
+        limit = getattr(settings, "CHANGE_FEED_PAGE_SIZE", 500)
+        changes = get_changes(since, model_names, limit)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return Response(
+            {
+                "changes": changes,
+                "next": str(changes[-1]["id"]) if changes else str(since),
+                "has_more": has_more,
+            }
+        )
+
+
+class NetworkSummaryAPIView(TracingViewMixin, generics.GenericAPIView):
+    """
+    Сводка по сети для панели управления: число компаний, число продуктов
+    и задолженность по валютам в разрезе уровня, типа компании и страны.
+    Данные читаются из таблиц сводок, которые обновляются при каждом
+    изменении компаний, контактов и продуктов, поэтому время ответа
+    не зависит от числа компаний. Полный пересчет: rebuild_summaries.
+    Права доступа: модераторы и администраторы.
+    """
+
+    permission_classes = (IsUserModerator | IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_network_summary())
+
+
+class ConcurrencyStateAPIView(TracingViewMixin, generics.GenericAPIView):
+    """
+    Состояние ограничителей одновременных запросов процесса, который
+    обработал запрос (retail_chain.concurrency): лимит, число выполняемых
+    запросов, время ответа, число принятых и отклоненных запросов
+    по классам read, heavy и write.
+    Права доступа: администраторы.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_limiter_state())
+
+
+class AutocompleteAPIView(TracingViewMixin, generics.GenericAPIView):
+    """
+    Автодополнение по префиксу для строки поиска.
+    GET /autocomplete/?q=<префикс>&field=company|product_name|product_model&limit=10
+    Возвращает до limit записей {"id", "value"}, значение которых начинается
+    с префикса (без учета регистра). Поиск выполняется по отсортированному
+    индексу в памяти процесса (retail_chain.autocomplete) без запросов
+    к базе данных и без подсчета общего количества.
+    Пользователь видит только свои записи, модераторы и сотрудники - все.
+    Права доступа: требуется аутентификация.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        prefix = request.query_params.get("q", "").strip()
+        field = request.query_params.get("field", "company")
+        if field not in AUTOCOMPLETE_FIELDS:
+            raise ValidationError(
+                {"field": f"Допустимые значения: {', '.join(AUTOCOMPLETE_FIELDS)}"}
+            )
+        max_limit = getattr(settings, "AUTOCOMPLETE_MAX_LIMIT", 50)
+        try:
+            limit = int(
+                request.query_params.get(
+                    "limit", getattr(settings, "AUTOCOMPLETE_LIMIT", 10)
+                )
+            )
+        except ValueError:
+            raise ValidationError({"limit": "Должно быть числом"})
+        if not 0 < limit <= max_limit:
+            raise ValidationError({"limit": f"Допустимо от 1 до {max_limit}"})
+        if not prefix:
+            return Response({"results": []})
+
+        user = request.user
+        owner_id = None if user.is_staff or is_moderator(user) else user.pk
+        results = get_prefix_index(field).search(prefix, limit, owner_id)
+        return Response({"results": results})
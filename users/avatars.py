@@ -0,0 +1,253 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+AVATAR_DIR = "users/avatar"
+ALLOWED_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class AvatarProcessingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Обработка фотографий временно недоступна, повторите позже"
+    default_code = "avatar_processing_unavailable"
+
+
+def get_avatar_variants():
+    """
+    Варианты аватара: имя -> размер стороны квадрата, в который вписывается
+    изображение.
+    """
+    return getattr(
+        settings, "AVATAR_VARIANTS", {"small": 64, "medium": 256, "large": 512}
+    )
+
+
+def get_max_pixels():
+    return getattr(settings, "AVATAR_MAX_PIXELS", 25_000_000)
+
+
+def check_image_header(path, max_pixels):
+    """
+    Проверяет по заголовку файла, без декодирования, формат изображения
+    и число пикселей: небольшой сжатый файл может содержать изображение
+    огромного размера, распаковка которого заняла бы память и процессор.
+    Возвращает формат исходного файла.
+    """
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(path) as image:
+        if image.width * image.height > max_pixels:
+            raise Image.DecompressionBombError(
+                f"{image.width}x{image.height} больше {max_pixels} пикселей"
+            )
+        return image.format
+
+
+def render_variants(path, variants, image_format="JPEG", quality=85, max_pixels=None):
+    """
+    Проверяет и декодирует изображение из файла path и возвращает
+    (формат исходного файла, {вариант: байты уменьшенного изображения}).
+    Выполняется в дочернем процессе, поэтому не использует Django.
+    """
+    # Pillow загружается при первой обработке, а не при старте процесса
+    from PIL import Image, ImageOps
+
+    if max_pixels is not None:
+        check_image_header(path, max_pixels)
+    with Image.open(path) as image:
+        image.verify()
+    with Image.open(path) as image:
+        source_format = image.format
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        result = {}
+        for name, size in variants.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(
+                buffer, image_format, quality=quality, optimize=True, progressive=True
+            )
+            result[name] = buffer.getvalue()
+    return source_format, result
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=getattr(settings, "AVATAR_WORKERS", 2)
+                )
+    return _pool
+
+
+def _discard_pool(pool):
+    """
+    Убирает сломанный или зависший пул процессов, следующий вызов
+    _get_pool создаст новый. ProcessPoolExecutor не умеет прерывать
+    выполняемую задачу, поэтому процессы пула завершаются напрямую.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _file_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()[:32]
+
+
+def _save_once(name, content):
+    """
+    Сохраняет файл с именем по содержимому, если его еще нет.
+    Возвращает имя сохраненного файла: если параллельная загрузка того же
+    изображения успела создать файл после проверки, хранилище сохраняет
+    копию под другим именем, и ссылаться нужно на нее.
+    """
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, content)
+
+
+def process_avatar(file):
+    """
+    Обрабатывает загруженный аватар: проверяет размер и формат, в пуле
+    процессов строит уменьшенные варианты и сохраняет исходный файл
+    и варианты под именами по хэшу содержимого. Одинаковые изображения
+    хранятся один раз, а файл по имени никогда не меняется, поэтому его можно
+    кэшировать без ограничения срока.
+    Возвращает (имя исходного файла, {вариант: имя файла}).
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    max_size = getattr(settings, "AVATAR_MAX_UPLOAD_SIZE", 10 * 1024 * 1024)
+    if file.size > max_size:
+        raise serializers.ValidationError(
+            {"avatar": f"Размер файла не должен превышать {max_size} байт"}
+        )
+
+    if hasattr(file, "temporary_file_path"):
+        path, temporary = file.temporary_file_path(), False
+    else:
+        # Файл в памяти: пулу процессов передается путь, а не данные
+        with tempfile.NamedTemporaryFile(delete=False) as temporary_file:
+            for chunk in file.chunks():
+                temporary_file.write(chunk)
+        path, temporary = temporary_file.name, True
+
+    image_format = getattr(settings, "AVATAR_FORMAT", "JPEG")
+    quality = getattr(settings, "AVATAR_QUALITY", 85)
+    timeout = getattr(settings, "AVATAR_PROCESS_TIMEOUT", 30)
+    max_pixels = get_max_pixels()
+    variants = get_avatar_variants()
+    file_hash = _file_hash(file)
+
+    try:
+        # Размер файла ограничивает только сжатые данные: формат и размер
+        # изображения проверяются по заголовку до декодирования
+        try:
+            source_format = check_image_header(path, max_pixels)
+        except Image.DecompressionBombError:
+            raise serializers.ValidationError(
+                {"avatar": f"Изображение больше {max_pixels} пикселей"}
+            )
+        except (UnidentifiedImageError, OSError):
+            raise serializers.ValidationError(
+                {"avatar": "Файл не является изображением или поврежден"}
+            )
+        if source_format not in ALLOWED_FORMATS:
+            raise serializers.ValidationError(
+                {"avatar": f"Допустимые форматы: {', '.join(ALLOWED_FORMATS)}"}
+            )
+
+        pool = _get_pool()
+        try:
+            future = pool.submit(
+                render_variants, path, variants, image_format, quality, max_pixels
+            )
+            source_format, rendered = future.result(timeout=timeout)
+        except TimeoutError:
+            logger.warning("Обработка фотографии дольше %s с прервана", timeout)
+            _discard_pool(pool)
+            raise serializers.ValidationError(
+                {"avatar": "Изображение обрабатывалось слишком долго"}
+            )
+        except BrokenProcessPool:
+            logger.exception("Пул процессов обработки фотографий сломан")
+            _discard_pool(pool)
+            raise AvatarProcessingUnavailable()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise serializers.ValidationError(
+                {"avatar": "Файл не является изображением или поврежден"}
+            )
+
+        original = _save_once(
+            f"{AVATAR_DIR}/{file_hash}{ALLOWED_FORMATS[source_format]}", file
+        )
+    finally:
+        if temporary:
+            os.remove(path)
+
+    # Имя копии зависит от исходного файла и параметров уменьшения, поэтому
+    # копии принадлежат своему исходному файлу и удаляются вместе с ним
+    extension = ALLOWED_FORMATS.get(image_format, f".{image_format.lower()}")
+    names = {}
+    for name, content in rendered.items():
+        digest = hashlib.sha256(
+            f"{file_hash}:{variants[name]}:{image_format}:{quality}".encode()
+        ).hexdigest()[:32]
+        names[name] = _save_once(
+            f"{AVATAR_DIR}/{name}/{digest}{extension}", ContentFile(content)
+        )
+    return original, names
+
+
+def delete_avatar_files(original, variants, exclude_user=None):
+    """
+    Удаляет файлы аватара, если на них не ссылаются другие пользователи.
+    """
+    from users.models import User
+
+    if not original:
+        return
+    users = User.objects.filter(avatar=original)
+    if exclude_user is not None:
+        users = users.exclude(pk=exclude_user.pk)
+    if users.exists():
+        return
+    for name in (original, *variants.values()):
+        default_storage.delete(name)
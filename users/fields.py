@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.core import checks
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+PHONE_NUMBER_FIELD_PATH = "phonenumber_field.modelfields.PhoneNumberField"
+
+
+def validate_phone_number(value):
+    from phonenumber_field.validators import validate_international_phonenumber
+
+    validate_international_phonenumber(value)
+
+
+class PhoneNumberDescriptor:
+    """
+    Как в phonenumber_field: значение атрибута модели - PhoneNumber.
+    Строка из базы или присвоенная строка разбирается при первом чтении
+    атрибута, поэтому загрузка пользователя (например, при проверке JWT)
+    не импортирует phonenumbers.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self.field.name not in instance.__dict__:
+            instance.refresh_from_db(fields=[self.field.name])
+        value = instance.__dict__[self.field.name]
+        if isinstance(value, str) and value:
+            value = instance.__dict__[self.field.name] = self.field.to_python(value)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.name] = value
+
+
+class PhoneNumberField(models.CharField):
+    """
+    Поле телефона, совместимое с phonenumber_field.modelfields.PhoneNumberField
+    (в миграциях записывается как оно), но библиотека phonenumbers с
+    метаданными номеров загружается при первом использовании номера, а не
+    при импорте моделей. Это ускоряет старт процессов.
+    """
+
+    default_validators = [validate_phone_number]
+    description = _("Phone number")
+
+    def __init__(self, *args, region=None, **kwargs):
+        kwargs.setdefault("max_length", 128)
+        super().__init__(*args, **kwargs)
+        self._region = region
+
+    @property
+    def region(self):
+        return self._region or getattr(settings, "PHONENUMBER_DEFAULT_REGION", None)
+
+    def check(self, **kwargs):
+        from phonenumber_field.phonenumber import validate_region
+
+        errors = super().check(**kwargs)
+        try:
+            validate_region(self.region)
+        except ValueError as e:
+            errors.append(checks.Error(str(e), obj=self))
+        return errors
+
+    def to_python(self, value):
+        from phonenumber_field.phonenumber import to_python
+
+        return to_python(value, region=self.region)
+
+    def get_prep_value(self, value):
+        from phonenumber_field.phonenumber import PhoneNumber
+
+        value = super().get_prep_value(value)
+        if not value:
+            return value
+        if not value.is_valid():
+            return value.raw_input
+        format_string = getattr(settings, "PHONENUMBER_DB_FORMAT", "E164")
+        return value.format_as(PhoneNumber.format_map[format_string])
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super().contribute_to_class(cls, name, *args, **kwargs)
+        setattr(cls, self.name, PhoneNumberDescriptor(self))
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["region"] = self._region
+        return name, PHONE_NUMBER_FIELD_PATH, args, kwargs
+
+    def formfield(self, form_class=None, **kwargs):
+        from phonenumber_field.formfields import PhoneNumberField
+
+        defaults = {
+            "form_class": form_class or PhoneNumberField,
+            "region": self.region,
+            "error_messages": self.error_messages,
+        }
+        defaults.update(kwargs)
+        return super().formfield(**defaults)
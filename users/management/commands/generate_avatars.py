@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from rest_framework.exceptions import APIException
+
+from users.avatars import delete_avatar_files, process_avatar
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Обработка ранее загруженных фотографий пользователей: перенос под имена
+    по хэшу содержимого и создание уменьшенных копий. Нужна после первого
+    развертывания и после изменения AVATAR_VARIANTS.
+    """
+
+    help = "Создание уменьшенных копий фотографий пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="обработать и пользователей, у которых копии уже есть",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(avatar="").exclude(avatar__isnull=True)
+        if not options["all"]:
+            users = users.filter(avatar_variants={})
+        processed = failed = 0
+        for user in users.iterator():
+            try:
+                with user.avatar.open("rb") as file:
+                    avatar, variants = process_avatar(file)
+            except (OSError, APIException) as exc:
+                failed += 1
+                self.stderr.write(f"{user.email}: {exc}")
+                continue
+            old_avatar, old_variants = user.avatar.name, user.avatar_variants
+            user.avatar, user.avatar_variants = avatar, variants
+            user.save(update_fields=("avatar", "avatar_variants"))
+            if old_avatar != avatar:
+                delete_avatar_files(old_avatar, old_variants, user)
+            processed += 1
+        self.stdout.write(f"Обработано: {processed}, ошибок: {failed}")
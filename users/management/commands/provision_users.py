@@ -0,0 +1,53 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    """
+    Массовое создание пользователей из CSV файла с колонками
+    email, password и необязательными phone, first_name, last_name.
+    """
+
+    help = "Массовое создание пользователей из CSV файла"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="путь к CSV файлу")
+        parser.add_argument(
+            "--group",
+            action="append",
+            default=[],
+            help="группа для всех пользователей, например moderators",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="число процессов хэширования (по умолчанию по числу процессоров)",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="", encoding="utf-8") as file:
+            rows = [
+                {key: value for key, value in row.items() if value not in ("", None)}
+                for row in csv.DictReader(file)
+            ]
+        start = time.perf_counter()
+        try:
+            created, skipped = provision_users(
+                rows,
+                groups=options["group"],
+                workers=options["workers"],
+                batch_size=options["batch_size"],
+            )
+        except ValueError as error:
+            raise CommandError(f"{options['path']}: {error}")
+        self.stdout.write(
+            f"Создано пользователей: {created}, пропущено: {len(skipped)}, "
+            f"время {time.perf_counter() - start:.1f} с"
+        )
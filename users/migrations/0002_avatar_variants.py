@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Пути к уменьшенным копиям фотографии по вариантам",
+                verbose_name="Уменьшенные фотографии",
+            ),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
-from phonenumber_field.modelfields import PhoneNumberField
+
+from users.fields import PhoneNumberField
 
 NULLABLE = {"blank": True, "null": True}
 
@@ -49,6 +50,12 @@ class User(AbstractUser):
         verbose_name="Фотография",
         help_text="Загрузите фотографию",
     )
+    avatar_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Уменьшенные фотографии",
+        help_text="Пути к уменьшенным копиям фотографии по вариантам",
+    )
     phone = PhoneNumberField(
         region="RU", **NULLABLE, verbose_name="Телефон", help_text="Укажите телефон"
     )
@@ -0,0 +1,152 @@
+import logging
+import multiprocessing
+import threading
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+# Поля пользователя, которые принимает provision_users
+PROVISION_FIELDS = ("email", "password", "phone", "first_name", "last_name")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _create_pool(workers):
+    # Процессы запускаются через spawn, а не fork: дочерние процессы
+    # не наследуют соединения с базой данных и состояние веб-воркера.
+    # Инициализатор - сам django.setup (настройки PASSWORD_HASHERS):
+    # функция из этого модуля потребовала бы импорта моделей до настройки
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    )
+
+
+def _get_pool():
+    """
+    Общий пул процесса: одновременные запросы массового создания ставят
+    задачи в одну очередь, поэтому число процессов хэширования
+    не превышает USERS_PROVISION_WORKERS.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _create_pool(getattr(settings, "USERS_PROVISION_WORKERS", 2))
+    return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def hash_passwords(passwords, workers=None, pool=None):
+    """
+    Хэширует пароли в пуле процессов: хэширование занимает процессор
+    и не параллелится потоками. Без pool используется общий пул процесса
+    (см. _get_pool), pool - отдельный пул из workers процессов, который
+    создает и закрывает вызывающий (provision_users). Небольшие наборы
+    и наборы, для которых пул сломался, хэшируются в текущем процессе.
+    """
+    passwords = list(passwords)
+    pool_size = workers or getattr(settings, "USERS_PROVISION_WORKERS", 2)
+    if pool_size <= 1 or len(passwords) < 2 * pool_size:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (pool_size * 4))
+    shared = pool is None
+    if shared:
+        pool = _get_pool()
+    try:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        logger.exception("Пул процессов хэширования паролей сломан")
+        if shared:
+            _discard_pool(pool)
+        return [make_password(password) for password in passwords]
+
+
+def provision_users(rows, groups=(), workers=None, batch_size=1000):
+    """
+    Массовое создание пользователей.
+    rows - словари с ключами email, password и необязательными полями модели
+    (phone, first_name, last_name), другие ключи - ValueError до записи.
+    Существующие e-mail пропускаются.
+    Пароли хэшируются до записи, поэтому каждый пользователь вставляется
+    одним INSERT в составе bulk_create, а группы назначаются одним INSERT
+    в таблицу связи на пакет. С workers пароли всех пакетов хэширует один
+    пул из workers процессов, созданный на время вызова.
+    Возвращает (число созданных, список пропущенных e-mail).
+    """
+    unknown = set().union(*rows) - set(PROVISION_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Недопустимые поля: {', '.join(sorted(unknown))}. "
+            f"Допустимые: {', '.join(PROVISION_FIELDS)}"
+        )
+    with ExitStack() as stack:
+        pool = None
+        if workers and workers > 1 and len(rows) >= 2 * workers:
+            pool = stack.enter_context(_create_pool(workers))
+        return _provision_users(rows, groups, workers, pool, batch_size)
+
+
+def _provision_users(rows, groups, workers, pool, batch_size):
+    group_objects = [Group.objects.get_or_create(name=name)[0] for name in groups]
+    created = 0
+    skipped = []
+    seen = set()
+    for start in range(0, len(rows), batch_size):
+        batch = []
+        for row in rows[start : start + batch_size]:
+            email = User.objects.normalize_email(row["email"])
+            if email in seen:
+                skipped.append(email)
+                continue
+            seen.add(email)
+            batch.append({**row, "email": email})
+
+        existing = set(
+            User.objects.filter(email__in=[row["email"] for row in batch]).values_list(
+                "email", flat=True
+            )
+        )
+        skipped.extend(existing)
+        batch = [row for row in batch if row["email"] not in existing]
+        if not batch:
+            continue
+
+        hashed = hash_passwords((row["password"] for row in batch), workers, pool)
+        users = []
+        for row, password in zip(batch, hashed):
+            fields = {key: value for key, value in row.items() if key != "password"}
+            fields.setdefault("is_active", True)
+            users.append(User(**fields, password=password))
+        with transaction.atomic():
+            users = User.objects.bulk_create(users)
+            if group_objects:
+                User.groups.through.objects.bulk_create(
+                    [
+                        User.groups.through(user_id=user.pk, group_id=group.pk)
+                        for user in users
+                        for group in group_objects
+                    ],
+                    ignore_conflicts=True,
+                )
+        created += len(users)
+    return created, skipped
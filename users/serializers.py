@@ -1,9 +1,12 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from users.models import User
 
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
+    avatar = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -12,4 +15,51 @@ class UserSerializer(serializers.ModelSerializer):
             "email",
             "password",
             "is_active",
+            "avatar",
         )
+
+    def get_avatar(self, obj):
+        """
+        Ссылки на уменьшенные копии фотографии по вариантам.
+        """
+        if not obj.avatar_variants:
+            return None
+        request = self.context.get("request")
+        urls = {}
+        for name, path in obj.avatar_variants.items():
+            url = default_storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+class UserAvatarSerializer(serializers.Serializer):
+    avatar = serializers.FileField()
+
+
+class UserProvisionSerializer(serializers.ModelSerializer):
+    """
+    Данные одного пользователя для массового создания.
+    Уникальность e-mail проверяется при создании одним запросом на пакет.
+    """
+
+    email = serializers.EmailField(max_length=255)
+    password = serializers.CharField(write_only=True)
+
+    class Meta:
+        model = User
+        fields = ("email", "password", "phone", "first_name", "last_name")
+
+
+class UserBulkCreateSerializer(serializers.Serializer):
+    users = UserProvisionSerializer(many=True, allow_empty=False)
+    groups = serializers.ListField(
+        child=serializers.CharField(max_length=150), required=False, default=list
+    )
+
+    def validate_users(self, value):
+        max_users = getattr(settings, "USERS_BULK_MAX", 1000)
+        if len(value) > max_users:
+            raise serializers.ValidationError(
+                f"За один запрос можно создать не более {max_users} пользователей"
+            )
+        return value
@@ -1,3 +1,290 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from phonenumber_field.phonenumber import PhoneNumber, to_python
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from users import avatars, provisioning
+from users.models import User
+
+
+def make_image(size=(32, 32), image_format="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class FailingPool:
+    """
+    Пул процессов, задачи которого завершаются исключением.
+    """
+
+    def __init__(self, exception):
+        self.exception = exception
+        self.shutdown = mock.Mock()
+
+    def submit(self, *args, **kwargs):
+        future = Future()
+        future.set_exception(self.exception)
+        return future
+
+
+class UserAvatarTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, AVATAR_VARIANTS={"small": 8}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(email="user@test.ru", password="pw")
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name="avatar.png"):
+        return self.client.put(
+            "/users/avatar/",
+            {"avatar": SimpleUploadedFile(name, content)},
+            format="multipart",
+        )
+
+    def use_pool(self, pool):
+        patcher = mock.patch.object(avatars, "_pool", pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_upload_creates_variants(self):
+        self.addCleanup(lambda: avatars._pool and avatars._discard_pool(avatars._pool))
+        response = self.upload(make_image())
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(list(self.user.avatar_variants), ["small"])
+        with self.user.avatar.open("rb") as file:
+            self.assertEqual(Image.open(file).size, (32, 32))
+
+    def test_concurrent_save_keeps_saved_name(self):
+        name = f"{avatars.AVATAR_DIR}/same.png"
+        default_storage.save(name, ContentFile(b"image"))
+        # Параллельная загрузка создала файл после проверки exists()
+        exists = default_storage.exists
+        calls = []
+
+        def exists_after_check(path):
+            calls.append(path)
+            return len(calls) > 1 and exists(path)
+
+        with mock.patch.object(
+            default_storage, "exists", side_effect=exists_after_check
+        ):
+            saved = avatars._save_once(name, ContentFile(b"image"))
+        self.assertNotEqual(saved, name)
+        self.assertTrue(default_storage.exists(saved))
+        self.assertEqual(avatars._save_once(name, ContentFile(b"image")), name)
+
+    def test_not_an_image(self):
+        response = self.upload(b"not an image", name="avatar.txt")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("avatar", response.data)
+
+    def test_format_is_checked(self):
+        response = self.upload(make_image(image_format="BMP"), name="avatar.bmp")
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(AVATAR_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected_before_decoding(self):
+        # Небольшой файл с изображением больше предела не попадает в пул
+        with mock.patch.object(avatars, "_get_pool") as get_pool:
+            response = self.upload(make_image((20, 20)))
+        self.assertEqual(response.status_code, 400)
+        get_pool.assert_not_called()
+
+    def test_timeout_discards_pool(self):
+        pool = FailingPool(TimeoutError())
+        self.use_pool(pool)
+        with self.assertLogs("users.avatars", "WARNING"):
+            response = self.upload(make_image())
+        self.assertEqual(response.status_code, 400)
+        pool.shutdown.assert_called_once()
+        self.assertIsNone(avatars._pool)
+
+    def test_broken_pool_is_recreated(self):
+        pool = FailingPool(BrokenProcessPool())
+        self.use_pool(pool)
+        with self.assertLogs("users.avatars", "ERROR"):
+            response = self.upload(make_image())
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data["detail"].code, "avatar_processing_unavailable")
+        self.assertIsNone(avatars._pool)
+
+        # Следующая загрузка обрабатывается новым пулом
+        response = self.upload(make_image())
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNot(avatars._pool, pool)
+        avatars._discard_pool(avatars._pool)
+
+
+class UserPhoneTests(APITestCase):
+    def test_phone_is_parsed_on_first_access(self):
+        user = User.objects.create_user(
+            email="user@test.ru", password="pw", phone="8 (912) 345-67-89"
+        )
+        with mock.patch(
+            "phonenumber_field.phonenumber.to_python", wraps=to_python
+        ) as parse:
+            user = User.objects.get(pk=user.pk)
+            parse.assert_not_called()
+
+            phone = user.phone
+            self.assertIs(user.phone, phone)
+            parse.assert_called_once()
+        self.assertIsInstance(phone, PhoneNumber)
+        self.assertEqual(phone.as_e164, "+79123456789")
+
+    def test_phone_is_stored_in_e164(self):
+        user = User.objects.create_user(email="user@test.ru", password="pw")
+        user.phone = "8 (912) 345-67-89"
+        user.save()
+        self.assertEqual(
+            User.objects.values_list("phone", flat=True).get(pk=user.pk),
+            "+79123456789",
+        )
+        self.assertIsNone(User.objects.create_user(email="no@test.ru").phone)
+
+
+class ImmediatePool:
+    """
+    Пул процессов, выполняющий задачи в текущем процессе.
+    """
+
+    def __init__(self):
+        self.shutdown = mock.Mock()
+        self.calls = 0
+
+    def map(self, fn, *iterables, chunksize=1):
+        self.calls += 1
+        return map(fn, *iterables)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown(wait=True)
+
+
+class UserProvisioningTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email="admin@test.ru", password="pw", is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+
+    def post(self, users, **data):
+        return self.client.post(
+            "/users/bulk-register/", {"users": users, **data}, format="json"
+        )
+
+    @override_settings(USERS_PROVISION_WORKERS=2)
+    def test_bulk_register(self):
+        pool = ImmediatePool()
+        with mock.patch.object(provisioning, "_pool", pool):
+            response = self.post(
+                [
+                    {"email": f"user{i}@test.ru", "password": f"secret{i}"}
+                    for i in range(4)
+                ]
+                + [
+                    {"email": "user0@TEST.ru", "password": "other"},
+                    {"email": "admin@test.ru", "password": "other"},
+                ],
+                groups=["moderators"],
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 4)
+        self.assertEqual(
+            sorted(response.data["skipped"]), ["admin@test.ru", "user0@test.ru"]
+        )
+        # Пароли хэшированы общим пулом процесса
+        self.assertEqual(pool.calls, 1)
+        user = User.objects.get(email="user3@test.ru")
+        self.assertTrue(user.check_password("secret3"))
+        self.assertTrue(user.groups.filter(name="moderators").exists())
+        self.assertTrue(User.objects.get(email="admin@test.ru").check_password("pw"))
+
+    def test_invalid_rows_create_nothing(self):
+        response = self.post(
+            [
+                {"email": "user@test.ru", "password": "pw"},
+                {"email": "not-an-email", "password": "pw"},
+                {"email": "nopassword@test.ru"},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data["users"][0]), [])
+        self.assertIn("email", response.data["users"][1])
+        self.assertIn("password", response.data["users"][2])
+        self.assertFalse(User.objects.filter(email="user@test.ru").exists())
+        self.assertFalse(Group.objects.exists())
+
+    def test_admin_only(self):
+        self.client.force_authenticate(
+            User.objects.create_user(email="user@test.ru", password="pw")
+        )
+        response = self.post([{"email": "new@test.ru", "password": "pw"}])
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(USERS_PROVISION_WORKERS=2)
+    def test_broken_pool_falls_back_to_current_process(self):
+        pool = ImmediatePool()
+        pool.map = mock.Mock(side_effect=BrokenProcessPool())
+        with mock.patch.object(provisioning, "_pool", pool):
+            with self.assertLogs("users.provisioning", "ERROR"):
+                hashed = provisioning.hash_passwords(["a", "b", "c", "d"])
+            self.assertIsNone(provisioning._pool)
+        pool.shutdown.assert_called_once()
+        self.assertEqual(len(hashed), 4)
+        self.assertTrue(User(password=hashed[2]).check_password("c"))
+
+    def test_command_uses_one_pool_for_all_batches(self):
+        pool = ImmediatePool()
+        rows = "\n".join(f"user{i}@test.ru,secret{i}" for i in range(10))
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write(f"email,password\n{rows}\n")
+            file.flush()
+            with mock.patch.object(
+                provisioning, "_create_pool", return_value=pool
+            ) as create_pool:
+                call_command(
+                    "provision_users",
+                    file.name,
+                    workers=2,
+                    batch_size=4,
+                    stdout=io.StringIO(),
+                )
+        create_pool.assert_called_once_with(2)
+        # Пакеты 4, 4 и 2: последний мал для пула и хэшируется в процессе
+        self.assertEqual(pool.calls, 2)
+        pool.shutdown.assert_called_once()
+        self.assertEqual(User.objects.filter(email__startswith="user").count(), 10)
+        self.assertTrue(
+            User.objects.get(email="user9@test.ru").check_password("secret9")
+        )
+
+    def test_command_rejects_unknown_columns(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write("email,password,is_staff\nuser@test.ru,pw,1\n")
+            file.flush()
+            with self.assertRaisesMessage(CommandError, "Недопустимые поля: is_staff"):
+                call_command("provision_users", file.name, stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(email="user@test.ru").exists())
@@ -1,19 +1,23 @@
 from django.urls import path
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from users.apps import UsersConfig
-from users.views import UserCreateAPIView, UserListAPIView, UserRetrieveAPIView
+from users.views import (
+    UserAvatarAPIView,
+    UserBulkCreateAPIView,
+    UserCreateAPIView,
+    UserListAPIView,
+    UserLoginAPIView,
+    UserRetrieveAPIView,
+)
 
 app_name = UsersConfig.name
 
 urlpatterns = [
     path("register/", UserCreateAPIView.as_view(), name="register"),
-    path(
-        "login/",
-        TokenObtainPairView.as_view(permission_classes=(AllowAny,)),
-        name="login",
-    ),
+    path("bulk-register/", UserBulkCreateAPIView.as_view(), name="bulk_register"),
+    path("login/", UserLoginAPIView.as_view(), name="login"),
     path(
         "token/refresh/",
         TokenRefreshView.as_view(permission_classes=(AllowAny,)),
@@ -21,4 +25,5 @@ urlpatterns = [
     ),
     path("list/", UserListAPIView.as_view(), name="users_list"),
     path("retrieve/", UserRetrieveAPIView.as_view(), name="user_retrieve"),
+    path("avatar/", UserAvatarAPIView.as_view(), name="user_avatar"),
 ]
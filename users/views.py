@@ -1,35 +1,83 @@
-from rest_framework import generics
-from rest_framework.permissions import AllowAny, IsAdminUser
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from rest_framework import generics, status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenObtainPairView
 
 from retail_chain.permissions import IsUserModerator
+from retail_chain.tracing import TracingViewMixin
+from users.avatars import delete_avatar_files, process_avatar
 from users.models import User
-from users.serializers import UserSerializer
+from users.provisioning import provision_users
+from users.serializers import (
+    UserAvatarSerializer,
+    UserBulkCreateSerializer,
+    UserSerializer,
+)
 
 
-class UserCreateAPIView(generics.CreateAPIView):
+class UserCreateAPIView(TracingViewMixin, generics.CreateAPIView):
     """
     Контроллер для создания новых пользователей
         Позволяет любому пользователю (без авторизации) создавать учетные записи.
     При сохранении:
         Устанавливает пользователя активным (is_active=True).
-        Устанавливает пароль безопасно с использованием метода set_password.
+        Хэширует пароль до записи, пользователь сохраняется одним запросом.
     """
 
     serializer_class = UserSerializer
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
+    throttle_scope = "register"
 
     def perform_create(self, serializer):
-        # Сначала сохраняем пользователя
-        user = serializer.save(is_active=True)
+        serializer.save(
+            is_active=True,
+            password=make_password(serializer.validated_data["password"]),
+        )
 
-        # Устанавливаем пароль с помощью set_password
-        user.set_password(serializer.validated_data["password"])
-        user.save()
+
+class UserBulkCreateAPIView(TracingViewMixin, generics.GenericAPIView):
+    """
+    Контроллер для массового создания пользователей.
+    Принимает список пользователей (email, password, phone, first_name,
+    last_name) и необязательный список групп, например ["moderators"].
+    Пароли хэшируются в пуле процессов, пользователи и группы
+    записываются пакетными запросами. Существующие e-mail пропускаются.
+    Права доступа: только администратор (IsAdminUser).
+    """
+
+    serializer_class = UserBulkCreateSerializer
+    permission_classes = (IsAdminUser,)
+    throttle_scope = "bulk_register"
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created, skipped = provision_users(
+            serializer.validated_data["users"],
+            groups=serializer.validated_data["groups"],
+        )
+        return Response(
+            {"created": created, "skipped": skipped},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class UserLoginAPIView(TracingViewMixin, TokenObtainPairView):
+    """
+    Контроллер для получения пары JWT токенов по e-mail и паролю.
+    Частота входа ограничена отдельным лимитом login.
+    """
+
+    permission_classes = (AllowAny,)
+    throttle_scope = "login"
 
 
-class UserRetrieveAPIView(generics.RetrieveAPIView):
+class UserRetrieveAPIView(TracingViewMixin, generics.RetrieveAPIView):
     """
     Контроллер для получения информации о текущем пользователе.
     Возвращает данные текущего аутентифицированного пользователя.
@@ -40,11 +88,53 @@ class UserRetrieveAPIView(generics.RetrieveAPIView):
     queryset = User.objects.all()
 
     def get(self, request, *args, **kwargs):
-        serializer = UserSerializer(request.user)
+        serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
 
-class UserListAPIView(generics.ListAPIView):
+class UserAvatarAPIView(TracingViewMixin, generics.GenericAPIView):
+    """
+    Контроллер для загрузки фотографии текущего пользователя.
+    PUT (multipart, поле avatar) - загрузка: файл пишется на диск по частям,
+    проверяется и уменьшается в пуле процессов, исходный файл и уменьшенные
+    копии сохраняются под именами по хэшу содержимого.
+    DELETE - удаление фотографии.
+    Возвращает данные пользователя со ссылками на уменьшенные копии.
+    Права доступа: требуется аутентификация.
+    """
+
+    serializer_class = UserAvatarSerializer
+    parser_classes = (MultiPartParser,)
+    permission_classes = (IsAuthenticated,)
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Загрузка пишется во временный файл, а не в память
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def put(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        avatar, variants = process_avatar(serializer.validated_data["avatar"])
+        return self.replace_avatar(request.user, avatar, variants)
+
+    def delete(self, request, *args, **kwargs):
+        return self.replace_avatar(request.user, None, {})
+
+    def replace_avatar(self, user, avatar, variants):
+        old_avatar, old_variants = user.avatar.name, user.avatar_variants
+        user.avatar, user.avatar_variants = avatar, variants
+        user.save(update_fields=("avatar", "avatar_variants"))
+        if old_avatar and old_avatar != avatar:
+            transaction.on_commit(
+                lambda: delete_avatar_files(old_avatar, old_variants, user)
+            )
+        return Response(
+            UserSerializer(user, context=self.get_serializer_context()).data
+        )
+
+
+class UserListAPIView(TracingViewMixin, generics.ListAPIView):
     """
     Контроллер для получения списка всех пользователей.
     Возвращает список всех пользователей в системе.